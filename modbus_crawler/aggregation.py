@@ -0,0 +1,155 @@
+import math
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable
+
+from modbus_crawler.register_block import ModbusRegister
+
+
+@dataclass
+class WindowAggregate:
+    """
+    Statistics of all registers over one window. Numeric registers (incl. bools, as 0 and 1) get min, max, mean, last,
+    count and integral (trapezoidal, in value times seconds, e.g. Ws for a power in W), all others only last and count.
+    """
+    start: float
+    end: float
+    values: dict[str, dict[str, float | int | str | bool]]
+
+
+class WindowAggregator:
+    """
+    Aggregates the read cycles of a device into windows aligned to the wall clock (e.g. every full minute) and emits
+    one WindowAggregate per window. The statistics are kept per register in typed arrays, a cycle only updates them.
+
+    Can be used as callback of ModbusDevice.schedule(), or be called with the result of "read_registers()".
+    """
+
+    def __init__(self, window: float, callback: Callable[[WindowAggregate], None],
+                 clock: Callable[[], float] = time.time):
+        """
+        :param window: Length of a window in seconds, windows start at multiples of it since the epoch
+        :param callback: Called with the aggregate of every completed window
+        :param clock: Time source for the timestamps of the cycles
+        """
+        if window <= 0:
+            raise ValueError(f'Window must be positive, but is {window}')
+
+        self.window = window
+        self.callback = callback
+        self.clock = clock
+
+        self._window_start: float | None = None
+        self._slots: dict[str, int] = {}  # register name -> index into the arrays
+        self._minimum = array('d')
+        self._maximum = array('d')
+        self._sum = array('d')
+        self._integral = array('d')
+        self._count = array('q')
+        self._last = array('d')  # last value, also the start of the next integration step
+        self._last_time = array('d')  # nan until the first value
+        self._other: dict[str, list] = {}  # non-numeric registers: name -> [last, count]
+
+    def __call__(self, registers: list[ModbusRegister]):
+        self.add({register.name: register.value for register in registers}, self.clock())
+
+    def _slot(self, name: str) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = len(self._slots)
+            for values, initial in ((self._minimum, math.inf), (self._maximum, -math.inf), (self._sum, 0.0),
+                                    (self._integral, 0.0), (self._last, 0.0), (self._last_time, math.nan)):
+                values.append(initial)
+            self._count.append(0)
+        return slot
+
+    def _value_at(self, slot: int, value: float, timestamp: float, at: float) -> float:
+        """
+        Linear interpolation between the last value of the slot and the given value.
+        """
+        previous_time = self._last_time[slot]
+        if timestamp == previous_time:
+            return value
+        previous = self._last[slot]
+        return previous + (value - previous) * (at - previous_time) / (timestamp - previous_time)
+
+    def add(self, values: dict[str, float | int | str | bool], timestamp: float):
+        """
+        Add the values of one read cycle.
+
+        :param values: Register values by name
+        :param timestamp: Time of the cycle, cycles must be added in order
+        """
+        window_start = math.floor(timestamp / self.window) * self.window
+        if self._window_start is None:
+            self._window_start = window_start
+        elif window_start > self._window_start:
+            # Split the integration steps across the boundary, the old window gets the part up to its end
+            end = self._window_start + self.window
+            carried = []
+            for name, value in values.items():
+                slot = self._slots.get(name)
+                if slot is None or not isinstance(value, (int, float)) or math.isnan(self._last_time[slot]):
+                    continue
+                at_end = self._value_at(slot, value, timestamp, end)
+                self._integral[slot] += (self._last[slot] + at_end) / 2 * (end - self._last_time[slot])
+                carried.append((slot, self._value_at(slot, value, timestamp, window_start)))
+            self._emit()
+
+            # The new window integrates from its start
+            for slot, at_start in carried:
+                self._last[slot], self._last_time[slot] = at_start, window_start
+            self._window_start = window_start
+
+        for name, value in values.items():
+            if not isinstance(value, (int, float)):
+                entry = self._other.setdefault(name, [None, 0])
+                entry[0] = value
+                entry[1] += 1
+                continue
+
+            slot = self._slot(name)
+            value = float(value)
+            if value < self._minimum[slot]:
+                self._minimum[slot] = value
+            if value > self._maximum[slot]:
+                self._maximum[slot] = value
+            self._sum[slot] += value
+            self._count[slot] += 1
+            previous_time = self._last_time[slot]
+            if not math.isnan(previous_time):
+                self._integral[slot] += (self._last[slot] + value) / 2 * (timestamp - previous_time)
+            self._last[slot], self._last_time[slot] = value, timestamp
+
+    def _emit(self):
+        values = {}
+        for name, slot in self._slots.items():
+            count = self._count[slot]
+            if count:
+                values[name] = {'min': self._minimum[slot], 'max': self._maximum[slot],
+                                'mean': self._sum[slot] / count, 'last': self._last[slot], 'count': count,
+                                'integral': self._integral[slot]}
+        for name, (last, count) in self._other.items():
+            if count:
+                values[name] = {'last': last, 'count': count}
+
+        size = len(self._slots)
+        self._minimum = array('d', [math.inf]) * size
+        self._maximum = array('d', [-math.inf]) * size
+        self._sum = array('d', bytes(8 * size))
+        self._integral = array('d', bytes(8 * size))
+        self._count = array('q', bytes(8 * size))
+        self._other = {name: [last, 0] for name, (last, _) in self._other.items()}
+
+        if values:
+            self.callback(WindowAggregate(start=self._window_start, end=self._window_start + self.window,
+                                          values=values))
+
+    def flush(self):
+        """
+        Emit the aggregate of the current, incomplete window, e.g. before shutting down.
+        """
+        if self._window_start is not None:
+            self._emit()
+            self._window_start = None
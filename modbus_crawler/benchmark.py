@@ -0,0 +1,135 @@
+"""
+    Benchmarks of the crawler which do not need any Modbus device.
+
+    Run with "python -m modbus_crawler.benchmark <register spec csv>", or with "--transport" to compare the Modbus TCP
+    clients against a local pymodbus server. With "--replay <capture file>" the responses of a capture (c.f.
+    traffic_capture.py) are decoded with the register spec.
+"""
+import argparse
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+
+from modbus_crawler.modbus_register_list_parser_csv import CsvFileParser
+
+
+def register_memory(csv_file_name: str, devices: int = 300) -> dict[str, float]:
+    """
+    Memory used by the register specs of a fleet of identical devices.
+
+    :param csv_file_name: Register spec of the device model
+    :param devices: Number of devices in the fleet
+    :return: Number of registers, total bytes and bytes per register
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        specs = [CsvFileParser.get_register_list(csv_file_name) for _ in range(devices)]
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    registers = sum(len(block.register_list) for spec in specs for block in spec)
+    return {'registers': registers, 'bytes': used, 'bytes_per_register': used / registers if registers else 0.0}
+
+
+def transport_throughput(requests: int = 2000, count: int = 10, port: int = 5090) -> dict[str, float]:
+    """
+    Requests per second of the pymodbus client and the native transport (c.f. modbus_tcp_transport.py) reading holding
+    registers from a pymodbus server on localhost. The server runs in the same process, so the numbers include its
+    time and only the ratio is meaningful. The pymodbus server answers one request at a time, so this does not measure
+    pipelining.
+
+    :param requests: Number of requests per client
+    :param count: Number of registers per request
+    :param port: Local port of the server
+    :return: Requests per second by client
+    """
+    from pymodbus.client import AsyncModbusTcpClient
+    from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+    from pymodbus.server import StartTcpServer
+
+    from modbus_crawler.modbus_tcp_transport import AsyncModbusTcpTransport
+
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, list(range(count))))
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': ModbusServerContext(slaves=store, single=True),
+                             'address': ('127.0.0.1', port)}).start()
+
+    async def connect(client):
+        for _ in range(50):
+            if await client.connect():
+                return client
+            await asyncio.sleep(0.1)
+        raise RuntimeError(f'Benchmark server on port {port} did not start')
+
+    async def sequential(client) -> float:
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.read_holding_registers(0, count=count, slave=1)
+        return requests / (time.perf_counter() - start)
+
+    async def run() -> dict[str, float]:
+        clients = [await connect(AsyncModbusTcpClient('127.0.0.1', port=port)),
+                   await connect(AsyncModbusTcpTransport('127.0.0.1', port=port))]
+        try:
+            return {'pymodbus': await sequential(clients[0]), 'native': await sequential(clients[1])}
+        finally:
+            for client in clients:
+                client.close()
+
+    return asyncio.run(run())
+
+
+def decode_throughput(capture_file_name: str, csv_file_name: str, cycles: int = 1000) -> dict[str, float]:
+    """
+    Read cycles per second of a device replaying a capture, i.e. the speed of the decoding alone.
+
+    :param capture_file_name: Capture of the device, recorded with the same register spec
+    :param csv_file_name: Register spec of the device
+    :param cycles: Number of read cycles
+    :return: Cycles and registers per second
+    """
+    from modbus_crawler.traffic_capture import ReplayModbusDevice
+
+    device = ReplayModbusDevice(capture_file_name, register_specs_file_name=csv_file_name)
+    registers = len(device.read_registers())
+
+    start = time.perf_counter()
+    for _ in range(cycles):
+        device.read_registers()
+    duration = time.perf_counter() - start
+    return {'cycles_per_second': cycles / duration, 'registers_per_second': cycles * registers / duration}
+
+
+def main(args: list[str] = None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the Modbus crawler')
+    parser.add_argument('register_spec', nargs='?', help='csv register spec used for the benchmarks')
+    parser.add_argument('--devices', type=int, default=300, help='number of devices of the simulated fleet')
+    parser.add_argument('--transport', action='store_true', help='compare the Modbus TCP clients on localhost')
+    parser.add_argument('--replay', metavar='CAPTURE', help='decode the responses of a capture file with the spec')
+    args = parser.parse_args(args)
+
+    if args.transport:
+        for client, rate in transport_throughput().items():
+            print(f'transport: {client} {rate:.0f} requests/s')
+    if args.register_spec is None:
+        return
+
+    if args.replay is not None:
+        result = decode_throughput(args.replay, args.register_spec)
+        print(f"decode: {result['cycles_per_second']:.0f} cycles/s, "
+              f"{result['registers_per_second']:.0f} registers/s")
+        return
+
+    result = register_memory(args.register_spec, devices=args.devices)
+    print(f"memory: {result['registers']} registers, {result['bytes'] / 1e6:.1f} MB, "
+          f"{result['bytes_per_register']:.0f} bytes per register")
+
+
+if __name__ == '__main__':
+    main()
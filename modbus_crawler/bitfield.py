@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import Callable
+
+from modbus_crawler.input_data_validation import bitfield_widths
+
+# (name, first bit, number of bits), c.f. input_data_validation.check_bits()
+BitDefinition = tuple[str, int, int]
+
+# Bitfields without bit definitions expose every bit as bit0, bit1, ...
+default_bits: dict[str, tuple[BitDefinition, ...]] = {
+    data_type: tuple((f'bit{i}', i, 1) for i in range(width)) for data_type, width in bitfield_widths.items()}
+
+
+@lru_cache(maxsize=None)
+def bitfield_decoder(bits: tuple[BitDefinition, ...]) -> Callable[[int], dict[str, bool | int]]:
+    """
+    Function which splits the raw value of a bitfield into its named values. Shifts and masks are computed once per
+    distinct set of bit definitions, so all status words of a device model share one decoder.
+    """
+    flags = tuple((name, 1 << first) for name, first, width in bits if width == 1)
+    fields = tuple((name, first, (1 << width) - 1) for name, first, width in bits if width > 1)
+
+    def decode(raw: int) -> dict[str, bool | int]:
+        values = {name: raw & mask != 0 for name, mask in flags}
+        for name, first, mask in fields:
+            values[name] = (raw >> first) & mask
+        return values
+
+    return decode
+
+
+def pack_bitfield(bits: tuple[BitDefinition, ...], value: dict[str, bool | int] | int) -> int:
+    """
+    Raw value of a bitfield. Bits which are not given are written as zero.
+
+    :param bits: Bit definitions of the register
+    :param value: Values by name, or the raw value
+    """
+    if not isinstance(value, dict):
+        return int(value)
+
+    definitions = {name: (first, width) for name, first, width in bits}
+    raw = 0
+    for name, field_value in value.items():
+        if name not in definitions:
+            raise ValueError(f'Unknown bit {name}, must be one of {list(definitions)}')
+        first, width = definitions[name]
+        field_value = int(field_value)
+        if not 0 <= field_value < 1 << width:
+            raise ValueError(f'Value {field_value} of {name} does not fit into {width} bits')
+        raw |= field_value << first
+    return raw
@@ -0,0 +1,66 @@
+import time
+from dataclasses import dataclass
+
+from pymodbus.exceptions import ModbusException
+
+from modbus_crawler.register_block import RegisterBlock, ModbusRegister
+
+# Quality of the values of a block after a read cycle
+QUALITY_GOOD = 'good'  # read in this cycle
+QUALITY_TIMEOUT = 'timeout'  # no (valid) response, incl. connection errors
+QUALITY_EXCEPTION = 'exception'  # the device answered with a Modbus exception, c.f. BlockResult.exception_code
+QUALITY_STALE = 'stale'  # not read in this cycle, the registers keep the values of an earlier read
+
+
+class BlockReadError(ModbusException):
+    """
+    A read request of a block was answered with an error response.
+    """
+
+    def __init__(self, message: str, exception_code: int | None = None):
+        """
+        :param exception_code: Modbus exception code of the response, None (or 0 from pymodbus) if there was no answer
+        """
+        super().__init__(message)
+        self.exception_code = exception_code
+
+
+@dataclass(slots=True)
+class BlockResult:
+    block: RegisterBlock
+    quality: str
+    # time.time() of the values: the read for good blocks, the last good read for all others (None if there was none)
+    timestamp: float | None
+    exception_code: int | None = None
+    attempts: int = 0  # Number of read attempts in this cycle
+
+    @property
+    def good(self) -> bool:
+        return self.quality == QUALITY_GOOD
+
+    @property
+    def registers(self) -> list[ModbusRegister]:
+        return self.block.register_list
+
+
+def last_read_timestamp(block: RegisterBlock) -> float | None:
+    """
+    Wall clock time of the last good read of the block, c.f. RegisterBlock.last_good_read_time.
+    """
+    if block.last_good_read_time is None:
+        return None
+    return time.time() - (time.monotonic() - block.last_good_read_time)
+
+
+def failed_result(block: RegisterBlock, error: Exception, attempts: int) -> BlockResult:
+    """
+    Result of a block whose last read attempt raised the given error.
+    """
+    exception_code = getattr(error, 'exception_code', None)
+    if exception_code:
+        return BlockResult(block, QUALITY_EXCEPTION, last_read_timestamp(block), exception_code, attempts)
+    return BlockResult(block, QUALITY_TIMEOUT, last_read_timestamp(block), attempts=attempts)
+
+
+def stale_result(block: RegisterBlock) -> BlockResult:
+    return BlockResult(block, QUALITY_STALE, last_read_timestamp(block))
@@ -0,0 +1,258 @@
+"""
+    Command line interface of the crawler, installed as "modbus-crawler".
+
+    The commands are called from cron jobs and shell scripts many times a day, so this module only imports the standard
+    library at the top. Everything else is imported by the command which needs it.
+"""
+import argparse
+import configparser
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, TextIO
+
+if TYPE_CHECKING:
+    from modbus_crawler.device_config import DeviceConfig
+
+# Name of the config section with the options of the crawler itself, all other sections are devices
+CRAWLER_SECTION = 'crawler'
+
+
+@dataclass
+class FleetConfig:
+    devices: list['DeviceConfig'] = field(default_factory=list)
+    workers: int = 1
+    sink: str = '-'  # '-' for stdout, otherwise a file the readings are appended to as JSON lines
+
+
+def _parse_endian(value: str):
+    from pymodbus.constants import Endian
+
+    # Accepts "big" and "little" as well as the "Endian.Big" notation of older config files
+    normalized = value.strip().lower().removeprefix('endian.')
+    if normalized not in {'big', 'little'}:
+        raise ValueError(f'Invalid byte or word order: {value}')
+    return Endian.BIG if normalized == 'big' else Endian.LITTLE
+
+
+def load_config(file_name: str) -> FleetConfig:
+    """
+    Read a fleet config file. Each section is a device, except for the optional [crawler] section::
+
+        [crawler]
+        workers = 4
+        sink = readings.jsonl
+
+        [inverter_1]
+        ip_address = 10.0.0.1
+        port = 502
+        register_spec = inverter.csv
+        interval = 2
+        byteorder = big
+        wordorder = big
+
+    Register spec paths are relative to the config file.
+
+    :param file_name: Path of the ini file
+    :return: Devices and options of the crawler
+    """
+    from modbus_crawler.device_config import DeviceConfig
+
+    parser = configparser.ConfigParser()
+    if not parser.read(file_name):
+        raise FileNotFoundError(f'Config file {file_name} not found')
+
+    base_dir = os.path.dirname(os.path.abspath(file_name))
+    config = FleetConfig()
+    if parser.has_section(CRAWLER_SECTION):
+        config.workers = parser.getint(CRAWLER_SECTION, 'workers', fallback=config.workers)
+        config.sink = parser.get(CRAWLER_SECTION, 'sink', fallback=config.sink)
+
+    for name in parser.sections():
+        if name == CRAWLER_SECTION:
+            continue
+        section = parser[name]
+        if 'ip_address' not in section or 'register_spec' not in section:
+            raise ValueError(f'Device {name} needs an ip_address and a register_spec')
+
+        config.devices.append(DeviceConfig(
+            name=name,
+            ip_address=section['ip_address'],
+            modbus_port=section.getint('port', fallback=502),
+            register_specs_file_name=os.path.join(base_dir, section['register_spec']),
+            # cycling_time is the name used by older config files
+            interval=section.getfloat('interval', fallback=section.getfloat('cycling_time', fallback=1.0)),
+            byteorder=_parse_endian(section.get('byteorder', 'big')),
+            wordorder=_parse_endian(section.get('wordorder', 'big'))))
+
+    return config
+
+
+def _device_config(config: FleetConfig, name: str) -> 'DeviceConfig':
+    for device_config in config.devices:
+        if device_config.name == name:
+            return device_config
+    raise ValueError(f'Device {name} not found in config')
+
+
+def _register_key(key: str) -> str | int:
+    return int(key) if key.isdigit() else key
+
+
+def _parse_value(data_type: str, text: str):
+    if data_type.startswith('string'):
+        return text
+    if data_type == 'bool':
+        if text.lower() not in {'1', '0', 'true', 'false', 'on', 'off'}:
+            raise ValueError(f'Invalid bool value: {text}')
+        return text.lower() in {'1', 'true', 'on'}
+    if data_type.startswith('float'):
+        return float(text)
+    return int(text, 0)
+
+
+def _open_sink(sink: str) -> TextIO:
+    return sys.stdout if sink == '-' else open(sink, 'a')
+
+
+def run(args):
+    from modbus_crawler.sharded_crawler import ShardedCrawler
+
+    config = load_config(args.config)
+    crawler = ShardedCrawler(config.devices, workers=config.workers)
+    sink = _open_sink(config.sink)
+    crawler.start()
+    try:
+        while True:
+            reading = crawler.get_reading(timeout=1)
+            if reading is not None:
+                record = {'device': reading.device, 'timestamp': reading.timestamp}
+                record.update({'values': reading.values} if reading.error is None else {'error': reading.error})
+                sink.write(json.dumps(record) + '\n')
+                sink.flush()
+            crawler.restart_dead_workers()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        crawler.stop()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+def read(args):
+    device = _device_config(load_config(args.config), args.device).create_device()
+    capture = None
+    try:
+        if args.capture is not None:
+            from modbus_crawler.traffic_capture import TrafficCapture
+
+            capture = TrafficCapture(args.capture)
+            capture.attach(device)
+        names = [_register_key(key) for key in args.registers] or None
+        values = device.read_registers_as_dict(names=names)
+    finally:
+        if capture is not None:
+            capture.close()
+        device.disconnect()
+    print(json.dumps({'device': args.device, 'timestamp': time.time(), 'values': values}))
+
+
+def write(args):
+    device = _device_config(load_config(args.config), args.device).create_device()
+    try:
+        key = _register_key(args.register)
+        register = device._register_index.get(key)
+        if register is None:
+            raise ValueError(f'Register with name or address "{args.register}" not found')
+        device.write_register(key, _parse_value(register.data_type, args.value))
+    finally:
+        device.disconnect()
+
+
+def scan(args):
+    import asyncio
+
+    from pymodbus.client import AsyncModbusTcpClient
+
+    from modbus_crawler.register_scanner import RegisterScanner, ranges_to_csv
+
+    async def _scan():
+        client = AsyncModbusTcpClient(host=args.host, port=args.port, timeout=args.timeout)
+        if not await client.connect():
+            raise ConnectionError(f'Could not connect to Modbus device at {args.host}:{args.port}')
+        try:
+            scanner = RegisterScanner(client, register_types=args.types, address_range=range(args.start, args.end),
+                                      requests_per_second=args.rate, concurrency=args.concurrency)
+            return await scanner.scan(unit_ids=args.unit_ids)
+        finally:
+            client.close()
+
+    sys.stdout.write(ranges_to_csv(asyncio.run(_scan())))
+
+
+def bench(args):
+    from modbus_crawler import benchmark
+
+    benchmark.main([args.register_spec, '--devices', str(args.devices)]
+                   + (['--replay', args.replay] if args.replay is not None else []))
+
+
+def _unit_ids(text: str) -> list[int]:
+    """
+    Parse unit ids like "1-10,20".
+    """
+    unit_ids = list[int]()
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        unit_ids.extend(range(int(first), int(last or first) + 1))
+    return unit_ids
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog='modbus-crawler', description='Read, write and crawl Modbus devices')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('run', help='poll all devices of a config file and write the readings to the sink')
+    command.add_argument('config', help='fleet config file (ini)')
+    command.set_defaults(function=run)
+
+    command = commands.add_parser('read', help='read registers of a device once and print them as JSON')
+    command.add_argument('config', help='fleet config file (ini)')
+    command.add_argument('device', help='name of the device section')
+    command.add_argument('registers', nargs='*', help='names or addresses of the registers, all if omitted')
+    command.add_argument('--capture', metavar='FILE', help='record the requests and responses into a capture file')
+    command.set_defaults(function=read)
+
+    command = commands.add_parser('write', help='write a single register of a device')
+    command.add_argument('config', help='fleet config file (ini)')
+    command.add_argument('device', help='name of the device section')
+    command.add_argument('register', help='name or address of the register')
+    command.add_argument('value', help='value, converted to the data type of the register')
+    command.set_defaults(function=write)
+
+    command = commands.add_parser('scan', help='discover unit ids and readable ranges, print a draft register spec')
+    command.add_argument('host', help='host name or ip address of the device')
+    command.add_argument('--port', type=int, default=502)
+    command.add_argument('--unit-ids', type=_unit_ids, default=list(range(1, 248)), help='e.g. "1-10,20"')
+    command.add_argument('--types', default='hicd', help='register types to scan')
+    command.add_argument('--start', type=int, default=0, help='first address')
+    command.add_argument('--end', type=int, default=0x10000, help='address after the last one')
+    command.add_argument('--rate', type=float, default=None, help='maximum number of requests per second')
+    command.add_argument('--concurrency', type=int, default=4, help='maximum number of requests in flight')
+    command.add_argument('--timeout', type=float, default=1.0, help='response timeout in seconds')
+    command.set_defaults(function=scan)
+
+    command = commands.add_parser('bench', help='memory used by the register specs of a fleet of identical devices')
+    command.add_argument('register_spec', help='csv register spec')
+    command.add_argument('--devices', type=int, default=300, help='number of devices of the simulated fleet')
+    command.add_argument('--replay', metavar='CAPTURE', help='decode the responses of a capture file instead')
+    command.set_defaults(function=bench)
+
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+
+from modbus_crawler.register_block import RegisterBlock
+
+
+@dataclass
+class CycleStats:
+    """
+    Timing of the read cycles with a budget, c.f. ModbusDevice.read_blocks() and ModbusDevice.run_cycles().
+    """
+    cycles: int = 0
+    overruns: int = 0  # cycles which took longer than their budget
+    deferred_blocks: int = 0  # block reads moved to a later cycle because the budget was exhausted
+    missed_cycles: int = 0  # cycle starts dropped by run_cycles() because the cycle before overran its interval
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+
+    def add_cycle(self, duration: float, budget: float, deferred_blocks: int):
+        self.cycles += 1
+        self.overruns += duration > budget
+        self.deferred_blocks += deferred_blocks
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+
+def cycle_order(blocks: list[RegisterBlock], deferred: dict[RegisterBlock, int],
+                guaranteed_priority: int | None = None) -> list[RegisterBlock]:
+    """
+    Order in which the blocks of a cycle with a budget are read: the guaranteed blocks first by priority, since they
+    are read anyway. All other blocks age: the blocks which were deferred in the most cycles in a row go first,
+    regardless of their priority, and only then the priority decides. As the first block of a cycle is always read, a
+    block is deferred in at most as many cycles in a row as there are blocks, even if every cycle overruns.
+
+    :param deferred: Number of cycles in a row each deferred block was left out
+    :param guaranteed_priority: Blocks with this or a more urgent priority are never deferred, None if there are none
+    """
+    def key(block: RegisterBlock) -> tuple[bool, int, int]:
+        if guaranteed_priority is not None and block.priority <= guaranteed_priority:
+            return False, 0, block.priority
+        return True, -deferred.get(block, 0), block.priority
+
+    return sorted(blocks, key=key)
+
+
+def next_cycle_start(start: float, interval: float, now: float) -> tuple[float, int]:
+    """
+    Start of the next cycle on the fixed grid start + n * interval. Starts which already passed are dropped instead of
+    being caught up in a burst.
+
+    :return: Start of the next cycle and the number of dropped starts
+    """
+    start += interval
+    if now <= start:
+        return start, 0
+
+    missed = int((now - start) // interval) + 1
+    return start + missed * interval, missed
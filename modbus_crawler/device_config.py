@@ -0,0 +1,49 @@
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pymodbus.constants import Endian
+
+if TYPE_CHECKING:
+    from modbus_crawler.modbus_device_tcp import ModbusTcpDevice
+    from modbus_crawler.modbus_device_tcp_async import AsyncModbusTcpDevice
+
+
+@dataclass
+class DeviceConfig:
+    """
+    Picklable description of a Modbus TCP device of a fleet, which can be sent to worker processes and be turned into a
+    device object there.
+    """
+    name: str
+    ip_address: str
+    modbus_port: int = 502
+    register_specs_file_name: str = None
+    interval: float = 1.0  # polling interval in seconds
+    byteorder: Endian = Endian.BIG
+    wordorder: Endian = Endian.BIG
+
+    def spec_fingerprint(self) -> tuple[int, int] | None:
+        """
+        Modification time (ns) and size of the register spec file, changes when the file is edited under the same name.
+        None if there is no spec file or it can not be accessed.
+        """
+        if self.register_specs_file_name is None:
+            return None
+        try:
+            stat = os.stat(self.register_specs_file_name)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def create_device(self, auto_connect: bool = True) -> 'ModbusTcpDevice':
+        from modbus_crawler.modbus_device_tcp import ModbusTcpDevice
+        return ModbusTcpDevice(ip_address=self.ip_address, modbus_port=self.modbus_port,
+                               byteorder=self.byteorder, wordorder=self.wordorder, auto_connect=auto_connect,
+                               register_specs_file_name=self.register_specs_file_name)
+
+    def create_async_device(self) -> 'AsyncModbusTcpDevice':
+        from modbus_crawler.modbus_device_tcp_async import AsyncModbusTcpDevice
+        return AsyncModbusTcpDevice(ip_address=self.ip_address, modbus_port=self.modbus_port,
+                                    byteorder=self.byteorder, wordorder=self.wordorder,
+                                    register_specs_file_name=self.register_specs_file_name)
@@ -1,15 +1,21 @@
 from typing import Optional
 import re
 
+from modbus_crawler.request_queue import PRIORITY_FAST_READ, PRIORITY_READ
+
 # allowed column names in csv file or pandas data frame.
 # Noie: any input names will be stripped, lower cased and '_' removed to be robust against typos of user inputs
 csv_column_names: list[str] = ['registerstart', 'registerend', 'name', 'registertype', 'datatype', 'unit', 'scaling',
                                'unitid', 'description']
 
 # List of possible data types:
-data_types = (('int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64', 'float16', 'float32', 'float64', 'bool')
+data_types = (('int16', 'uint16', 'int32', 'uint32', 'int64', 'uint64', 'float16', 'float32', 'float64', 'bool',
+               'bitfield16', 'bitfield32')
               + tuple(f'string{i}' for i in range(129)))
 
+# Number of bits of the bitfield data types, their bits are named in the 'Bits' column of the spec
+bitfield_widths = {'bitfield16': 16, 'bitfield32': 32}
+
 # List of aliases for data types
 # Note: any input names will be lower cased to be robust against typos of user inputs
 # Note: as a modbus register is 16 bit long, we use the term 'int' for a 16 bit variable
@@ -24,6 +30,8 @@ data_type_lookup: dict[str, str] = {
     'float': 'float32', 'single': 'float32', 'real': 'float32', 'float32': 'float32',
     'double': 'float64', 'float64': 'float64',
     'bool': 'bool', 'bit': 'bool', 'boolean': 'bool', 'coil': 'bool',
+    'bitfield16': 'bitfield16', 'bitfield': 'bitfield16', 'flags16': 'bitfield16', 'flags': 'bitfield16',
+    'bitfield32': 'bitfield32', 'flags32': 'bitfield32',
     **{f'string{i}': f'string{i}' for i in range(129)}
 }
 
@@ -41,6 +49,9 @@ register_type_lookup: dict[str, str] = {
 # Can this register be read or written?
 mode_types = ('r', 'w', 'rw')
 
+# Read priority classes of a block, c.f. request_queue.py
+priority_lookup: dict[str, int] = {'fast': PRIORITY_FAST_READ, 'slow': PRIORITY_READ}
+
 
 def check_used(used) -> bool:
     if used is None:
@@ -143,3 +154,56 @@ def check_mode(mode: Optional[str]) -> str:
         return mode
     else:
         raise ValueError(f'Invalid mode: {mode}')
+
+
+def check_priority(priority: Optional[str]) -> int:
+    """
+    None or empty string will result in the priority of normal (slow) polling reads
+    :param priority: 'fast', 'slow' or the priority as number, lower numbers are read first
+    :return: Priority as number
+    """
+    if priority is None or priority.strip() == '':
+        return PRIORITY_READ
+    normalized = priority.strip().lower()
+    if normalized in priority_lookup:
+        return priority_lookup[normalized]
+    try:
+        return int(normalized)
+    except ValueError:
+        raise ValueError(f'Invalid priority: {priority}')
+
+
+def check_bits(bits: Optional[str], data_type: str) -> Optional[tuple[tuple[str, int, int], ...]]:
+    """
+    Parse the bit definitions of a bitfield, e.g. "running:0; fault:1; mode:4-6". Single bits are decoded as bool,
+    ranges of bits as unsigned int.
+    :param bits: Bit definitions, None or empty string for none
+    :param data_type: Checked data type of the register
+    :return: (name, first bit, number of bits) per definition, None if there are none
+    """
+    if bits is None or bits.strip() == '':
+        return None
+    if data_type not in bitfield_widths:
+        raise ValueError(f'Bit definitions are only allowed for bitfield data types, but data type is {data_type}')
+
+    definitions = []
+    used = 0
+    for definition in bits.split(';'):
+        if definition.strip() == '':
+            continue
+        match = re.fullmatch(r'\s*([^:]+?)\s*:\s*(\d+)\s*(?:-\s*(\d+)\s*)?', definition)
+        if match is None:
+            raise ValueError(f'Invalid bit definition: {definition}')
+
+        name, first, last = match.group(1), int(match.group(2)), int(match.group(3) or match.group(2))
+        if last < first or last >= bitfield_widths[data_type]:
+            raise ValueError(f'Bits {first}-{last} of {name} are out of range for data type {data_type}')
+        mask = ((1 << (last - first + 1)) - 1) << first
+        if used & mask:
+            raise ValueError(f'Bits of {name} overlap with other bit definitions')
+        used |= mask
+        definitions.append((name, first, last - first + 1))
+
+    if len({name for name, _, _ in definitions}) != len(definitions):
+        raise ValueError(f'Names of bit definitions must be unique: {bits}')
+    return tuple(definitions)
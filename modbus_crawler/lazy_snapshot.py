@@ -0,0 +1,65 @@
+import time
+from collections.abc import Mapping
+from typing import Iterator
+
+from modbus_crawler.register_block import RegisterBlock, ModbusRegister
+
+
+class LazyRegisterSnapshot(Mapping):
+    """
+    Read-only view of one polling cycle, which keeps the raw responses of the blocks and decodes a register only when
+    its value is accessed. Decoded values are memoized, so the cost is proportional to the registers actually used.
+
+    The snapshot behaves like the dictionary returned by "read_registers_as_dict()". The ModbusRegister objects of the
+    device are not modified.
+    """
+
+    def __init__(self, device, raw_blocks: list[tuple[RegisterBlock, bytes | list[bool]]]):
+        """
+        :param device: The ModbusDevice which read the blocks, used for its register lookup and decoding settings
+        :param raw_blocks: Blocks together with their raw response data, c.f. ModbusDevice._decode_register()
+        """
+        self.timestamp = time.time()
+        self._device = device
+        self._raw_blocks = raw_blocks
+        self._data = {block: data for block, data in raw_blocks}
+        self._values = {}
+
+    def _lookup(self, name: str) -> ModbusRegister:
+        register = self._device._register_index.by_name(name)
+        if register is None or register.block not in self._data:
+            raise KeyError(name)
+        return register
+
+    def __getitem__(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        register = self._lookup(name)
+        block = register.block
+        value = self._device._decode_register(self._data[block], register.register - block.start_register, register)
+        self._values[name] = value
+        return value
+
+    def __contains__(self, name) -> bool:
+        try:
+            self._lookup(name)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        for block, _ in self._raw_blocks:
+            for register in block.register_list:
+                yield register.name
+
+    def __len__(self) -> int:
+        return sum(len(block.register_list) for block, _ in self._raw_blocks)
+
+    def to_dict(self) -> dict[str, float | int | str | bool]:
+        """
+        Decode all registers, same result as "read_registers_as_dict()".
+        """
+        return {name: self[name] for name in self}
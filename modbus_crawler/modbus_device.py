@@ -1,33 +1,115 @@
+import struct
 import sys
+import threading
 import time
 from abc import ABC
-from typing import Dict
-from itertools import chain
+from array import array
+from functools import lru_cache
+from typing import Callable, TYPE_CHECKING
 
 from pymodbus import ModbusException
-from pymodbus.client import ModbusBaseClient
 from pymodbus.constants import Endian
-from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
-from schedule import Scheduler, Job
 
+from modbus_crawler.bitfield import bitfield_decoder, pack_bitfield
+from modbus_crawler.block_quality import BlockResult, QUALITY_GOOD, failed_result, stale_result
+from modbus_crawler.cycle_deadline import CycleStats, cycle_order, next_cycle_start
+from modbus_crawler.lazy_snapshot import LazyRegisterSnapshot
 from modbus_crawler.modbus_register_list_parser_csv import CsvFileParser
-from modbus_crawler.modbus_register_list_parser_pandas import PandasDataFrameParser
+from modbus_crawler.read_planner import ReadRequest, plan_reads, default_max_gap
+from modbus_crawler.register_index import RegisterIndex, RegisterKey
 from modbus_crawler.register_block import RegisterBlock, ModbusRegister
+from modbus_crawler.request_queue import PRIORITY_FAST_READ
+from modbus_crawler.single_flight import SingleFlight
+
+# Only needed for annotations. schedule, the payload builder and the pandas parser are imported where they are used, so
+# one-shot reads from the command line do not pay for them.
+if TYPE_CHECKING:
+    from pymodbus.client import ModbusBaseClient
+    from schedule import Scheduler, Job
+
+# struct format characters of the numeric data types. Note that int64 is decoded unsigned like before, for compatibility
+struct_formats = {'uint16': 'H', 'int16': 'h', 'uint32': 'I', 'int32': 'i',
+                  'uint64': 'Q', 'int64': 'Q', 'float16': 'e', 'float32': 'f',
+                  'float64': 'd', 'bool': 'H', 'bitfield16': 'H', 'bitfield32': 'I'}
 
 cast_functions = {'uint16': int, 'int16': int, 'uint32': int, 'int32': int,
                   'uint64': int, 'int64': int, 'float16': float, 'float32': float,
-                  'float64': float, 'bool': bool}
+                  'float64': float, 'bool': bool, 'bitfield16': int, 'bitfield32': int}
+
+
+def response_payload(resp) -> bytes:
+    """
+    Raw bytes of a register response in wire order (big endian registers). Responses of the native transport carry
+    them already, c.f. modbus_tcp_transport.py.
+    """
+    payload = getattr(resp, 'payload', None)
+    if payload is not None:
+        return payload
+    return struct.pack(f'>{len(resp.registers)}H', *resp.registers)
+
+
+def swap_bytes(data: bytes) -> bytes:
+    """
+    Swap the two bytes of every register in one go.
+    """
+    words = array('H', data)
+    words.byteswap()
+    return words.tobytes()
+
+
+@lru_cache(maxsize=None)
+def unpack_function(data_type: str, byteorder: Endian, wordorder: Endian) -> Callable[[bytes, int], int | float]:
+    """
+    Function which decodes a numeric data type from a payload in wire order at a given byte offset. Follows the byte and
+    word order semantics of pymodbus' BinaryPayloadDecoder: the byte order swaps the bytes within every register, the
+    word order reverses the registers of multi register values.
+    """
+    format_character = struct_formats[data_type]
+    width = struct.calcsize(format_character)
+
+    # Both orders equal or a single register: struct can read straight out of the payload
+    if width == 2 or byteorder == wordorder:
+        unpacker = struct.Struct(byteorder + format_character)
+        return lambda payload, offset: unpacker.unpack_from(payload, offset)[0]
+
+    unpacker = struct.Struct('>' + format_character)
+
+    def unpack_mixed(payload: bytes, offset: int):
+        words = array('H', payload[offset:offset + width])
+        if byteorder == Endian.LITTLE:
+            words.byteswap()
+        if wordorder == Endian.LITTLE:
+            words.reverse()
+        return unpacker.unpack(words.tobytes())[0]
+
+    return unpack_mixed
 
 
 class ModbusDevice(ABC):
+    _single_flight_class = SingleFlight  # Async devices merge coroutines instead of threads
+
     def __init__(self, byteorder=Endian.BIG, wordorder=Endian.BIG, register_specs_file_name: str = None,
                  registers_spec_df=None, register_block_list: list[RegisterBlock] = None):
         self._client = None
         self.wordorder = wordorder
         self.byteorder = byteorder
 
-        self.scheduler = Scheduler()
-        self._register_lookup: Dict[str | int, ModbusRegister] = {}  # Dictionary for quick lookups
+        # String handling, can be changed after construction
+        self.string_encoding = 'utf-8'
+        self.string_padding = ' '  # Fills up strings on writes, stripped on reads
+        self.string_null_terminated = False  # Cut strings at the first null byte instead of removing all null bytes
+
+        # Serve read_register() from the last read of the whole block, if it is at most this many seconds old
+        self.read_cache_ttl: float | None = None
+
+        self._scheduler = None
+        self._single_flight = self._single_flight_class()  # Merges concurrent reads of the same register
+        self._spec_lock = threading.RLock()  # Held during a read cycle, so specs are only swapped between cycles
+        self._register_index = RegisterIndex([])  # Lookup of registers by name and address
+        self._skipped_cycles: dict[RegisterBlock, int] = {}  # Failed blocks which read_blocks() leaves out for a while
+        # Blocks left out of the last cycle because it ran out of budget, with the number of cycles in a row
+        self._deferred_blocks: dict[RegisterBlock, int] = {}
+        self.cycle_stats = CycleStats()
 
         if register_specs_file_name is not None or registers_spec_df is not None or register_block_list is not None:
             self.set_registers_spec(pandas_df=registers_spec_df, csv_file_name=register_specs_file_name,
@@ -37,43 +119,203 @@ class ModbusDevice(ABC):
 
     def set_registers_spec(self, pandas_df=None, csv_file_name: str = None,
                            register_block_list: list[RegisterBlock] = None):
-        if register_block_list is not None:
+        register_block_list = self._load_registers_spec(pandas_df=pandas_df, csv_file_name=csv_file_name,
+                                                        register_block_list=register_block_list)
+        with self._spec_lock:
             self.register_block_list = register_block_list
+            self._register_index = RegisterIndex(register_block_list)
+
+    def reload_registers_spec(self, pandas_df=None, csv_file_name: str = None,
+                              register_block_list: list[RegisterBlock] = None) -> dict[str, int]:
+        """
+        Replace the register specification of a running device without touching the connection or the scheduler.
+
+        Blocks which did not change are kept (including the last read values of their registers), only new or changed
+        blocks are bound to the client. The new specification is swapped in between two read cycles.
+
+        :return: Number of 'unchanged', 'added' and 'removed' blocks
+        """
+        new_block_list = self._load_registers_spec(pandas_df=pandas_df, csv_file_name=csv_file_name,
+                                                   register_block_list=register_block_list)
+
+        old_blocks: dict[tuple, list[RegisterBlock]] = {}
+        for block in self.register_block_list or []:
+            old_blocks.setdefault(block.signature(), []).append(block)
+
+        block_list = list[RegisterBlock]()
+        added = 0
+        for block in new_block_list:
+            unchanged = old_blocks.get(block.signature())
+            if unchanged:
+                block_list.append(unchanged.pop(0))
+                continue
+
+            if self.client is not None:
+                block.set_modbus_device(self.client)
+            block_list.append(block)
+            added += 1
+
+        register_index = RegisterIndex(block_list)
+        with self._spec_lock:
+            self.register_block_list = block_list
+            self._register_index = register_index
+
+        return {'unchanged': len(block_list) - added, 'added': added,
+                'removed': sum(len(blocks) for blocks in old_blocks.values())}
+
+    @staticmethod
+    def _load_registers_spec(pandas_df=None, csv_file_name: str = None,
+                             register_block_list: list[RegisterBlock] = None) -> list[RegisterBlock]:
+        if register_block_list is not None:
+            return register_block_list
         elif csv_file_name is not None:
-            self.register_block_list: list[RegisterBlock] = CsvFileParser.get_register_list(csv_file_name)
+            return CsvFileParser.get_register_list(csv_file_name)
         elif pandas_df is not None:
-            self.register_block_list: list[RegisterBlock] = PandasDataFrameParser.get_register_list(pandas_df)
+            from modbus_crawler.modbus_register_list_parser_pandas import PandasDataFrameParser
+            return PandasDataFrameParser.get_register_list(pandas_df)
         else:
             raise RuntimeError('You must specify either a data frame or a csv file name')
 
-        # Create a lookup dictionary for quick access to registers
-        self._register_lookup: Dict[str | int, ModbusRegister] = {reg.name: reg for block in self.register_block_list
-                                                                  for reg in block.register_list}
-        self._register_lookup.update(
-            {reg.register: reg for block in self.register_block_list for reg in block.register_list})
-
     def _set_modbus_client_in_block_list(self):
         for block in self.register_block_list:
             block.set_modbus_device(self.client)
 
-    def read_registers_as_dict(self) -> dict[str, float]:
-        return {entry.name: entry.value for entry in self.read_registers()}
+    def read_registers_as_dict(self, names: list[RegisterKey] = None,
+                               max_gap: int = default_max_gap) -> dict[str, float]:
+        return {entry.name: entry.value for entry in self.read_registers(names=names, max_gap=max_gap)}
 
-    def read_registers(self) -> list[ModbusRegister]:
+    def read_registers(self, names: list[RegisterKey] = None,
+                       max_gap: int = default_max_gap) -> list[ModbusRegister]:
         """
         Read all registers marked as readable by mode specified in the register block list.
+
+        :param names: optional, only read these registers, given by name, address, range of addresses or any of the
+            two latter qualified by slave id and register type, e.g. (1, 'h', range(100, 120)). The registers are read
+            with as few requests as possible, regardless of their blocks and mode.
+        :param max_gap: Maximum number of registers between two requested registers which are read in the same request
+            when names are given
         """
         if self.register_block_list is None:
             raise RuntimeError('You must set register specification before reading registers')
 
-        return_list = list[ModbusRegister]()
-        for block in self.register_block_list:
-            if 'r' in block.mode:
-                resp = block.read_registers()
-                return_list.extend(self._parse_response(resp, block))
+        with self._spec_lock:
+            if names is not None:
+                registers = self._register_index.resolve(names)
+                for request in plan_reads(registers, max_gap=max_gap):
+                    self._parse_request_response(request.read_registers(), request)
+                return registers
+
+            return_list = list[ModbusRegister]()
+            for block in self.register_block_list:
+                if 'r' in block.mode:
+                    resp = block.read_registers()
+                    return_list.extend(self._parse_response(resp, block))
 
         return return_list
 
+    def read_blocks(self, retries: int = 0, skip_cycles: int = 0, budget: float = None,
+                    guaranteed_priority: int | None = PRIORITY_FAST_READ) -> list[BlockResult]:
+        """
+        Read all readable blocks like "read_registers()", but a failing block does not fail the cycle. Every block gets
+        a result with its quality, the registers of good blocks hold the new values, the registers of all others keep
+        their previous values.
+
+        :param retries: Number of further attempts for a failing block within this cycle
+        :param skip_cycles: Number of following cycles which leave out a block after it failed and report it as stale.
+            Saves the requests (and timeouts) of a block which keeps failing.
+        :param budget: optional, seconds the cycle may take. Blocks are then read by priority (c.f.
+            RegisterBlock.priority) and the blocks left when the budget is exhausted are deferred to the next cycle and
+            reported as stale. The first block of a cycle is always read. The timing is recorded in self.cycle_stats.
+        :param guaranteed_priority: Blocks with this or a more urgent priority are read even if the budget is exhausted,
+            None to defer all blocks alike
+        :return: Results in the order of the register spec
+        """
+        if self.register_block_list is None:
+            raise RuntimeError('You must set register specification before reading registers')
+
+        with self._spec_lock:
+            blocks = [block for block in self.register_block_list if 'r' in block.mode]
+            if budget is None:
+                return [self._read_block(block, retries, skip_cycles) for block in blocks]
+
+            start = time.monotonic()
+            results = {}
+            for block in cycle_order(blocks, self._deferred_blocks, guaranteed_priority):
+                # The first block is always read, so every cycle makes progress
+                if self._defer_block(block, start + budget, guaranteed_priority, first=not results):
+                    results[block] = stale_result(block)
+                else:
+                    results[block] = self._read_block(block, retries, skip_cycles)
+            self._finish_cycle(start, budget)
+            return [results[block] for block in blocks]
+
+    def _defer_block(self, block: RegisterBlock, deadline: float, guaranteed_priority: int | None,
+                     first: bool = False) -> bool:
+        # The first block of a cycle is always read, so every cycle makes progress
+        if first or time.monotonic() < deadline or \
+                (guaranteed_priority is not None and block.priority <= guaranteed_priority):
+            self._deferred_blocks.pop(block, None)
+            return False
+
+        self._deferred_blocks[block] = self._deferred_blocks.get(block, 0) + 1
+        return True
+
+    def _finish_cycle(self, start: float, budget: float):
+        deferred = sum(1 for block in self.register_block_list if block in self._deferred_blocks)
+        self.cycle_stats.add_cycle(time.monotonic() - start, budget, deferred)
+
+    def _skip_block(self, block: RegisterBlock) -> bool:
+        remaining = self._skipped_cycles.get(block)
+        if not remaining:
+            return False
+
+        if remaining == 1:
+            del self._skipped_cycles[block]
+        else:
+            self._skipped_cycles[block] = remaining - 1
+        return True
+
+    def _block_failed(self, block: RegisterBlock, error: Exception, attempts: int, skip_cycles: int) -> BlockResult:
+        if skip_cycles > 0:
+            self._skipped_cycles[block] = skip_cycles
+        return failed_result(block, error, attempts)
+
+    def _block_read(self, block: RegisterBlock, resp, attempts: int) -> BlockResult:
+        self._parse_response(resp, block)
+        return BlockResult(block, QUALITY_GOOD, time.time(), attempts=attempts)
+
+    def _read_block(self, block: RegisterBlock, retries: int, skip_cycles: int) -> BlockResult:
+        if self._skip_block(block):
+            return stale_result(block)
+
+        for attempt in range(1, retries + 2):
+            try:
+                resp = block.read_registers()
+            except (ModbusException, OSError) as e:
+                error = e
+            else:
+                return self._block_read(block, resp, attempt)
+        return self._block_failed(block, error, retries + 1, skip_cycles)
+
+    def read_registers_lazy(self) -> LazyRegisterSnapshot:
+        """
+        Read all readable blocks like "read_registers()", but decode registers only when they are accessed.
+        """
+        return LazyRegisterSnapshot(self, self.read_raw_blocks())
+
+    def read_raw_blocks(self) -> list[tuple[RegisterBlock, bytes | list[bool]]]:
+        """
+        Read all readable blocks without decoding them.
+
+        :return: Blocks with their raw register bytes in wire order or, for coils and discrete inputs, their bits
+        """
+        if self.register_block_list is None:
+            raise RuntimeError('You must set register specification before reading registers')
+
+        with self._spec_lock:
+            return [(block, self._response_data(block.read_registers(), block.register_type))
+                    for block in self.register_block_list if 'r' in block.mode]
+
     def read_register(self, register: str | int) -> ModbusRegister:
         """
         Read a register by name or register id. You can also read registers with mode of 'w'.
@@ -81,18 +323,36 @@ class ModbusDevice(ABC):
         :param register: Name or register id of the register
         :return: ModbusRegister object
         """
-        modbus_register = self._register_lookup.get(register)
+        modbus_register = self._register_index.get(register)
         if modbus_register is None:
             raise ValueError(f'Register with name or address "{register}" not found')
 
+        if self._is_cached(modbus_register):
+            return modbus_register
+
+        # Concurrent reads of the same register share one request
+        resp = self._single_flight.do(self._single_read_key(modbus_register), self._read_single_register,
+                                      modbus_register)
+        return self._parse_single_register_response(resp, modbus_register)
+
+    def _read_single_register(self, modbus_register: ModbusRegister):
         resp = modbus_register.block._read_function(address=modbus_register.register,
                                                     count=modbus_register.length,
                                                     slave=modbus_register.block.slave_id)
         if resp.isError():
             raise ModbusException(
                 f'Could not read {modbus_register.name} register')
+        return resp
 
-        return self._parse_single_register_response(resp, modbus_register)
+    @staticmethod
+    def _single_read_key(modbus_register: ModbusRegister) -> tuple[int, str, int, int]:
+        block = modbus_register.block
+        return block.slave_id, block.register_type, modbus_register.register, modbus_register.length
+
+    def _is_cached(self, modbus_register: ModbusRegister) -> bool:
+        read_time = modbus_register.block.read_time
+        return (self.read_cache_ttl is not None and read_time is not None
+                and time.monotonic() - read_time <= self.read_cache_ttl)
 
     def write_register(self, register: str | int, value):
         """
@@ -109,99 +369,114 @@ class ModbusDevice(ABC):
             self.client.write_registers(modbus_register.register, prepared_value, slave=modbus_register.block.slave_id)
         else:
             self.client.write_register(modbus_register.register, prepared_value[0], slave=modbus_register.block.slave_id)
+        modbus_register.block.read_time = None  # The cached block does not show the written value
 
-    def _flip_pairs(self, s: str) -> str:
-        """
-        Flip the byte order of a string by swapping pairs of characters. This is apparently the fastest way to do it.
-        """
+    @staticmethod
+    def _response_data(resp, register_type: str) -> bytes | list[bool]:
+        return resp.bits if register_type in {'c', 'd'} else response_payload(resp)
 
-        # If it is odd we add a space to the end which enables us to have a space before the last character
-        if len(s) & 1:
-            s += ' '
+    def _parse_response(self, resp, block: RegisterBlock) -> list[ModbusRegister]:
+        data = self._response_data(resp, block.register_type)
+        string_data = None
+        block.read_time = block.last_good_read_time = time.monotonic()
+
+        if isinstance(data, list):
+            # Coils and discrete inputs: the bits are mapped into the values in one go
+            for register, value in zip(block.register_list, block.bit_values(data)):
+                register.value = value
+            return block.register_list
 
-        odds, evens = s[1::2], s[::2]  # two linear slices
-        return ''.join(chain.from_iterable(zip(odds, evens)))
+        for register in block.register_list:
+            offset = register.register - block.start_register
+            if "string" in register.data_type:
+                # Swap the bytes of the whole block once, all strings of the block are slices of it
+                if string_data is None:
+                    string_data = self._string_bytes(data)
+                register.value = self._decode_string(string_data[2 * offset:2 * (offset + register.length)])
+            else:
+                register.value = self._decode_register(data, offset, register)
 
-    def _parse_response(self, resp, block: RegisterBlock) -> list[ModbusRegister]:
-        return_list = list[ModbusRegister]()
+        return block.register_list
 
-        # Special case for coils and discrete inputs
-        if block.register_type == 'c' or block.register_type == 'd':
-            pdc = BinaryPayloadDecoder.fromCoils(resp.bits, byteorder=self.byteorder)
+    def _parse_request_response(self, resp, request: ReadRequest) -> list[ModbusRegister]:
+        data = self._response_data(resp, request.register_type)
 
-            for register in block.register_list:
-                decoded_value = pdc.decode_bits(register.length)
-                decoded_value = any(decoded_value)
-                register.value = decoded_value
-                return_list.append(register)
+        for register in request.registers:
+            register.value = self._decode_register(data, request.offset(register), register)
 
-            return block.register_list
+        return request.registers
 
-        pdc = BinaryPayloadDecoder.fromRegisters(resp.registers, wordorder=self.wordorder,
-                                                 byteorder=self.byteorder)
+    @property
+    def _swap_string_bytes(self) -> bool:
+        # Flip two consecutive bytes if the byte order is big endian on little endian devices or vice versa
+        # This may not be correct for all devices, we will see
+        return (self.byteorder == Endian.BIG) != (sys.byteorder == "big")
 
-        decode_functions = {'uint16': pdc.decode_16bit_uint, 'int16': pdc.decode_16bit_int,
-                            'uint32': pdc.decode_32bit_uint, 'int32': pdc.decode_32bit_int,
-                            'uint64': pdc.decode_64bit_uint, 'int64': pdc.decode_64bit_uint,
-                            'float16': pdc.decode_16bit_float, 'float32': pdc.decode_32bit_float,
-                            'float64': pdc.decode_64bit_float, 'bool': pdc.decode_16bit_uint}
+    def _string_bytes(self, data: bytes) -> bytes:
+        """
+        Raw register bytes in the byte order of strings.
+        """
+        if not self._swap_string_bytes:
+            return data
+        return swap_bytes(data)
 
-        for register in block.register_list:
-            # Special case for strings
-            # Eat up the whole string and continue with the next register
-            if "string" in register.data_type:
-                # Times two because the length is in register units, but the payload is in bytes
-                # and one register has two bytes
-                decoded_value = pdc.decode_string(register.length * 2)
-                register.value = decoded_value.decode('utf-8')
+    def _decode_string(self, raw: bytes) -> str:
+        if self.string_null_terminated:
+            raw = raw.split(b'\x00', 1)[0]
+        else:
+            # Remove null bytes, maybe this is very special to a device but it will not harm us
+            raw = raw.replace(b'\x00', b'')
 
-                # Flip two consecutive bytes if the byte order is big endian on little endian devices or vice versa
-                # This may not be correct for all devices, we will see
-                if (self.byteorder == Endian.BIG) != (sys.byteorder == "big"):
-                    register.value = self._flip_pairs(register.value)
+        # Remove leading and trailing whitespaces and padding
+        return raw.decode(self.string_encoding).strip().strip(self.string_padding)
 
-                # Remove leading and trailing whitespaces
-                register.value = register.value.strip()
+    def _decode_register(self, data: bytes | list[bool], offset: int, register: ModbusRegister):
+        """
+        Decode a single register out of a response.
 
-                # Remove "\u0000" pattern which is a null byte as hex as ascii
-                # Maybe this is very special to a device but it will not harm us
-                register.value = register.value.replace("\u0000", '')
-                register.value = register.value.replace("\x00", '')
+        :param data: Raw register bytes in wire order (c.f. response_payload()) or the bits of a coil/discrete input
+            response
+        :param offset: Position of the register in the response, in registers or bits respectively
+        :param register: The register to decode, the value attribute is not touched
+        :return: The decoded and scaled value
+        """
+        # Special case for coils and discrete inputs
+        if isinstance(data, list):
+            return any(data[offset:offset + register.length])
 
-                return_list.append(register)
-                continue
+        # Special case for strings
+        if "string" in register.data_type:
+            # Times two because the length is in register units, but the payload is in bytes
+            # and one register has two bytes
+            return self._decode_string(self._string_bytes(data[2 * offset:2 * (offset + register.length)]))
 
-            decoded_value = decode_functions[register.data_type]()
+        decoded_value = unpack_function(register.data_type, self.byteorder, self.wordorder)(data, 2 * offset)
 
-            if 'bool' in register.data_type:
-                # Check if there is something in the register
-                # This also cast the value to a boolean
-                register.value = decoded_value > 0
-            else:
-                # int and float values
+        if 'bool' in register.data_type:
+            # Check if there is something in the register
+            # This also cast the value to a boolean
+            return decoded_value > 0
 
-                # Int/uint: If scaling by 1 we scale which allows us to convert int to float
-                # Float: Only multiply by scaling if scaling is not 1.0 or None to avoid floating point errors
-                if register.scaling is None or (register.scaling == 1.0 and 'float' in register.data_type):
-                    register.value = cast_functions[register.data_type](decoded_value)
-                else:
-                    # When we scale the resulting type is always a float
-                    decoded_value *= register.scaling
-                    register.value = decoded_value
-            return_list.append(register)
+        if register.bits is not None:
+            return bitfield_decoder(register.bits)(decoded_value)
 
-        return return_list
+        # int and float values
+
+        # Int/uint: If scaling by 1 we scale which allows us to convert int to float
+        # Float: Only multiply by scaling if scaling is not 1.0 or None to avoid floating point errors
+        if register.scaling is None or (register.scaling == 1.0 and 'float' in register.data_type):
+            return cast_functions[register.data_type](decoded_value)
+
+        # When we scale the resulting type is always a float
+        return decoded_value * register.scaling
 
     def _parse_single_register_response(self, resp, modbus_register: ModbusRegister) -> ModbusRegister:
-        single_register_block = RegisterBlock(start_register=modbus_register.register,
-                                              slave_id=modbus_register.block.slave_id,
-                                              register_type=modbus_register.block.register_type,
-                                              mode=modbus_register.mode)
-        single_register_block.add_register_to_list(modbus_register)
-        return self._parse_response(resp, single_register_block)[0]
+        data = self._response_data(resp, modbus_register.block.register_type)
+        modbus_register.value = self._decode_register(data, 0, modbus_register)
+        return modbus_register
 
     def _prepare_write_register(self, register: str | int, value):
-        modbus_register = self._register_lookup.get(register)
+        modbus_register = self._register_index.get(register)
         if modbus_register is None:
             raise ValueError(f'Register with name or address "{register}" not found')
 
@@ -212,13 +487,15 @@ class ModbusDevice(ABC):
                 raise ValueError(f'Value for coil must be boolean or 1 or 0, but is {value}')
             return modbus_register, bool(value), 'coil'
         else:
+            from pymodbus.payload import BinaryPayloadBuilder
             builder = BinaryPayloadBuilder(byteorder=self.byteorder, wordorder=self.wordorder)
 
             builder_add = {'uint16': builder.add_16bit_uint, 'int16': builder.add_16bit_int,
                            'uint32': builder.add_32bit_uint, 'int32': builder.add_32bit_int,
                            'uint64': builder.add_64bit_uint, 'int64': builder.add_64bit_uint,
                            'float16': builder.add_16bit_float, 'float32': builder.add_32bit_float,
-                           'float64': builder.add_64bit_float, 'bool': builder.add_16bit_int}
+                           'float64': builder.add_64bit_float, 'bool': builder.add_16bit_int,
+                           'bitfield16': builder.add_16bit_uint, 'bitfield32': builder.add_32bit_uint}
 
             # Bools are sent as an integer with 0 or 1 of input registers
             # There should be coils but some devices store them as integers
@@ -229,21 +506,21 @@ class ModbusDevice(ABC):
                 value /= modbus_register.scaling
 
             if 'string' in modbus_register.data_type:
+                raw = value.encode(self.string_encoding)
+
                 # Check if string is too long
-                if len(value) > modbus_register.length * 2:
+                if len(raw) > modbus_register.length * 2:
                     raise ValueError(f'String is too long for register {modbus_register.name}')
 
-                # Flip the string byte order if it is big endian on little endian devices or vice versa
-                if (self.byteorder == Endian.BIG) != (sys.byteorder == "big"):
-                    value = self._flip_pairs(value)
-
-                # Pad the string with spaces to the right
+                # Pad the string to the right
                 # TODO: Maybe add a parameter to choose the padding left or right
-                value = value.ljust(modbus_register.length * 2)
+                raw = raw.ljust(modbus_register.length * 2, self.string_padding.encode(self.string_encoding))
 
-                builder.add_string(value)
+                return modbus_register, list(struct.unpack(f'>{modbus_register.length}H', self._string_bytes(raw))), \
+                    'register'
 
-                return modbus_register, builder.to_registers(), 'register'
+            if modbus_register.bits is not None:
+                value = pack_bitfield(modbus_register.bits, value)
 
             casted_value = cast_functions[modbus_register.data_type](value)
             builder_add[modbus_register.data_type](casted_value)
@@ -260,7 +537,14 @@ class ModbusDevice(ABC):
         data = self.read_registers()
         callback(data)
 
-    def schedule(self, job: Job, callback):
+    @property
+    def scheduler(self) -> 'Scheduler':
+        if self._scheduler is None:
+            from schedule import Scheduler
+            self._scheduler = Scheduler()
+        return self._scheduler
+
+    def schedule(self, job: 'Job', callback):
         """
         Schedule a new job
 
@@ -285,6 +569,34 @@ class ModbusDevice(ABC):
         else:
             raise NotImplementedError
 
+    def run_cycles(self, interval: float, callback, budget: float = None,
+                   guaranteed_priority: int | None = PRIORITY_FAST_READ, retries: int = 0, cycles: int = None):
+        """
+        Read all blocks at a fixed rate with "self.read_blocks()". Cycles start on the grid of the first start plus
+        multiples of interval, so they do not drift like jobs of "self.schedule()". A cycle which overruns its interval
+        drops the starts it missed (c.f. self.cycle_stats.missed_cycles) instead of running the next cycles back to back.
+
+        :param interval: Seconds between the starts of two cycles
+        :param callback: Callback function which gets the list of BlockResult of every cycle
+        :param budget: Seconds a cycle may take, default is the interval. Left over low priority blocks are deferred to
+            the next cycle, c.f. "self.read_blocks()"
+        :param guaranteed_priority: c.f. "self.read_blocks()"
+        :param retries: c.f. "self.read_blocks()"
+        :param cycles: optional, stop after this number of cycles
+        """
+        budget = interval if budget is None else budget
+        start = time.monotonic()
+        count = 0
+        while cycles is None or count < cycles:
+            callback(self.read_blocks(retries=retries, budget=budget, guaranteed_priority=guaranteed_priority))
+            count += 1
+
+            now = time.monotonic()
+            start, missed = next_cycle_start(start, interval, now)
+            self.cycle_stats.missed_cycles += missed
+            if cycles is None or count < cycles:
+                time.sleep(start - now)
+
     @property
-    def client(self) -> ModbusBaseClient:
+    def client(self) -> 'ModbusBaseClient':
         return self._client
@@ -1,33 +1,124 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+
 from pymodbus import ModbusException
-from schedule import Job
 
+from modbus_crawler.block_quality import BlockResult, stale_result
+from modbus_crawler.cycle_deadline import cycle_order, next_cycle_start
+from modbus_crawler.lazy_snapshot import LazyRegisterSnapshot
 from modbus_crawler.modbus_device import ModbusDevice, cast_functions
-from modbus_crawler.register_block import ModbusRegister
+from modbus_crawler.read_planner import plan_reads, default_max_gap
+from modbus_crawler.register_index import RegisterKey
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.request_queue import PRIORITY_FAST_READ
+from modbus_crawler.single_flight import AsyncSingleFlight
+
+if TYPE_CHECKING:
+    from schedule import Job
 
 
 class AsyncModbusDevice(ModbusDevice):
     """
     This class overrides some methods of the ModbusDevice class to make them async.
     """
+    _single_flight_class = AsyncSingleFlight
+
 
-    async def read_registers_as_dict(self) -> dict[str, float]:
-        return {entry.name: entry.value for entry in await self.read_registers()}
+    async def read_registers_as_dict(self, names: list[RegisterKey] = None,
+                                     max_gap: int = default_max_gap) -> dict[str, float]:
+        return {entry.name: entry.value for entry in await self.read_registers(names=names, max_gap=max_gap)}
 
-    async def read_registers(self) -> list[ModbusRegister]:
+    async def read_registers(self, names: list[RegisterKey] = None,
+                             max_gap: int = default_max_gap) -> list[ModbusRegister]:
         """
         Read all registers marked as readable by mode specified in the register block list.
+
+        :param names: optional, only read these registers, c.f. ModbusDevice.read_registers()
+        :param max_gap: c.f. ModbusDevice.read_registers()
         """
         if self.register_block_list is None:
             raise RuntimeError('You must set register specification before reading registers')
 
+        if names is not None:
+            registers = self._register_index.resolve(names)
+            requests = plan_reads(registers, max_gap=max_gap)
+            responses = await self._read_all([request.read_registers_async for request in requests])
+            for request, resp in zip(requests, responses):
+                self._parse_request_response(resp, request)
+            return registers
+
+        blocks = [block for block in self.register_block_list if 'r' in block.mode]
+        responses = await self._read_all([block.read_registers_async for block in blocks])
         return_list = list[ModbusRegister]()
-        for block in self.register_block_list:
-            if 'r' in block.mode:
-                resp = await block.read_registers_async()
-                return_list.extend(self._parse_response(resp, block))
+        for block, resp in zip(blocks, responses):
+            return_list.extend(self._parse_response(resp, block))
 
         return return_list
 
+    async def _read_all(self, reads: list[Callable[[], Awaitable]]) -> list:
+        """
+        Responses of the given reads in the same order. Clients which can have several requests in flight (c.f.
+        modbus_tcp_transport.py) get all of them at once, others one after the other.
+        """
+        if getattr(self.client, 'pipelining', False):
+            return list(await asyncio.gather(*(read() for read in reads)))
+        return [await read() for read in reads]
+
+    async def read_blocks(self, retries: int = 0, skip_cycles: int = 0, budget: float = None,
+                          guaranteed_priority: int | None = PRIORITY_FAST_READ) -> list[BlockResult]:
+        """
+        Read all readable blocks, a failing block does not fail the cycle, c.f. ModbusDevice.read_blocks(). With a
+        budget the blocks are read one after the other, also on pipelining clients.
+        """
+        if self.register_block_list is None:
+            raise RuntimeError('You must set register specification before reading registers')
+
+        blocks = [block for block in self.register_block_list if 'r' in block.mode]
+        if budget is None:
+            return await self._read_all([lambda block=block: self._read_block(block, retries, skip_cycles)
+                                         for block in blocks])
+
+        start = time.monotonic()
+        results = {}
+        for block in cycle_order(blocks, self._deferred_blocks, guaranteed_priority):
+            if self._defer_block(block, start + budget, guaranteed_priority, first=not results):
+                results[block] = stale_result(block)
+            else:
+                results[block] = await self._read_block(block, retries, skip_cycles)
+        self._finish_cycle(start, budget)
+        return [results[block] for block in blocks]
+
+    async def _read_block(self, block: RegisterBlock, retries: int, skip_cycles: int) -> BlockResult:
+        if self._skip_block(block):
+            return stale_result(block)
+
+        for attempt in range(1, retries + 2):
+            try:
+                resp = await block.read_registers_async()
+            except (ModbusException, OSError) as e:
+                error = e
+            else:
+                return self._block_read(block, resp, attempt)
+        return self._block_failed(block, error, retries + 1, skip_cycles)
+
+    async def read_registers_lazy(self) -> LazyRegisterSnapshot:
+        """
+        Read all readable blocks like "read_registers()", but decode registers only when they are accessed.
+        """
+        return LazyRegisterSnapshot(self, await self.read_raw_blocks())
+
+    async def read_raw_blocks(self) -> list[tuple[RegisterBlock, bytes | list[bool]]]:
+        """
+        Read all readable blocks without decoding them, c.f. ModbusDevice.read_raw_blocks().
+        """
+        if self.register_block_list is None:
+            raise RuntimeError('You must set register specification before reading registers')
+
+        blocks = [block for block in self.register_block_list if 'r' in block.mode]
+        responses = await self._read_all([block.read_registers_async for block in blocks])
+        return [(block, self._response_data(resp, block.register_type)) for block, resp in zip(blocks, responses)]
+
     async def read_register(self, register: str | int) -> ModbusRegister:
         """
         Read a register by name or register id. You can also read registers with mode of 'w'.
@@ -35,18 +126,25 @@ class AsyncModbusDevice(ModbusDevice):
         :param register: Name or register id of the register
         :return: ModbusRegister object
         """
-        modbus_register = self._register_lookup.get(register)
+        modbus_register = self._register_index.get(register)
         if modbus_register is None:
             raise ValueError(f'Register with name or address "{register}" not found')
 
+        if self._is_cached(modbus_register):
+            return modbus_register
+
+        resp = await self._single_flight.do(self._single_read_key(modbus_register), self._read_single_register,
+                                            modbus_register)
+        return self._parse_single_register_response(resp, modbus_register)
+
+    async def _read_single_register(self, modbus_register: ModbusRegister):
         resp = await modbus_register.block._read_function(address=modbus_register.register,
-                                                    count=modbus_register.length,
-                                                    slave=modbus_register.block.slave_id)
+                                                          count=modbus_register.length,
+                                                          slave=modbus_register.block.slave_id)
         if resp.isError():
             raise ModbusException(
                 f'Could not read {modbus_register.name} register')
-
-        return self._parse_single_register_response(resp, modbus_register)
+        return resp
 
     async def write_register(self, register: str | int, value):
         """
@@ -63,12 +161,34 @@ class AsyncModbusDevice(ModbusDevice):
             await self.client.write_registers(modbus_register.register, prepared_value, slave=modbus_register.block.slave_id)
         else:
             await self.client.write_register(modbus_register.register, prepared_value[0], slave=modbus_register.block.slave_id)
+        modbus_register.block.read_time = None
 
     def _callback_wrapper(self, callback):
         raise NotImplementedError
 
-    def schedule(self, job: Job, callback):
+    def schedule(self, job: 'Job', callback):
         raise NotImplementedError
 
     def run(self, blocking: bool = True, t_sleep: float = .1):
         raise NotImplementedError
+
+    async def run_cycles(self, interval: float, callback, budget: float = None,
+                         guaranteed_priority: int | None = PRIORITY_FAST_READ, retries: int = 0, cycles: int = None):
+        """
+        Read all blocks at a fixed rate, c.f. ModbusDevice.run_cycles(). The callback may be a coroutine function.
+        """
+        budget = interval if budget is None else budget
+        start = time.monotonic()
+        count = 0
+        while cycles is None or count < cycles:
+            result = callback(await self.read_blocks(retries=retries, budget=budget,
+                                                     guaranteed_priority=guaranteed_priority))
+            if asyncio.iscoroutine(result):
+                await result
+            count += 1
+
+            now = time.monotonic()
+            start, missed = next_cycle_start(start, interval, now)
+            self.cycle_stats.missed_cycles += missed
+            if cycles is None or count < cycles:
+                await asyncio.sleep(start - now)
@@ -5,6 +5,7 @@ from pymodbus.client import ModbusSerialClient
 from pymodbus.constants import Endian
 
 from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.serial_bus import SerialBus
 
 
 class ModbusRtuDevice(ModbusDevice):
@@ -18,7 +19,12 @@ class ModbusRtuDevice(ModbusDevice):
                  byteorder: Endian = Endian.BIG,
                  wordorder: Endian = Endian.BIG,
                  registers_spec_df=None,
-                 register_specs_file_name=None):
+                 register_specs_file_name=None,
+                 serial_bus: SerialBus = None):
+        """
+        :param serial_bus: optional, share the serial port with other devices on the same RS-485 line. The port
+            settings of the bus are used instead of the ones passed to this device.
+        """
         super().__init__(byteorder=byteorder, wordorder=wordorder,
                          register_specs_file_name=register_specs_file_name,
                          registers_spec_df=registers_spec_df)
@@ -29,8 +35,23 @@ class ModbusRtuDevice(ModbusDevice):
         self.stopbits = stopbits
         self.bytesize = bytesize
         self.timeout = timeout
+        self.serial_bus = serial_bus
+
+        if serial_bus is not None:
+            self.com_port = serial_bus.com_port
+            self.baudrate = serial_bus.baudrate
+            self.parity = serial_bus.parity
+            self.stopbits = serial_bus.stopbits
+            self.bytesize = serial_bus.bytesize
+            self.timeout = serial_bus.timeout
 
     def connect(self):
+        if self._client is None and self.serial_bus is not None:
+            self._client = self.serial_bus.client
+
+            if self.register_block_list is not None:
+                self._set_modbus_client_in_block_list()
+
         if self._client is None:
             self._client: ModbusSerialClient = ModbusSerialClient(port=self.com_port, baudrate=self.baudrate,
                                                                   parity=self.parity, stopbits=self.stopbits,
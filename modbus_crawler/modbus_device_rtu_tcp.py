@@ -0,0 +1,72 @@
+from typing import Literal
+
+from pymodbus import ModbusException
+from pymodbus.constants import Endian
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.serial_bus import SerialGateway, SerialBusClient
+
+
+class ModbusRtuOverTcpDevice(ModbusDevice):
+    """
+    RTU device behind a transparent serial to Ethernet converter, c.f. SerialGateway.
+    """
+
+    def __init__(self,
+                 ip_address: str,
+                 modbus_port: int = 502,
+                 baudrate: int = 9600,
+                 parity: Literal['E', 'O', 'N'] = 'N',
+                 stopbits: int = 1,
+                 bytesize: int = 8,
+                 timeout: int = 3,
+                 byteorder: Endian = Endian.BIG,
+                 wordorder: Endian = Endian.BIG,
+                 registers_spec_df=None,
+                 register_specs_file_name=None,
+                 gateway: SerialGateway = None):
+        """
+        :param baudrate: Baud rate of the serial line, as configured on the converter. Same for the other serial
+            parameters, they only determine the silence between frames.
+        :param gateway: optional, share the converter with other devices on the same RS-485 line. Its settings are used
+            instead of the ones passed to this device.
+        """
+        super().__init__(byteorder=byteorder, wordorder=wordorder,
+                         register_specs_file_name=register_specs_file_name,
+                         registers_spec_df=registers_spec_df)
+
+        # The device owns the gateway unless it is shared
+        self._owns_gateway = gateway is None
+        if gateway is None:
+            gateway = SerialGateway(ip_address=ip_address, port=modbus_port, baudrate=baudrate, parity=parity,
+                                    stopbits=stopbits, bytesize=bytesize, timeout=timeout)
+        self.gateway = gateway
+        self.ip_address = gateway.ip_address
+        self.modbus_port = gateway.port
+
+    def connect(self):
+        if self._client is None:
+            self._client = self.gateway.client
+
+            if self.register_block_list is not None:
+                self._set_modbus_client_in_block_list()
+
+        if not self._client.connect():
+            raise ModbusException(
+                f'Could not connect to Modbus RTU device behind gateway at IP address: {self.ip_address} and port: '
+                f'{self.modbus_port}')
+
+    def disconnect(self):
+        if self._owns_gateway:
+            self.gateway.close()
+
+    @property
+    def client(self) -> SerialBusClient:
+        return self._client
+
+    @property
+    def connected(self) -> bool:
+        if self._client is None:
+            return False
+
+        return self._client.connected
@@ -3,11 +3,17 @@ from pymodbus.constants import Endian
 from pymodbus.exceptions import ModbusException
 
 from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.request_queue import RequestQueue
 
 
 class ModbusTcpDevice(ModbusDevice):
     def __init__(self, ip_address, modbus_port, byteorder=Endian.BIG, wordorder=Endian.BIG, auto_connect=True,
-                 registers_spec_df=None, register_specs_file_name=None):
+                 registers_spec_df=None, register_specs_file_name=None, queue_requests: bool = False):
+        """
+        :param queue_requests: optional, execute all requests in a worker thread ordered by priority, so writes from
+            other threads go before the pending reads of a cycle, c.f. request_queue.py
+        """
+        self.queue_requests = queue_requests
         super(ModbusTcpDevice, self).__init__(byteorder=byteorder, wordorder=wordorder,
                                               register_specs_file_name=register_specs_file_name,
                                               registers_spec_df=registers_spec_df)
@@ -22,7 +28,12 @@ class ModbusTcpDevice(ModbusDevice):
         self.disconnect()
 
     def connect(self):
-        self._client: ModbusTcpClient = ModbusTcpClient(host=self.ip_address, port=self.modbus_port)
+        # The client (and the request queue with its worker thread) is created once, later calls reconnect through it
+        if self._client is None:
+            self._client: ModbusTcpClient = ModbusTcpClient(host=self.ip_address, port=self.modbus_port)
+            if self.queue_requests:
+                self._client = RequestQueue(self._client,
+                                            name=f'RequestQueue({self.ip_address}:{self.modbus_port})').client
 
         if not self._client.connect():
             raise ModbusException(
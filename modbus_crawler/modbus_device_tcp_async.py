@@ -3,11 +3,25 @@ from pymodbus.constants import Endian
 from pymodbus.exceptions import ModbusException
 
 from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.modbus_tcp_transport import AsyncModbusTcpTransport
+from modbus_crawler.request_queue import AsyncRequestQueue
 
 
 class AsyncModbusTcpDevice(AsyncModbusDevice):
     def __init__(self, ip_address, modbus_port, byteorder=Endian.BIG, wordorder=Endian.BIG,
-                 registers_spec_df=None, register_specs_file_name=None):
+                 registers_spec_df=None, register_specs_file_name=None, queue_requests: bool = False,
+                 native_transport: bool = False, max_in_flight: int = 1):
+        """
+        :param queue_requests: optional, execute all requests in a worker task ordered by priority, so writes go before
+            the pending reads of other tasks, c.f. request_queue.py
+        :param native_transport: optional, use the lightweight transport of modbus_tcp_transport.py instead of the
+            pymodbus client
+        :param max_in_flight: optional, number of requests the native transport sends without waiting for the
+            responses. Only for devices which handle pipelined requests, c.f. modbus_tcp_transport.py
+        """
+        self.queue_requests = queue_requests
+        self.native_transport = native_transport
+        self.max_in_flight = max_in_flight
         super().__init__(byteorder=byteorder, wordorder=wordorder,
                          register_specs_file_name=register_specs_file_name,
                          registers_spec_df=registers_spec_df)
@@ -17,7 +31,14 @@ class AsyncModbusTcpDevice(AsyncModbusDevice):
 
     async def connect(self):
         if self._client is None:
-            self._client: AsyncModbusTcpClient = AsyncModbusTcpClient(host=self.ip_address, port=self.modbus_port)
+            if self.native_transport:
+                self._client = AsyncModbusTcpTransport(host=self.ip_address, port=self.modbus_port,
+                                                       max_in_flight=self.max_in_flight)
+            else:
+                self._client: AsyncModbusTcpClient = AsyncModbusTcpClient(host=self.ip_address, port=self.modbus_port)
+            if self.queue_requests:
+                self._client = AsyncRequestQueue(
+                    self._client, name=f'AsyncRequestQueue({self.ip_address}:{self.modbus_port})').client
 
             if self.register_block_list is not None:
                 # the idea is to set the client and especially the read function once at startup (or whenever connection
@@ -33,7 +54,7 @@ class AsyncModbusTcpDevice(AsyncModbusDevice):
         self._client.close()
 
     @property
-    def client(self) -> AsyncModbusTcpClient:
+    def client(self) -> AsyncModbusTcpClient | AsyncModbusTcpTransport:
         return self._client
 
     @property
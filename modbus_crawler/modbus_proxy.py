@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import struct
+import time
+
+from pymodbus.datastore import ModbusBaseSlaveContext, ModbusServerContext
+from pymodbus.pdu import ExceptionResponse, ModbusExceptions
+from pymodbus.server import ModbusTcpServer
+
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+
+_logger = logging.getLogger(__name__)
+
+# Function codes which write to the device
+_write_function_codes = {5, 6, 15, 16}
+
+
+class _CachedSlaveContext(ModbusBaseSlaveContext):
+    """
+    Datastore of one slave id, answering reads from the register image of the proxy.
+    """
+
+    def __init__(self, proxy: 'ModbusCachingProxy', slave_id: int):
+        self._proxy = proxy
+        self._slave_id = slave_id
+        # (function code, address) -> values of single writes, which pymodbus reads back for the response
+        self._written: dict[tuple[int, int], list[int | bool]] = {}
+
+    def reset(self):
+        pass
+
+    def validate(self, fc_as_hex: int, address: int, count: int = 1) -> bool:
+        if fc_as_hex in _write_function_codes:
+            return self._proxy.write_through
+        image = self._proxy.image.get((self._slave_id, self.decode(fc_as_hex)), {})
+        return all(address + i in image for i in range(count))
+
+    def getValues(self, fc_as_hex: int, address: int, count: int = 1) -> list[int | bool]:
+        image = self._proxy.image[(self._slave_id, self.decode(fc_as_hex))]
+        return [image[address + i][0] for i in range(count)]
+
+    async def async_getValues(self, fc_as_hex: int, address: int, count: int = 1):
+        if fc_as_hex in _write_function_codes:
+            # The read back of a write reports what was written, regardless of the spec and the age of the image
+            written = self._written.pop((fc_as_hex, address), None)
+            if written is not None:
+                return written[:count]
+        image = self._proxy.image[(self._slave_id, self.decode(fc_as_hex))]
+        oldest = min(image[address + i][1] for i in range(count))
+        if time.monotonic() - oldest > self._proxy.max_age:
+            # Tell the client that the data behind the proxy is not available, instead of serving old values
+            return ExceptionResponse(fc_as_hex, ModbusExceptions.GatewayNoResponse)
+        return self.getValues(fc_as_hex, address, count)
+
+    async def async_setValues(self, fc_as_hex: int, address: int, values: list[int | bool]):
+        await self._proxy.write_through_to_device(self._slave_id, self.decode(fc_as_hex), address, values)
+        self._written[(fc_as_hex, address)] = list(values)
+
+
+class ModbusCachingProxy:
+    """
+    Modbus TCP server which polls a device once per cycle and answers any number of downstream clients from the
+    latest register image, instead of letting every client poll the device itself.
+
+    Reads of registers which are not part of the register spec are answered with "illegal address", reads of values
+    older than max_age with "gateway target failed to respond". Writes are passed through to the device.
+    """
+
+    def __init__(self, device: AsyncModbusDevice, interval: float = 1.0, max_age: float = None,
+                 host: str = '0.0.0.0', port: int = 502, write_through: bool = True):
+        """
+        :param device: Connected device with a register spec, the spec defines which registers are served
+        :param interval: Polling interval in seconds
+        :param max_age: Maximum age of served values in seconds, defaults to three polling intervals
+        :param host: Interface the server listens on
+        :param port: Port the server listens on
+        :param write_through: Pass writes of downstream clients through to the device, otherwise reject them
+        """
+        self.device = device
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else 3 * interval
+        self.write_through = write_through
+
+        # (slave id, register type) -> address -> (raw value, monotonic time of the read)
+        self.image: dict[tuple[int, str], dict[int, tuple[int | bool, float]]] = {}
+
+        slave_ids = {block.slave_id for block in device.register_block_list}
+        self._server = ModbusTcpServer(
+            ModbusServerContext(slaves={slave_id: _CachedSlaveContext(self, slave_id) for slave_id in slave_ids},
+                                single=False),
+            address=(host, port))
+        self._poll_task: asyncio.Task | None = None
+
+    async def poll_once(self):
+        """
+        Read all readable blocks of the device and update the register image.
+        """
+        raw_blocks = await self.device.read_raw_blocks()
+        timestamp = time.monotonic()
+
+        for block, data in raw_blocks:
+            if isinstance(data, list):
+                values = data[:block.block_length]
+            else:
+                values = struct.unpack(f'>{len(data) // 2}H', data)
+            image = self.image.setdefault((block.slave_id, block.register_type), {})
+            for offset, value in enumerate(values):
+                image[block.start_register + offset] = (value, timestamp)
+
+    async def write_through_to_device(self, slave_id: int, register_type: str, address: int,
+                                      values: list[int | bool]):
+        client = self.device.client
+        if register_type == 'c':
+            if len(values) == 1:
+                resp = await client.write_coil(address, values[0], slave=slave_id)
+            else:
+                resp = await client.write_coils(address, values, slave=slave_id)
+        elif len(values) == 1:
+            resp = await client.write_register(address, values[0], slave=slave_id)
+        else:
+            resp = await client.write_registers(address, values, slave=slave_id)
+
+        if resp.isError():
+            raise IOError(f'Writing {len(values)} values to address {address} of slave {slave_id} failed: {resp}')
+
+        # Written values of the served registers are served right away. Addresses outside of the register spec are
+        # not added, polling would never refresh them.
+        image = self.image.get((slave_id, register_type), {})
+        timestamp = time.monotonic()
+        for offset, value in enumerate(values):
+            if address + offset in image:
+                image[address + offset] = (value, timestamp)
+
+    async def _poll(self):
+        next_cycle = time.monotonic()
+        failing = False
+        while True:
+            # Values of failed cycles age and are reported as stale to the clients. Only the first failure of a row is
+            # logged with its traceback, so an unreachable device does not flood the log.
+            try:
+                await self.poll_once()
+                if failing:
+                    _logger.info('Polling the device behind the proxy works again')
+                failing = False
+            except Exception:
+                if failing:
+                    _logger.debug('Polling the device behind the proxy failed', exc_info=True)
+                else:
+                    _logger.exception('Polling the device behind the proxy failed')
+                failing = True
+
+            next_cycle += self.interval
+            await asyncio.sleep(max(0.0, next_cycle - time.monotonic()))
+
+    async def start(self):
+        """
+        Start listening and polling.
+        """
+        await self._server.listen()
+        self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        await self._server.shutdown()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serving
+        finally:
+            await self.stop()
@@ -1,19 +1,38 @@
 import csv
+import os
+import sys
 from typing import Union, Iterable, Optional
 
 from modbus_crawler.input_data_validation import check_optional_string, check_data_type, check_register_type, \
-    check_scaling, check_used, check_mode
+    check_scaling, check_used, check_mode, check_priority, check_bits
 from modbus_crawler.modbus_register_list_parser import ModbusRegisterListParserInterface
 from modbus_crawler.register_block import RegisterBlock, ModbusRegister
 
 
 class CsvFileParser(ModbusRegisterListParserInterface):
+    # Newest parsed register list per file, with the modification time, size and dialect it was parsed for. Devices
+    # of the same model share the metadata of one parsed spec instead of holding their own copies. An edited file
+    # replaces its old entry, and the size catches rewrites within the resolution of coarse modification times.
+    _templates: dict[str, tuple[tuple[int, int, str], list[RegisterBlock]]] = {}
+
     @staticmethod
     def get_register_list(csv_file_name, csv_dialect='excel') -> list[RegisterBlock]:
-        with open(csv_file_name, 'r') as file:
-            data = file.readlines()
+        path = os.path.abspath(csv_file_name)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size, csv_dialect)
+        entry = CsvFileParser._templates.get(path)
+
+        if entry is not None and entry[0] == stamp:
+            template = entry[1]
+        else:
+            with open(csv_file_name, 'r') as file:
+                data = file.readlines()
 
-        return CsvStringParser.get_register_list(csv_data=data, csv_dialect=csv_dialect)
+            template = CsvStringParser.get_register_list(csv_data=data, csv_dialect=csv_dialect)
+            CsvFileParser._templates[path] = (stamp, template)
+
+        # Every device gets its own blocks and registers, since they hold the values and the client
+        return [block.copy() for block in template]
 
 
 class CsvStringParser(ModbusRegisterListParserInterface):
@@ -46,9 +65,10 @@ class CsvStringParser(ModbusRegisterListParserInterface):
                 unit_id_raw = row.get('unitid', None)
                 unit_id = int(unit_id_raw) if (unit_id_raw != '' and unit_id_raw is not None) else 1
                 mode = check_mode(row['mode']) if 'mode' in row else 'r'
+                priority = check_priority(row.get('priority', None))  # Make the entire column optional
 
                 block = RegisterBlock(start_register=register_start, register_type=register_type, slave_id=unit_id,
-                                      mode=mode)
+                                      mode=mode, priority=priority)
 
             if not used:
                 # if the current block is not used later on, continue iterating with next row until you find a new block
@@ -58,14 +78,16 @@ class CsvStringParser(ModbusRegisterListParserInterface):
                 raise ValueError(f"No valid registerstart is entered at the first position: '{row['registerstart']}'")
 
             # obligatory columns
-            name = row['name'].strip()
+            # Strings are interned, identical device models then share one copy of their metadata
+            name = sys.intern(row['name'].strip())
             data_type = check_data_type(row['datatype'])
 
             # optional columns
-            unit = check_optional_string(row['unit']) if 'unit' in row else ''
-            description = check_optional_string(row['description']) if 'description' in row else ''
+            unit = sys.intern(check_optional_string(row['unit'])) if 'unit' in row else ''
+            description = sys.intern(check_optional_string(row['description'])) if 'description' in row else ''
             scaling = check_scaling(row['scaling']) if 'scaling' in row else None
-            mode = check_mode(row['mode']) if 'mode' in row else 'r'
+            mode = sys.intern(check_mode(row['mode'])) if 'mode' in row else 'r'
+            bits = check_bits(row.get('bits', None), data_type)
 
             # If the register_type is a coil or discrete input the data_type must be bool
             if block.register_type in {'c', 'd'} and data_type != 'bool':
@@ -80,9 +102,12 @@ class CsvStringParser(ModbusRegisterListParserInterface):
             # Scaling must be None for bool and string data types
             if data_type in {'bool', 'string'} and scaling is not None:
                 raise ValueError(f"Scaling must be None for data type {data_type}, but is {scaling} at register {name}")
+            if data_type.startswith('bitfield') and scaling is not None:
+                raise ValueError(f"Scaling must be None for data type {data_type}, but is {scaling} at register {name}")
 
             mr = ModbusRegister(name=name, data_type=data_type, register=block.start_register + block.block_length,
-                                unit=unit, description=description, scaling=scaling, block=block, mode=mode)
+                                unit=unit, description=description, scaling=scaling, block=block, mode=mode,
+                                bits=bits)
             # print(mr)
             block.add_register_to_list(mr)
 
@@ -0,0 +1,212 @@
+import asyncio
+import struct
+from typing import Callable
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+# MBAP header (transaction id, protocol id, length, unit id) followed by the function code and two 16 bit fields. All
+# read requests and the single writes have exactly this layout.
+_request_frame = struct.Struct('>HHHBBHH')
+# MBAP header and function code of a multiple write, followed by address, quantity and byte count
+_write_multiple_header = struct.Struct('>HHHBBHHB')
+_mbap_header = struct.Struct('>HHH')
+
+_read_function_codes = {1, 2, 3, 4}
+
+
+class RawResponse:
+    """
+    Response of the native transport. It only keeps the data bytes of the PDU, registers and bits are unpacked on access
+    for code which expects a pymodbus response. The decoder of the crawler uses the payload directly.
+    """
+    __slots__ = ('function_code', 'exception_code', 'payload', '_bits')
+
+    def __init__(self, function_code: int, payload: bytes = b'', exception_code: int = None):
+        self.function_code = function_code
+        self.exception_code = exception_code
+        self.payload = payload  # register bytes in wire order, packed bits or the echo of a write
+        self._bits = None
+
+    def isError(self) -> bool:
+        return self.exception_code is not None
+
+    @property
+    def registers(self) -> list[int]:
+        return list(struct.unpack(f'>{len(self.payload) // 2}H', self.payload))
+
+    @registers.setter
+    def registers(self, registers: list[int]):
+        self.payload = struct.pack(f'>{len(registers)}H', *registers)
+
+    @property
+    def bits(self) -> list[bool]:
+        # Padded to full bytes like the responses of pymodbus
+        if self._bits is None:
+            width = 8 * len(self.payload)
+            self._bits = [bit == '1' for bit in format(int.from_bytes(self.payload, 'little'), f'0{width}b')[::-1]]
+        return self._bits
+
+    @bits.setter
+    def bits(self, bits: list[bool]):
+        self._bits = bits
+
+    def __repr__(self):
+        if self.isError():
+            return f'RawResponse(function_code={self.function_code}, exception_code={self.exception_code})'
+        return f'RawResponse(function_code={self.function_code}, {len(self.payload)} bytes)'
+
+
+class _ModbusTcpProtocol(asyncio.Protocol):
+    def __init__(self):
+        self.transport: asyncio.Transport | None = None
+        self.pending: dict[int, asyncio.Future] = {}  # transaction id -> future of the response
+        self._buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def connection_lost(self, exc: Exception | None):
+        self.transport = None
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionException(f'Connection lost: {exc}'))
+        self.pending.clear()
+
+    def data_received(self, data: bytes):
+        buffer = self._buffer
+        buffer += data
+
+        # A segment may hold several frames or only a part of one
+        while len(buffer) >= 8:
+            transaction_id, _, length = _mbap_header.unpack_from(buffer)
+            end = 6 + length
+            if len(buffer) < end:
+                return
+
+            future = self.pending.pop(transaction_id, None)
+            if future is not None and not future.done():
+                function_code = buffer[7]
+                if function_code & 0x80:
+                    future.set_result(RawResponse(function_code & 0x7F, exception_code=buffer[8]))
+                elif function_code in _read_function_codes:
+                    future.set_result(RawResponse(function_code, bytes(buffer[9:9 + buffer[8]])))
+                else:
+                    future.set_result(RawResponse(function_code, bytes(buffer[8:end])))
+            del buffer[:end]
+
+
+class AsyncModbusTcpTransport:
+    """
+    Minimal Modbus TCP client on top of an asyncio protocol, with the methods of the pymodbus client which the crawler
+    uses.
+
+    Requests are framed with precompiled structs, responses are matched to their requests by transaction id and
+    returned as raw bytes. Up to max_in_flight requests share one connection, async devices send all block reads of a
+    cycle at once on such a client (c.f. pipelining). Many devices and also the pymodbus server answer only one request
+    at a time, so this is opt-in.
+    """
+
+    def __init__(self, host: str, port: int = 502, timeout: float = 3.0, max_in_flight: int = 1):
+        """
+        :param host: Host name or ip address of the device
+        :param port: Modbus TCP port
+        :param timeout: Seconds to wait for the connection and for every response
+        :param max_in_flight: Maximum number of requests sent before their response arrived
+        """
+        if max_in_flight < 1:
+            raise ValueError(f'max_in_flight must be at least 1, not {max_in_flight}')
+
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._protocol: _ModbusTcpProtocol | None = None
+        self._transaction_id = 0
+
+    @property
+    def pipelining(self) -> bool:
+        return self.max_in_flight > 1
+
+    async def connect(self) -> bool:
+        if self.connected:
+            return True
+        try:
+            _, self._protocol = await asyncio.wait_for(
+                asyncio.get_running_loop().create_connection(_ModbusTcpProtocol, self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        return True
+
+    def close(self):
+        if self.connected:
+            self._protocol.transport.close()  # fails the pending requests, c.f. connection_lost()
+        self._protocol = None
+
+    @property
+    def connected(self) -> bool:
+        return self._protocol is not None and self._protocol.transport is not None
+
+    def _next_transaction_id(self) -> int:
+        pending = self._protocol.pending
+        transaction_id = self._transaction_id
+        while True:
+            transaction_id = (transaction_id + 1) & 0xFFFF
+            if transaction_id not in pending:
+                self._transaction_id = transaction_id
+                return transaction_id
+
+    async def _transact(self, frame: Callable[[int], bytes]) -> RawResponse:
+        """
+        :param frame: Function which packs the request for the given transaction id
+        """
+        async with self._in_flight:
+            if not self.connected:
+                raise ConnectionException(f'Not connected to Modbus device at {self.host}:{self.port}')
+
+            transaction_id = self._next_transaction_id()
+            future = asyncio.get_running_loop().create_future()
+            self._protocol.pending[transaction_id] = future
+            self._protocol.transport.write(frame(transaction_id))
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                if self._protocol is not None:
+                    self._protocol.pending.pop(transaction_id, None)
+                raise ModbusIOException(f'No response from {self.host}:{self.port} within {self.timeout} s')
+
+    async def _request(self, slave: int, function_code: int, first: int, second: int) -> RawResponse:
+        return await self._transact(
+            lambda transaction_id: _request_frame.pack(transaction_id, 0, 6, slave, function_code, first, second))
+
+    async def _write_multiple(self, slave: int, function_code: int, address: int, quantity: int,
+                              data: bytes) -> RawResponse:
+        return await self._transact(
+            lambda transaction_id: _write_multiple_header.pack(transaction_id, 0, 7 + len(data), slave, function_code,
+                                                               address, quantity, len(data)) + data)
+
+    async def read_coils(self, address: int, count: int = 1, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 1, address, count)
+
+    async def read_discrete_inputs(self, address: int, count: int = 1, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 2, address, count)
+
+    async def read_holding_registers(self, address: int, count: int = 1, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 3, address, count)
+
+    async def read_input_registers(self, address: int, count: int = 1, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 4, address, count)
+
+    async def write_coil(self, address: int, value: bool, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 5, address, 0xFF00 if value else 0)
+
+    async def write_register(self, address: int, value: int, slave: int = 1) -> RawResponse:
+        return await self._request(slave, 6, address, value)
+
+    async def write_coils(self, address: int, values: list[bool], slave: int = 1) -> RawResponse:
+        packed = sum(1 << i for i, value in enumerate(values) if value)
+        return await self._write_multiple(slave, 15, address, len(values),
+                                          packed.to_bytes((len(values) + 7) // 8, 'little'))
+
+    async def write_registers(self, address: int, values: list[int], slave: int = 1) -> RawResponse:
+        return await self._write_multiple(slave, 16, address, len(values), struct.pack(f'>{len(values)}H', *values))
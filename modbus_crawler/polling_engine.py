@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Hashable
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.sharded_crawler import DeviceReading
+
+
+def serial_port_of(device: ModbusDevice) -> Hashable | None:
+    """
+    The serial line a device is attached to (SerialBus, SerialGateway or com port), None for Modbus TCP devices.
+    """
+    port = getattr(device, 'serial_bus', None) or getattr(device, 'gateway', None)
+    if port is None and getattr(device, 'com_port', None) is not None:
+        port = ('com_port', device.com_port)
+    return port
+
+
+@dataclass(eq=False)
+class _PolledDevice:
+    name: str
+    device: ModbusDevice
+    interval: float
+    next_due: float
+    port: Hashable | None
+    running: bool = False
+    missed_cycles: int = 0
+
+
+class ThreadedPollingEngine:
+    """
+    Polls many synchronous devices with a bounded pool of worker threads and puts all readings into one queue.
+
+    Every device is read at a fixed rate. A device never has more than one cycle in flight, a cycle which is still
+    running when the next one is due makes the device skip that cycle. Devices on the same serial line are never read
+    at the same time, the one which is due the longest goes first.
+    """
+
+    def __init__(self, workers: int = 8):
+        """
+        :param workers: Number of worker threads, i.e. the maximum number of cycles in flight
+        """
+        self.workers = workers
+        self._results = queue.Queue()
+        self._devices: dict[str, _PolledDevice] = {}
+        self._busy_ports = set()
+        self._condition = threading.Condition()
+        self._executor: ThreadPoolExecutor | None = None
+        self._scheduler: threading.Thread | None = None
+        self._stopped = False
+
+    def add_device(self, name: str, device: ModbusDevice, interval: float = 1.0):
+        """
+        :param name: Unique name of the device, used in the readings
+        :param device: Synchronous device with a register spec. It is connected by the engine if it is not.
+        :param interval: Seconds between the starts of two cycles
+        """
+        with self._condition:
+            if name in self._devices:
+                raise ValueError(f'Device {name} is already polled')
+            self._devices[name] = _PolledDevice(name=name, device=device, interval=interval,
+                                                next_due=time.monotonic(), port=serial_port_of(device))
+            self._condition.notify()
+
+    def remove_device(self, name: str):
+        """
+        Stop polling a device, a cycle in flight is finished.
+        """
+        with self._condition:
+            del self._devices[name]
+
+    def missed_cycles(self, name: str) -> int:
+        """
+        Number of cycles the device skipped because its previous cycle (or another device on its serial line) was
+        still running.
+        """
+        return self._devices[name].missed_cycles
+
+    def start(self):
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ThreadedPollingEngine')
+        self._scheduler = threading.Thread(target=self._schedule, name='ThreadedPollingEngine', daemon=True)
+        self._scheduler.start()
+
+    def stop(self, timeout: float = 5):
+        """
+        Stop scheduling cycles and wait for the cycles in flight. Devices stay connected.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._scheduler is not None:
+            self._scheduler.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._scheduler = self._executor = None
+
+    def get_reading(self, timeout: float = None) -> DeviceReading | None:
+        """
+        Next reading of any device, or None if there is none within the timeout.
+        """
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _schedule(self):
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                wait = None
+                for entry in sorted(self._devices.values(), key=lambda entry: entry.next_due):
+                    if entry.next_due > now:
+                        wait = entry.next_due - now if wait is None else min(wait, entry.next_due - now)
+                        continue
+                    if entry.running or entry.port in self._busy_ports:
+                        continue  # started (or skipped) when the running cycle is done
+                    self._start_cycle(entry, now)
+                self._condition.wait(wait)
+
+    def _start_cycle(self, entry: _PolledDevice, now: float):
+        # Stay on the grid of the first start, cycles which can not be started in time are skipped
+        entry.next_due += entry.interval
+        if entry.next_due <= now:
+            missed = int((now - entry.next_due) // entry.interval) + 1
+            entry.missed_cycles += missed
+            entry.next_due += missed * entry.interval
+
+        entry.running = True
+        if entry.port is not None:
+            self._busy_ports.add(entry.port)
+        self._executor.submit(self._cycle, entry)
+
+    def _cycle(self, entry: _PolledDevice):
+        try:
+            if not entry.device.connected:
+                entry.device.connect()
+            values = entry.device.read_registers_as_dict()
+            self._results.put(DeviceReading(device=entry.name, timestamp=time.time(), values=values))
+        except Exception as e:
+            self._results.put(DeviceReading(device=entry.name, timestamp=time.time(), error=repr(e)))
+        finally:
+            with self._condition:
+                entry.running = False
+                self._busy_ports.discard(entry.port)
+                self._condition.notify()
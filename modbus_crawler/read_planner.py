@@ -0,0 +1,84 @@
+from pymodbus.exceptions import ModbusException
+
+from modbus_crawler.register_block import ModbusRegister, max_read_count
+
+# Registers which are not requested but lie between two requested ones are read anyway, if the gap is at most this
+# long. One more register in a response is much cheaper than one more round trip.
+default_max_gap = 16
+
+
+class ReadRequest:
+    """
+    A single Modbus read request covering a set of registers of the same slave and register type. Unlike a
+    RegisterBlock the registers do not have to be contiguous and may belong to different blocks.
+    """
+
+    def __init__(self, start_register: int, slave_id: int, register_type: str, read_function):
+        self.start_register = start_register
+        self.slave_id = slave_id
+        self.register_type = register_type
+        self.count = 0
+        self.registers = list[ModbusRegister]()
+
+        self._read_function = read_function
+
+    def add_register(self, modbus_register: ModbusRegister):
+        self.registers.append(modbus_register)
+        self.count = max(self.count, modbus_register.register + modbus_register.length - self.start_register)
+
+    def offset(self, modbus_register: ModbusRegister) -> int:
+        return modbus_register.register - self.start_register
+
+    def read_registers(self):
+        if self._read_function is None:
+            raise RuntimeError('you have to call set_modbus_device() first')
+
+        resp = self._read_function(address=self.start_register, count=self.count, slave=self.slave_id)
+        if resp.isError():
+            raise ModbusException(f'Could not read {self.count} registers, starting from {self.start_register} '
+                                  f'with slave id {self.slave_id}: {resp}')
+        return resp
+
+    async def read_registers_async(self):
+        if self._read_function is None:
+            raise RuntimeError('you have to call set_modbus_device() first')
+
+        resp = await self._read_function(address=self.start_register, count=self.count, slave=self.slave_id)
+        if resp.isError():
+            raise ModbusException(f'Could not read {self.count} registers, starting from {self.start_register} '
+                                  f'with slave id {self.slave_id}: {resp}')
+        return resp
+
+
+def plan_reads(registers: list[ModbusRegister], max_gap: int = default_max_gap) -> list[ReadRequest]:
+    """
+    Compute the minimal list of read requests which covers the given registers.
+
+    Registers are grouped by slave id and register type of their block, sorted by address and merged into one request
+    as long as the gap to the previous register is at most max_gap and the request fits into a single PDU.
+
+    :param registers: Registers to read, duplicates are read once
+    :param max_gap: Maximum number of unrequested registers (or bits) between two registers of one request
+    :return: Read requests in order of slave id, register type and address
+    """
+    groups: dict[tuple[int, str], dict[int, ModbusRegister]] = {}
+    for register in registers:
+        block = register.block
+        if block is None:
+            raise ValueError(f'Register {register.name} does not belong to a register block')
+        groups.setdefault((block.slave_id, block.register_type), {})[id(register)] = register
+
+    requests = list[ReadRequest]()
+    for (slave_id, register_type), group in sorted(groups.items()):
+        request = None
+        for register in sorted(group.values(), key=lambda r: (r.register, r.length)):
+            end = register.register + register.length
+            if (request is None
+                    or register.register - (request.start_register + request.count) > max_gap
+                    or end - request.start_register > max_read_count[register_type]):
+                request = ReadRequest(start_register=register.register, slave_id=slave_id,
+                                      register_type=register_type, read_function=register.block._read_function)
+                requests.append(request)
+            request.add_register(register)
+
+    return requests
@@ -1,18 +1,28 @@
 from dataclasses import dataclass
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable
 
-from pymodbus.client import ModbusBaseClient
-from pymodbus.exceptions import ModbusException
-
+from modbus_crawler.bitfield import BitDefinition, default_bits
 from modbus_crawler.input_data_validation import data_types, register_types
+from modbus_crawler.request_queue import RequestQueueClient, PRIORITY_READ
+
+# Parsing and validating specs does not need pymodbus, it is only imported once there is a client
+if TYPE_CHECKING:
+    from pymodbus.client import ModbusBaseClient
 
 # Number of registers necessary to represent a given data type. Names must match an entry in 'data_type_lookup' in '
 # 'input_data_validation.py'
 register_span = {'uint16': 1, 'int16': 1, 'uint32': 2, 'int32': 2,
                  'uint64': 4, 'int64': 4,
-                 'float16': 1, 'float32': 2, 'float64': 4, 'bool': 1, **{f'string{i}': i for i in range(129)}
+                 'float16': 1, 'float32': 2, 'float64': 4, 'bool': 1, 'bitfield16': 1, 'bitfield32': 2, **{f'string{i}': i for i in range(129)}
                  }
 
-@dataclass(repr=True)
+# Maximum number of registers (or bits) per read request, c.f. Modbus application protocol specification
+max_read_count = {'i': 125, 'h': 125, 'c': 2000, 'd': 2000}
+
+
+# Slotted to keep the per register overhead small, fleets can have hundreds of thousands of registers
+@dataclass(repr=True, slots=True)
 class ModbusRegister:
     name: str
     data_type: str
@@ -23,6 +33,7 @@ class ModbusRegister:
     block: 'RegisterBlock' = None
     mode: str = 'r'  # read or write or readwrite
     scaling: float | None = None  # raw register values will be multiplied by this before setting value attribute
+    bits: tuple[BitDefinition, ...] | None = None  # named bits of bitfield data types, c.f. bitfield.py
 
     # Often fixed point values are stored in a scaled int register, which is an easy way to store comma values in one single register
     # Or the register gives Ws, but we want kWh
@@ -30,6 +41,8 @@ class ModbusRegister:
     def __post_init__(self):
         if self.data_type not in data_types:
             raise ValueError(f'data type must be one of {data_types}, but is {self.data_type}')
+        if self.bits is None and self.data_type in default_bits:
+            self.bits = default_bits[self.data_type]
 
     @property
     def length(self) -> int:
@@ -43,12 +56,18 @@ class ModbusRegister:
 
 
 class RegisterBlock:
-    def __init__(self, start_register: int, slave_id: int = 1, register_type: str = 'i', mode: str = 'r'):
+    __slots__ = ('start_register', 'slave_id', 'register_type', 'mode', '_block_length', '_register_list',
+                 'priority', 'read_time', 'last_good_read_time', '_read_function', '_bit_getter')
+
+    def __init__(self, start_register: int, slave_id: int = 1, register_type: str = 'i', mode: str = 'r',
+                 priority: int = PRIORITY_READ):
         """
 
         :param start_register:
         :param slave_id: optional, default=1
         :param register_type: type of registers, e.g. input register or holding register (for the whole block since a block is read with single read command
+        :param priority: optional, priority of the reads of this block if the device queues its requests, c.f.
+            request_queue.py. Takes effect when the device (re)connects.
         """
         self.start_register = start_register
         self.slave_id = slave_id
@@ -57,21 +76,72 @@ class RegisterBlock:
             raise ValueError(f'register type must be one of {register_types}, but is {register_type}')
         self.register_type = register_type
         self.mode = mode
+        self.priority = priority
+        # time.monotonic() of the last decoded read of the whole block, reset by writes since the values are outdated
+        # then. It tells whether the values can be served from the read cache.
+        self.read_time: float | None = None
+        # time.monotonic() of the last decoded read of the whole block, kept by writes. It tells how old the values are.
+        self.last_good_read_time: float | None = None
 
         self._block_length = 0
         self._register_list = list[ModbusRegister]()
 
         self._read_function = None
+        self._bit_getter: Callable[[list[bool]], tuple[bool, ...]] | None = None
 
     def add_register_to_list(self, modbus_register: ModbusRegister):
         self._register_list.append(modbus_register)
         self._block_length += modbus_register.length
+        self._bit_getter = None
+
+    def bit_values(self, bits: list[bool]) -> tuple[bool, ...]:
+        """
+        Values of all registers of a coil or discrete input block, in the order of the register list.
+
+        :param bits: Bits of a response for the whole block
+        """
+        if self._bit_getter is None:
+            offsets = [register.register - self.start_register for register in self._register_list]
+            if len(offsets) > 1 and all(register.length == 1 for register in self._register_list):
+                # One C level call picks all bits out of the response
+                self._bit_getter = itemgetter(*offsets)
+            else:
+                lengths = [register.length for register in self._register_list]
+                self._bit_getter = lambda data: tuple(any(data[offset:offset + length])
+                                                      for offset, length in zip(offsets, lengths))
+        return self._bit_getter(bits)
 
     @property
     def register_list(self) -> list[ModbusRegister]:
         return self._register_list
 
-    def set_modbus_device(self, modbus_client: ModbusBaseClient):
+    def copy(self) -> 'RegisterBlock':
+        """
+        Copy of the block with fresh registers, which share all metadata (names, units, descriptions, ...) with the
+        registers of this block. The copy is not bound to a client.
+        """
+        block = RegisterBlock(start_register=self.start_register, slave_id=self.slave_id,
+                              register_type=self.register_type, mode=self.mode, priority=self.priority)
+        for register in self._register_list:
+            block.add_register_to_list(ModbusRegister(name=register.name, data_type=register.data_type,
+                                                      register=register.register, unit=register.unit,
+                                                      description=register.description, block=block,
+                                                      mode=register.mode, scaling=register.scaling,
+                                                      bits=register.bits))
+        return block
+
+    def signature(self) -> tuple:
+        """
+        Everything which defines the block in a register specification, blocks with equal signatures are exchangeable.
+        """
+        return (self.start_register, self.slave_id, self.register_type, self.mode, self.priority,
+                tuple((register.name, register.data_type, register.register, register.unit, register.description,
+                       register.mode, register.scaling, register.bits) for register in self._register_list))
+
+    def set_modbus_device(self, modbus_client: 'ModbusBaseClient'):
+        if isinstance(modbus_client, RequestQueueClient):
+            modbus_client = modbus_client.for_priority(self.priority)
+
         if self.register_type == 'i':
             self._read_function = modbus_client.read_input_registers
         elif self.register_type == 'h':
@@ -81,29 +151,68 @@ class RegisterBlock:
         else:
             self._read_function = modbus_client.read_discrete_inputs
 
+    def _requests(self) -> list[tuple[int, int]]:
+        """
+        Address and count of the requests for the whole block. Blocks longer than one PDU are read in several requests,
+        each ends before the first register which does not fit into it, so no value is torn across two requests. Only
+        a register longer than a PDU (e.g. string128) has to be split.
+        """
+        step = max_read_count[self.register_type]
+        end = self.start_register + self._block_length
+        requests = list[tuple[int, int]]()
+        address = self.start_register
+        for register in self._register_list:
+            register_end = register.register + register.length
+            if register_end - address > step and register.register > address:
+                requests.append((address, register.register - address))
+                address = register.register
+            while register_end - address > step:
+                requests.append((address, step))
+                address += step
+        if address < end or not requests:
+            requests.append((address, end - address))
+        return requests
+
+    def _check_response(self, resp, address: int, count: int):
+        if resp.isError():
+            from modbus_crawler.block_quality import BlockReadError
+            raise BlockReadError(
+                f'Could not read {count} registers, starting from {address} with slave id {self.slave_id}: {resp}',
+                exception_code=getattr(resp, 'exception_code', None))
+
+    def _merge_response(self, resp, part, received: int, count: int):
+        """
+        Append the values of a further response of the block to the first one.
+        """
+        if self.register_type in {'c', 'd'}:
+            # Bits are padded to full bytes, cut the padding before appending
+            resp.bits = resp.bits[:received] + part.bits[:count]
+        else:
+            resp.registers = resp.registers + part.registers
+        return resp
+
     def read_registers(self):
         if self._read_function is None:
             raise RuntimeError('you have to call set_modbus_device() first')
 
-        resp = self._read_function(address=self.start_register,
-                                   count=self._block_length,
-                                   slave=self.slave_id)
-        if resp.isError():
-            raise ModbusException(
-                f'Could not read {self._block_length} registers, starting from {self.start_register} with slave id {self.slave_id}: {resp}')
+        resp, received = None, 0
+        for address, count in self._requests():
+            part = self._read_function(address=address, count=count, slave=self.slave_id)
+            self._check_response(part, address, count)
+            resp = part if resp is None else self._merge_response(resp, part, received, count)
+            received += count
         return resp
 
     async def read_registers_async(self):
         if self._read_function is None:
             raise RuntimeError('you have to call set_modbus_device() first')
 
-        resp = await self._read_function(address=self.start_register,
-                                         count=self._block_length,
-                                         slave=self.slave_id)
-        if resp.isError():
-            raise ModbusException(
-                f'Could not read {self._block_length} registers, starting from {self.start_register} with slave id {self.slave_id}')
-
+        resp, received = None, 0
+        for address, count in self._requests():
+            part = await self._read_function(address=address, count=count, slave=self.slave_id)
+            self._check_response(part, address, count)
+            resp = part if resp is None else self._merge_response(resp, part, received, count)
+            received += count
         return resp
 
     @property
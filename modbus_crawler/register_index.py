@@ -0,0 +1,132 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable
+
+from modbus_crawler.register_block import RegisterBlock, ModbusRegister
+
+# Keys accepted by RegisterIndex.resolve(): a name, an address, a range of addresses or any of the two latter
+# qualified by slave id and register type, e.g. (1, 'h', 100) or (1, 'h', range(100, 120))
+RegisterKey = str | int | range | tuple[int, str, int | range]
+
+
+class RegisterIndex:
+    """
+    Lookup structure for the registers of a register specification, built once per specification.
+
+    Names are kept in a dictionary. Addresses are kept in a sorted interval index per (slave id, register type), so
+    holding register 100 and input register 100, or the same address on two slaves, do not collide, and the register
+    covering any address inside a multi register value can be found in O(log n).
+    """
+
+    def __init__(self, register_block_list: list[RegisterBlock]):
+        self._names: dict[str, ModbusRegister] = {}
+        groups: dict[tuple[int, str], list[ModbusRegister]] = {}
+
+        for block in register_block_list:
+            for register in block.register_list:
+                self._names[register.name] = register
+                groups.setdefault((block.slave_id, block.register_type), []).append(register)
+
+        self._starts: dict[tuple[int, str], list[int]] = {}
+        self._registers: dict[tuple[int, str], list[ModbusRegister]] = {}
+        self._max_length: dict[tuple[int, str], int] = {}
+        for group, registers in groups.items():
+            registers.sort(key=lambda r: r.register)
+            self._registers[group] = registers
+            self._starts[group] = [register.register for register in registers]
+            self._max_length[group] = max(register.length for register in registers)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, key: str | int) -> ModbusRegister:
+        register = self.get(key)
+        if register is None:
+            raise KeyError(key)
+        return register
+
+    def get(self, key: str | int | tuple[int, str, int], default: ModbusRegister = None) -> ModbusRegister | None:
+        """
+        Register by name, by start address or by (slave id, register type, start address).
+
+        A bare address is only accepted if it is unique across slaves and register types.
+        """
+        if isinstance(key, str):
+            return self._names.get(key, default)
+
+        if isinstance(key, tuple):
+            slave_id, register_type, address = key
+            register = self.find(address, slave_id=slave_id, register_type=register_type)
+            return register if register is not None and register.register == address else default
+
+        matches = [register for group in self._registers
+                   if (register := self.find(key, *group)) is not None and register.register == key]
+        if len(matches) > 1:
+            raise ValueError(f'Address {key} is ambiguous, use (slave id, register type, address) instead')
+        return matches[0] if matches else default
+
+    def by_name(self, name: str) -> ModbusRegister | None:
+        return self._names.get(name)
+
+    def groups(self) -> list[tuple[int, str]]:
+        """
+        All (slave id, register type) combinations of the specification.
+        """
+        return list(self._registers)
+
+    def find(self, address: int, slave_id: int, register_type: str) -> ModbusRegister | None:
+        """
+        Register which covers the address, i.e. the address is its start address or lies inside a multi register value.
+        """
+        registers = self.overlapping(address, address + 1, slave_id=slave_id, register_type=register_type)
+        return registers[-1] if registers else None
+
+    def overlapping(self, start: int, end: int, slave_id: int, register_type: str) -> list[ModbusRegister]:
+        """
+        Registers which cover at least one address of [start, end), sorted by address.
+        """
+        group = (slave_id, register_type)
+        starts = self._starts.get(group)
+        if starts is None:
+            return []
+
+        registers = self._registers[group]
+        # Registers starting up to the longest register length before start may still reach into the range
+        low = bisect_left(starts, start - self._max_length[group] + 1)
+        high = bisect_left(starts, end)
+        return [register for register in registers[low:high] if register.register + register.length > start]
+
+    def starting_in(self, addresses: range, slave_id: int = None, register_type: str = None) -> list[ModbusRegister]:
+        """
+        Registers whose start address lies in the range, optionally limited to one slave and register type.
+        """
+        result = []
+        for group, starts in self._starts.items():
+            if (slave_id is not None and group[0] != slave_id) or (register_type is not None and group[1] != register_type):
+                continue
+            low = bisect_left(starts, addresses.start)
+            high = bisect_right(starts, addresses.stop - 1)
+            result.extend(register for register in self._registers[group][low:high] if register.register in addresses)
+        return result
+
+    def resolve(self, keys: Iterable[RegisterKey]) -> list[ModbusRegister]:
+        """
+        Registers for a list of keys, in the given order and without duplicates.
+
+        :raises ValueError: if a name or address is not found or an address is ambiguous
+        """
+        registers = {}
+        for key in keys:
+            if isinstance(key, range):
+                found = self.starting_in(key)
+            elif isinstance(key, tuple) and isinstance(key[2], range):
+                found = self.starting_in(key[2], slave_id=key[0], register_type=key[1])
+            else:
+                register = self.get(key)
+                if register is None:
+                    raise ValueError(f'Register with name or address "{key}" not found')
+                found = [register]
+
+            for register in found:
+                registers.setdefault(id(register), register)
+
+        return list(registers.values())
@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import io
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from pymodbus.client.base import ModbusBaseClient
+from pymodbus.pdu import ModbusExceptions
+
+from modbus_crawler.register_block import max_read_count
+
+# Exception codes a gateway answers with if the unit behind it does not exist or does not respond
+_absent_unit_codes = {ModbusExceptions.GatewayPathUnavailable, ModbusExceptions.GatewayNoResponse}
+
+_read_function_names = {'h': 'read_holding_registers', 'i': 'read_input_registers', 'c': 'read_coils',
+                        'd': 'read_discrete_inputs'}
+
+
+@dataclass(frozen=True)
+class RegisterRange:
+    """
+    Contiguous range of addresses which can be read in one go.
+    """
+    slave_id: int
+    register_type: str
+    start_register: int
+    count: int
+
+    @property
+    def end_register(self) -> int:
+        return self.start_register + self.count
+
+
+class _RateLimiter:
+    """
+    Spaces requests evenly, so that at most requests_per_second requests are sent.
+    """
+
+    def __init__(self, requests_per_second: float = None):
+        self._period = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self._period:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._period
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+class RegisterScanner:
+    """
+    Discovers the unit ids and the readable address ranges of an unknown device.
+
+    The address space is probed with reads of the maximum size, so fully readable areas cost a single request. Within
+    a read answered with an exception response every unreadable address costs one request, while the end of a
+    readable range is found by doubling the read length and bisecting on the exception responses.
+    """
+
+    def __init__(self, client: ModbusBaseClient, register_types: str = 'hicd', address_range: range = range(0x10000),
+                 requests_per_second: float = None, concurrency: int = 4):
+        """
+        :param client: Connected async pymodbus client, e.g. "device.client" of an async device
+        :param register_types: Register types to scan, any of 'h', 'i', 'c' and 'd'
+        :param address_range: Addresses to scan
+        :param requests_per_second: Maximum request rate, unlimited if None
+        :param concurrency: Maximum number of requests in flight, use 1 for serial lines
+        """
+        for register_type in register_types:
+            if register_type not in _read_function_names:
+                raise ValueError(f'Invalid register type: {register_type}')
+
+        self.client = client
+        self.register_types = register_types
+        self.address_range = address_range
+        self.requests = 0  # Number of requests sent so far
+
+        self._rate_limiter = _RateLimiter(requests_per_second)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _read(self, slave_id: int, register_type: str, address: int, count: int):
+        """
+        :return: The response, or None if the unit did not answer at all
+        """
+        async with self._semaphore:
+            await self._rate_limiter.wait()
+            self.requests += 1
+            try:
+                resp = await getattr(self.client, _read_function_names[register_type])(address, count=count,
+                                                                                        slave=slave_id)
+            except Exception:  # Lost connections and repeated timeouts surface as exceptions
+                return None
+
+            # pymodbus answers a single timeout with an exception response without exception code
+            if resp.isError() and not getattr(resp, 'exception_code', None):
+                return None
+            return resp
+
+    async def probe_unit(self, slave_id: int) -> bool:
+        """
+        Check whether a unit answers at all. An exception response counts as an answer, unless it is sent by a gateway
+        on behalf of a missing unit.
+        """
+        for register_type in self.register_types:
+            resp = await self._read(slave_id, register_type, self.address_range.start, 1)
+            if resp is None:
+                continue
+            if not resp.isError() or getattr(resp, 'exception_code', None) not in _absent_unit_codes:
+                return True
+        return False
+
+    async def find_unit_ids(self, unit_ids: Iterable[int] = range(1, 248)) -> list[int]:
+        """
+        Probe the given unit ids concurrently.
+
+        :return: Unit ids which answered, sorted
+        """
+        unit_ids = list(unit_ids)
+        present = await asyncio.gather(*(self.probe_unit(slave_id) for slave_id in unit_ids))
+        return [slave_id for slave_id, answered in zip(unit_ids, present) if answered]
+
+    async def _readable(self, slave_id: int, register_type: str, address: int, count: int) -> bool:
+        resp = await self._read(slave_id, register_type, address, count)
+        return resp is not None and not resp.isError()
+
+    async def _scan_chunk(self, slave_id: int, register_type: str, address: int, count: int) -> list[RegisterRange]:
+        if await self._readable(slave_id, register_type, address, count):
+            return [RegisterRange(slave_id, register_type, address, count)]
+
+        ranges = list[RegisterRange]()
+        end = address + count
+        while address < end:
+            if not await self._readable(slave_id, register_type, address, 1):
+                address += 1
+                continue
+
+            # Double the length of the read until it fails, then bisect between the last good and the first bad length
+            good, length = 1, 2
+            while length <= end - address and await self._readable(slave_id, register_type, address, length):
+                good, length = length, 2 * length
+            bad = min(length, end - address + 1)
+            while bad - good > 1:
+                middle = (good + bad) // 2
+                if await self._readable(slave_id, register_type, address, middle):
+                    good = middle
+                else:
+                    bad = middle
+
+            ranges.append(RegisterRange(slave_id, register_type, address, good))
+            address += good + 1  # The address after the range made the longer read fail
+        return ranges
+
+    async def scan_unit(self, slave_id: int) -> list[RegisterRange]:
+        """
+        Find the readable ranges of all register types of one unit.
+
+        :return: Ranges in order of register type and address, adjacent ranges are merged
+        """
+        chunks = list[tuple[str, int, int]]()
+        for register_type in self.register_types:
+            step = max_read_count[register_type]
+            for address in range(self.address_range.start, self.address_range.stop, step):
+                chunks.append((register_type, address, min(step, self.address_range.stop - address)))
+
+        results = await asyncio.gather(*(self._scan_chunk(slave_id, *chunk) for chunk in chunks))
+
+        ranges = list[RegisterRange]()
+        for found in results:
+            for found_range in found:
+                previous = ranges[-1] if ranges else None
+                if (previous is not None and previous.register_type == found_range.register_type
+                        and previous.end_register == found_range.start_register):
+                    ranges[-1] = RegisterRange(slave_id, previous.register_type, previous.start_register,
+                                               previous.count + found_range.count)
+                else:
+                    ranges.append(found_range)
+        return ranges
+
+    async def scan(self, unit_ids: Iterable[int] = range(1, 248)) -> list[RegisterRange]:
+        """
+        Find the units which answer and scan all of them.
+
+        :param unit_ids: Unit ids to probe, pass a single id to skip probing of the others
+        :return: Readable ranges of all units
+        """
+        ranges = list[RegisterRange]()
+        for slave_id in await self.find_unit_ids(unit_ids):
+            ranges.extend(await self.scan_unit(slave_id))
+        return ranges
+
+
+def ranges_to_csv(ranges: Iterable[RegisterRange]) -> str:
+    """
+    Draft register spec for CsvStringParser. Registers are named after their address and typed as uint16 (bool for coils
+    and discrete inputs), ranges longer than a single read are split into several blocks.
+
+    :param ranges: Ranges found by a RegisterScanner
+    :return: csv text
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(['Register_start', 'Register_type', 'Data_type', 'Name', 'Unit_id', 'mode'])
+
+    for register_range in ranges:
+        register_type = register_range.register_type
+        data_type = 'bool' if register_type in {'c', 'd'} else 'uint16'
+        for address in range(register_range.start_register, register_range.end_register):
+            name = f'{register_type}_{register_range.slave_id}_{address}'
+            if (address - register_range.start_register) % max_read_count[register_type] == 0:
+                writer.writerow([address, register_type, data_type, name, register_range.slave_id, 'r'])
+            else:
+                writer.writerow(['-', '', data_type, name, '', ''])
+
+    return output.getvalue()
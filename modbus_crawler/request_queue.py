@@ -0,0 +1,256 @@
+import asyncio
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+# Transactions with a lower number are put on the wire first. Writes are usually setpoints and must not wait for a
+# whole polling cycle, fast reads (e.g. measurements used for control) go before the slow bulk of the polling reads.
+PRIORITY_WRITE = 0
+PRIORITY_FAST_READ = 5
+PRIORITY_READ = 10
+
+_PRIORITY_STOP = 1 << 30  # Sentinel priority, everything queued before the stop request is still processed
+
+
+class RequestQueue:
+    """
+    Executes the transactions of a synchronous pymodbus client one after another in a worker thread, ordered by
+    priority and by arrival within the same priority.
+
+    A transaction on the wire is never interrupted, so a write waits for at most one transaction instead of the rest of
+    a read cycle. Callers from several threads (e.g. a scheduler and a control loop) no longer race on the client.
+    """
+
+    def __init__(self, client=None, name: str = 'RequestQueue'):
+        """
+        :param client: Synchronous pymodbus client, it is connected and closed by the queue
+        :param name: Name of the worker thread
+        """
+        self.name = name
+        self._client = client
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # keeps FIFO order within one priority
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _connect_client(self) -> bool:
+        return self._client.connect()
+
+    def connect(self) -> bool:
+        """
+        Connect the client (if not already connected) and start the worker thread.
+        """
+        with self._lock:
+            if not self._connect_client():
+                return False
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+        return True
+
+    def close(self):
+        """
+        Stop the worker thread after all pending transactions are done and close the client.
+        """
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put((_PRIORITY_STOP, next(self._sequence), None))
+                self._worker.join()
+            self._worker = None
+
+            if self._client is not None:
+                self._client.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and self._client.connected
+
+    def submit(self, priority: int, function_name: str, *args, **kwargs) -> Future:
+        """
+        Queue a transaction without waiting for it.
+
+        :param priority: Lower values are executed first, c.f. PRIORITY_WRITE, PRIORITY_FAST_READ and PRIORITY_READ
+        :param function_name: Name of the method of the pymodbus client, e.g. "read_holding_registers"
+        :return: Future which is resolved with the response of the client method
+        """
+        if self._worker is None:
+            from pymodbus.exceptions import ModbusException
+            raise ModbusException(f'{self.name} is not connected')
+
+        future = Future()
+        self._queue.put((priority, next(self._sequence), (future, function_name, args, kwargs)))
+        return future
+
+    def execute(self, priority: int, function_name: str, *args, **kwargs):
+        """
+        Queue a transaction and block until it has been executed.
+        """
+        return self.submit(priority, function_name, *args, **kwargs).result()
+
+    def _transact(self, function_name: str, args: tuple, kwargs: dict):
+        return getattr(self._client, function_name)(*args, **kwargs)
+
+    def _run(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+
+            future, function_name, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(self._transact(function_name, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    @property
+    def client(self) -> 'RequestQueueClient':
+        """
+        Client for a synchronous device, which routes all requests through the queue.
+        """
+        return RequestQueueClient(self)
+
+
+class RequestQueueClient:
+    """
+    Drop-in replacement for the pymodbus client of a single device, as far as the crawler uses it. Reads are queued
+    with the read priority of the client, writes with PRIORITY_WRITE.
+    """
+
+    def __init__(self, request_queue: RequestQueue, read_priority: int = PRIORITY_READ):
+        self._queue = request_queue
+        self.read_priority = read_priority
+
+    def for_priority(self, read_priority: int) -> 'RequestQueueClient':
+        """
+        Client on the same queue, which reads with another priority. Register blocks get one of these.
+        """
+        return type(self)(self._queue, read_priority)
+
+    def _call(self, priority: int, function_name: str, *args, **kwargs):
+        return self._queue.execute(priority, function_name, *args, **kwargs)
+
+    def connect(self) -> bool:
+        return self._queue.connect()
+
+    def close(self):
+        self._queue.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._queue.connected
+
+    def read_coils(self, address: int, count: int = 1, slave: int = 1):
+        return self._call(self.read_priority, 'read_coils', address=address, count=count, slave=slave)
+
+    def read_discrete_inputs(self, address: int, count: int = 1, slave: int = 1):
+        return self._call(self.read_priority, 'read_discrete_inputs', address=address, count=count, slave=slave)
+
+    def read_holding_registers(self, address: int, count: int = 1, slave: int = 1):
+        return self._call(self.read_priority, 'read_holding_registers', address=address, count=count, slave=slave)
+
+    def read_input_registers(self, address: int, count: int = 1, slave: int = 1):
+        return self._call(self.read_priority, 'read_input_registers', address=address, count=count, slave=slave)
+
+    def write_coil(self, address: int, value: bool, slave: int = 1):
+        return self._call(PRIORITY_WRITE, 'write_coil', address, value, slave=slave)
+
+    def write_coils(self, address: int, values: list[bool], slave: int = 1):
+        return self._call(PRIORITY_WRITE, 'write_coils', address, values, slave=slave)
+
+    def write_register(self, address: int, value: int, slave: int = 1):
+        return self._call(PRIORITY_WRITE, 'write_register', address, value, slave=slave)
+
+    def write_registers(self, address: int, values: list[int], slave: int = 1):
+        return self._call(PRIORITY_WRITE, 'write_registers', address, values, slave=slave)
+
+
+class AsyncRequestQueue:
+    """
+    Asyncio variant of RequestQueue for an async pymodbus client, the transactions are executed by a worker task.
+    """
+
+    def __init__(self, client, name: str = 'AsyncRequestQueue'):
+        """
+        :param client: Async pymodbus client, it is connected and closed by the queue
+        :param name: Name used in error messages
+        """
+        self.name = name
+        self._client = client
+        self._queue: asyncio.PriorityQueue | None = None
+        self._sequence = itertools.count()
+        self._worker: asyncio.Task | None = None
+
+    async def connect(self) -> bool:
+        if not await self._client.connect():
+            return False
+
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.PriorityQueue()
+            self._worker = asyncio.create_task(self._run())
+        return True
+
+    def close(self):
+        """
+        Stop the worker task, pending transactions are cancelled, and close the client.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+            while not self._queue.empty():
+                self._queue.get_nowait()[2][0].cancel()
+        self._client.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._client.connected
+
+    def submit(self, priority: int, function_name: str, *args, **kwargs) -> asyncio.Future:
+        """
+        Queue a transaction, c.f. RequestQueue.submit().
+        """
+        if self._worker is None:
+            from pymodbus.exceptions import ModbusException
+            raise ModbusException(f'{self.name} is not connected')
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), (future, function_name, args, kwargs)))
+        return future
+
+    async def _run(self):
+        while True:
+            _, _, (future, function_name, args, kwargs) = await self._queue.get()
+            if future.cancelled():
+                continue
+
+            try:
+                future.set_result(await getattr(self._client, function_name)(*args, **kwargs))
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+
+    @property
+    def client(self) -> 'AsyncRequestQueueClient':
+        """
+        Client for an asynchronous device, which routes all requests through the queue.
+        """
+        return AsyncRequestQueueClient(self)
+
+
+class AsyncRequestQueueClient(RequestQueueClient):
+    """
+    Awaitable variant of RequestQueueClient.
+    """
+
+    async def _call(self, priority: int, function_name: str, *args, **kwargs):
+        return await self._queue.submit(priority, function_name, *args, **kwargs)
+
+    async def connect(self) -> bool:
+        return await self._queue.connect()
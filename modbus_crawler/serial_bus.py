@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Literal
+
+from pymodbus import FramerType
+from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+
+from modbus_crawler.request_queue import RequestQueue, RequestQueueClient
+
+
+def inter_frame_delay(baudrate: int, bytesize: int = 8, parity: Literal['E', 'O', 'N'] = 'N',
+                      stopbits: int = 1) -> float:
+    """
+    Minimum silence between two Modbus RTU frames in seconds (3.5 character times).
+
+    The Modbus over serial line specification fixes the silence to 1.75 ms for baud rates above 19200, since the
+    character time gets too short to be measured reliably by most devices.
+
+    :param baudrate: Baud rate of the serial line
+    :param bytesize: Number of data bits
+    :param parity: Parity, 'N' does not add a parity bit
+    :param stopbits: Number of stop bits
+    :return: Silence in seconds
+    """
+    if baudrate > 19200:
+        return 1.75e-3
+
+    bits_per_char = 1 + bytesize + (0 if parity == 'N' else 1) + stopbits
+    return 3.5 * bits_per_char / baudrate
+
+
+class SerialBus(RequestQueue):
+    """
+    Arbiter for a RS-485 line shared by several Modbus RTU devices.
+
+    The bus owns the serial port and executes all transactions of the attached devices one after another in a single
+    worker thread. Pending transactions are ordered by priority (writes before reads) and by arrival within the same
+    priority. Between two frames the bus waits exactly the remaining part of the inter-frame silence, so the line is
+    never idle longer than necessary.
+    """
+
+    def __init__(self,
+                 com_port: str,
+                 baudrate: int = 9600,
+                 parity: Literal['E', 'O', 'N'] = 'N',
+                 stopbits: int = 1,
+                 bytesize: int = 8,
+                 timeout: int = 3):
+        super().__init__(name=f'SerialBus({com_port})')
+        self.com_port = com_port
+        self.baudrate = baudrate
+        self.parity = parity
+        self.stopbits = stopbits
+        self.bytesize = bytesize
+        self.timeout = timeout
+
+        self.silent_interval = inter_frame_delay(baudrate=baudrate, bytesize=bytesize, parity=parity,
+                                                 stopbits=stopbits)
+
+        self._client: ModbusSerialClient | None = None
+        self._last_frame_end = 0.0
+
+    def _connect_client(self) -> bool:
+        if self._client is None:
+            self._client = ModbusSerialClient(port=self.com_port, baudrate=self.baudrate, parity=self.parity,
+                                              stopbits=self.stopbits, bytesize=self.bytesize, timeout=self.timeout)
+        return self._client.connect()
+
+    def _transact(self, function_name: str, args: tuple, kwargs: dict):
+        # Only wait for what is left of the silence, the time spent queuing already counts
+        remaining = self._last_frame_end + self.silent_interval - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        try:
+            return super()._transact(function_name, args, kwargs)
+        finally:
+            self._last_frame_end = time.monotonic()
+
+    @property
+    def client(self) -> 'SerialBusClient':
+        """
+        Client for a synchronous device, which routes all requests through the bus.
+        """
+        return SerialBusClient(self)
+
+    @property
+    def async_client(self) -> 'AsyncSerialBusClient':
+        """
+        Client for an asynchronous device, which routes all requests through the bus.
+        """
+        return AsyncSerialBusClient(self)
+
+
+class SerialGateway(SerialBus):
+    """
+    RS-485 line behind a transparent serial to Ethernet converter. RTU frames (with CRC, without MBAP header) are sent
+    over a TCP connection to the converter, which puts them on the line unchanged. Requests are arbitrated and paced
+    like on a local SerialBus, the silence is derived from the serial settings of the converter.
+    """
+
+    def __init__(self,
+                 ip_address: str,
+                 port: int = 502,
+                 baudrate: int = 9600,
+                 parity: Literal['E', 'O', 'N'] = 'N',
+                 stopbits: int = 1,
+                 bytesize: int = 8,
+                 timeout: int = 3):
+        """
+        :param ip_address: Address of the converter
+        :param port: TCP port of the serial port of the converter
+        :param baudrate: Baud rate of the serial line, as configured on the converter. Same for the other parameters.
+        """
+        super().__init__(com_port=f'{ip_address}:{port}', baudrate=baudrate, parity=parity, stopbits=stopbits,
+                         bytesize=bytesize, timeout=timeout)
+        self.name = f'SerialGateway({ip_address}:{port})'
+        self.ip_address = ip_address
+        self.port = port
+
+    def _connect_client(self) -> bool:
+        if self._client is None:
+            self._client = ModbusTcpClient(host=self.ip_address, port=self.port, framer=FramerType.RTU,
+                                           timeout=self.timeout)
+        return self._client.connect()
+
+
+class SerialBusClient(RequestQueueClient):
+    """
+    Drop-in replacement for the pymodbus client of a single device, as far as the crawler uses it.
+    Closing it does not close the shared serial port.
+    """
+
+    def close(self):
+        pass
+
+
+class AsyncSerialBusClient(SerialBusClient):
+    """
+    Awaitable variant of SerialBusClient. The transactions are still executed by the worker thread of the bus, so
+    sync and async devices can share one serial line.
+    """
+
+    async def _call(self, priority: int, function_name: str, *args, **kwargs):
+        return await asyncio.wrap_future(self._queue.submit(priority, function_name, *args, **kwargs))
+
+    async def connect(self) -> bool:
+        # Opening the port (or the TCP connection to a gateway) blocks, keep it out of the event loop
+        return await asyncio.to_thread(self._queue.connect)
@@ -0,0 +1,218 @@
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass
+
+from modbus_crawler.device_config import DeviceConfig
+
+
+@dataclass
+class DeviceReading:
+    """
+    Result of one polling cycle of a device, sent from a worker process to the supervisor.
+    """
+    device: str
+    timestamp: float
+    values: dict[str, float | int | str | bool] | None = None
+    error: str | None = None  # set instead of values if the cycle failed
+
+
+class ConsistentHashRing:
+    """
+    Maps keys (host names) to shards. The mapping only depends on the key and the number of shards, so a device stays
+    on the same worker across restarts and changing the number of workers only moves a fraction of the devices.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        """
+        :param shards: Number of shards (worker processes)
+        :param replicas: Virtual nodes per shard, more replicas give a more even distribution
+        """
+        if shards < 1:
+            raise ValueError(f'Number of shards must be at least 1, but is {shards}')
+
+        self.shards = shards
+        ring = sorted((self._hash(f'{shard}-{replica}'), shard)
+                      for shard in range(shards) for replica in range(replicas))
+        self._hashes = [entry[0] for entry in ring]
+        self._shards = [entry[1] for entry in ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # The builtin hash() is salted per process, so it cannot be used for a stable assignment
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+
+async def _poll_device(config: DeviceConfig, device, results):
+    try:
+        next_cycle = time.monotonic()
+        while True:
+            try:
+                if not device.connected:
+                    await device.connect()
+                values = await device.read_registers_as_dict()
+                results.put(DeviceReading(device=config.name, timestamp=time.time(), values=values))
+            except Exception as e:
+                results.put(DeviceReading(device=config.name, timestamp=time.time(), error=repr(e)))
+
+            # Keep the rate instead of drifting by the duration of the cycle
+            next_cycle += config.interval
+            await asyncio.sleep(max(0.0, next_cycle - time.monotonic()))
+    finally:
+        if device.client is not None:
+            device.disconnect()
+
+
+@dataclass
+class _ShardDevice:
+    config: DeviceConfig
+    device: object  # AsyncModbusTcpDevice
+    task: asyncio.Task
+    spec_fingerprint: tuple[int, int] | None  # of the spec file the device was created or reloaded with
+
+
+async def _run_shard(configs: list[DeviceConfig], results, control):
+    devices: dict[str, _ShardDevice] = {}
+
+    def apply(new_configs: list[DeviceConfig]):
+        new_configs = {config.name: config for config in new_configs}
+        for name, entry in list(devices.items()):
+            if new_configs.get(name) != entry.config:
+                entry.task.cancel()
+                del devices[name]
+            elif entry.config.spec_fingerprint() != entry.spec_fingerprint:
+                # The spec file was edited under the same name, swap it in without reconnecting
+                entry.spec_fingerprint = entry.config.spec_fingerprint()
+                try:
+                    entry.device.reload_registers_spec(csv_file_name=entry.config.register_specs_file_name)
+                except Exception as e:
+                    results.put(DeviceReading(device=name, timestamp=time.time(), error=repr(e)))
+        for name, config in new_configs.items():
+            if name not in devices:
+                fingerprint = config.spec_fingerprint()
+                try:
+                    device = config.create_async_device()
+                except Exception as e:
+                    results.put(DeviceReading(device=name, timestamp=time.time(), error=repr(e)))
+                    continue
+                devices[name] = _ShardDevice(config=config, device=device, spec_fingerprint=fingerprint,
+                                             task=asyncio.create_task(_poll_device(config, device, results)))
+
+    apply(configs)
+    while True:
+        # Pipe polling is portable, whereas loop.add_reader() is not available on the Windows event loop
+        while control.poll():
+            command, payload = control.recv()
+            if command == 'stop':
+                for entry in devices.values():
+                    entry.task.cancel()
+                await asyncio.gather(*(entry.task for entry in devices.values()), return_exceptions=True)
+                return
+            if command == 'reload':
+                apply(payload)
+        await asyncio.sleep(0.1)
+
+
+def _shard_main(configs: list[DeviceConfig], results, control):
+    asyncio.run(_run_shard(configs, results, control))
+
+
+class ShardedCrawler:
+    """
+    Supervisor which partitions a fleet of Modbus TCP devices across worker processes. Every worker runs its own
+    asyncio polling loop, the readings of all workers are merged into one queue.
+    """
+
+    def __init__(self, configs: list[DeviceConfig], workers: int = None, start_method: str = 'spawn'):
+        """
+        :param configs: Devices of the fleet, device names must be unique
+        :param workers: Number of worker processes, defaults to the number of CPU cores
+        :param start_method: multiprocessing start method, "spawn" does not inherit threads or event loops of the parent
+        """
+        self._context = multiprocessing.get_context(start_method)
+        self._ring = ConsistentHashRing(workers or os.cpu_count() or 1)
+        self._configs = self._check_configs(configs)
+        self._results = self._context.Queue()
+        self._workers: list[tuple[multiprocessing.Process, object] | None] = [None] * self._ring.shards
+
+    @staticmethod
+    def _check_configs(configs: list[DeviceConfig]) -> list[DeviceConfig]:
+        names = [config.name for config in configs]
+        if len(names) != len(set(names)):
+            raise ValueError('Device names must be unique')
+        return list(configs)
+
+    def assignment(self) -> list[list[DeviceConfig]]:
+        """
+        Device configs per shard, devices on the same host always end up in the same shard.
+        """
+        shards = [[] for _ in range(self._ring.shards)]
+        for config in self._configs:
+            shards[self._ring.shard_for(config.ip_address)].append(config)
+        return shards
+
+    def _start_worker(self, shard: int, configs: list[DeviceConfig]):
+        control, worker_control = self._context.Pipe()
+        process = self._context.Process(target=_shard_main, args=(configs, self._results, worker_control),
+                                        name=f'modbus-crawler-shard-{shard}', daemon=True)
+        process.start()
+        self._workers[shard] = (process, control)
+
+    def start(self):
+        for shard, configs in enumerate(self.assignment()):
+            self._start_worker(shard, configs)
+
+    def restart_dead_workers(self) -> int:
+        """
+        Start a new process for every worker which has died. Should be called periodically by the owner.
+
+        :return: Number of restarted workers
+        """
+        restarted = 0
+        for shard, configs in enumerate(self.assignment()):
+            worker = self._workers[shard]
+            if worker is not None and not worker[0].is_alive():
+                worker[1].close()
+                self._start_worker(shard, configs)
+                restarted += 1
+        return restarted
+
+    def reload(self, configs: list[DeviceConfig]):
+        """
+        Replace the device configs of the fleet. Workers only restart polling of added or changed devices, devices
+        whose spec file was edited since they were created get the new spec without reconnecting.
+        """
+        self._configs = self._check_configs(configs)
+        for shard, shard_configs in enumerate(self.assignment()):
+            if self._workers[shard] is not None:
+                self._workers[shard][1].send(('reload', shard_configs))
+
+    def get_reading(self, timeout: float = None) -> DeviceReading | None:
+        """
+        Next reading of any device, or None if there is none within the timeout.
+        """
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self, timeout: float = 5):
+        for worker in self._workers:
+            if worker is None:
+                continue
+            process, control = worker
+            if process.is_alive():
+                control.send(('stop', None))
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+            control.close()
+        self._workers = [None] * self._ring.shards
@@ -0,0 +1,127 @@
+import contextlib
+import time
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.read_planner import ReadRequest, default_max_gap, plan_reads
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+
+
+class SharedEndpointReader:
+    """
+    Reads the readable registers of several devices (consumers) which are attached to the same physical device, e.g.
+    one with a monitoring spec and one with a control spec. The read plans of all consumers are merged, so every
+    address is read once per cycle, and every register is decoded by its own consumer, i.e. with the names, scaling,
+    data types and byte order of its spec.
+
+    The requests are sent over the connection of any of the consumers, so all of them have to be connected to the
+    same endpoint. The plan is computed again when the spec of a consumer is replaced.
+    """
+
+    def __init__(self, consumers: dict[str, ModbusDevice], max_gap: int = default_max_gap):
+        """
+        :param consumers: Connected devices by name, all with a register specification
+        :param max_gap: Maximum number of registers between two requested registers which are read in the same request
+        """
+        if not consumers:
+            raise ValueError('At least one consumer is needed')
+        self.consumers = consumers
+        self.max_gap = max_gap
+
+        self._plan: list[tuple[ReadRequest, list[tuple[ModbusDevice, ModbusRegister, int]]]] = []
+        self._blocks: list[RegisterBlock] = []
+        self._planned_specs: list = []  # register block lists the plan was made for
+
+    def _current_plan(self) -> list[tuple[ReadRequest, list[tuple[ModbusDevice, ModbusRegister, int]]]]:
+        specs = [consumer.register_block_list for consumer in self.consumers.values()]
+        if any(spec is None for spec in specs):
+            raise RuntimeError('You must set register specification before reading registers')
+        if len(specs) == len(self._planned_specs) and all(a is b for a, b in zip(specs, self._planned_specs)):
+            return self._plan
+
+        owners: dict[int, ModbusDevice] = {}
+        registers = list[ModbusRegister]()
+        self._blocks = []
+        for consumer, spec in zip(self.consumers.values(), specs):
+            for block in spec:
+                if 'r' in block.mode:
+                    self._blocks.append(block)
+                    for register in block.register_list:
+                        owners[id(register)] = consumer
+                        registers.append(register)
+
+        self._plan = [(request, [(owners[id(register)], register, request.offset(register))
+                                 for register in request.registers])
+                      for request in plan_reads(registers, max_gap=self.max_gap)]
+        self._planned_specs = specs
+        return self._plan
+
+    @property
+    def request_count(self) -> int:
+        """
+        Number of requests of one merged cycle.
+        """
+        return len(self._current_plan())
+
+    @property
+    def separate_request_count(self) -> int:
+        """
+        Number of requests of one cycle if every consumer read its blocks on its own.
+        """
+        self._current_plan()
+        return sum(len(block._requests()) for block in self._blocks)
+
+    def _locked(self) -> contextlib.ExitStack:
+        # Keeps every consumer from swapping its spec during the cycle
+        stack = contextlib.ExitStack()
+        for consumer in self.consumers.values():
+            stack.enter_context(consumer._spec_lock)
+        return stack
+
+    def _decode(self, request: ReadRequest, registers: list[tuple[ModbusDevice, ModbusRegister, int]], resp):
+        data = ModbusDevice._response_data(resp, request.register_type)
+        for consumer, register, offset in registers:
+            register.value = consumer._decode_register(data, offset, register)
+
+    def _result(self) -> dict[str, list[ModbusRegister]]:
+        now = time.monotonic()
+        for block in self._blocks:
+            block.read_time = block.last_good_read_time = now
+        return {name: [register for block in consumer.register_block_list if 'r' in block.mode
+                       for register in block.register_list]
+                for name, consumer in self.consumers.items()}
+
+    def read(self) -> dict[str, list[ModbusRegister]]:
+        """
+        Read all readable registers of all consumers.
+
+        :return: Readable registers by consumer name
+        """
+        with self._locked():
+            for request, registers in self._current_plan():
+                self._decode(request, registers, request.read_registers())
+            return self._result()
+
+    def read_as_dict(self) -> dict[str, dict[str, float | int | str | bool]]:
+        """
+        Values of all readable registers by register name, by consumer name.
+        """
+        return {name: {register.name: register.value for register in registers}
+                for name, registers in self.read().items()}
+
+
+class AsyncSharedEndpointReader(SharedEndpointReader):
+    """
+    SharedEndpointReader for async devices, the consumers' specs are not locked during a cycle.
+    """
+
+    async def read(self) -> dict[str, list[ModbusRegister]]:
+        plan = self._current_plan()
+        consumer = next(iter(self.consumers.values()))
+        responses = await consumer._read_all([request.read_registers_async for request, _ in plan])
+        for (request, registers), resp in zip(plan, responses):
+            self._decode(request, registers, resp)
+        return self._result()
+
+    async def read_as_dict(self) -> dict[str, dict[str, float | int | str | bool]]:
+        return {name: {register.name: register.value for register in registers}
+                for name, registers in (await self.read()).items()}
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls with the same key: the first caller executes the function, callers arriving while it runs
+    wait for its result instead of executing it again. Results are not kept after the call finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, function: Callable, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio variant of SingleFlight, for coroutine functions.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, function: Callable, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            # A cancelled follower must not cancel the call of the others
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await function(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # The leader raises it, followers are optional
+            raise
+        finally:
+            del self._calls[key]
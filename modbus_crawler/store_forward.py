@@ -0,0 +1,359 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+from modbus_crawler.register_block import ModbusRegister
+from modbus_crawler.sharded_crawler import DeviceReading
+
+# Every record is prefixed with its length, a length of 0 marks the end of the data of a segment (files are created
+# zero filled). Names of devices and registers are stored once per segment in key records and referenced by id.
+_length = struct.Struct('<I')
+_key_record = struct.Struct('<BI')  # type, key id, followed by the utf-8 name
+_reading_record = struct.Struct('<BIdI')  # type, device key, timestamp, number of values, followed by the values
+_error_record = struct.Struct('<BId')  # type, device key, timestamp, followed by the utf-8 error
+_value_header = struct.Struct('<IB')  # key of the register name, value type
+_float = struct.Struct('<d')
+_int = struct.Struct('<q')
+
+RECORD_KEY = 1
+RECORD_READING = 2
+RECORD_ERROR = 3
+
+VALUE_FLOAT = 0
+VALUE_INT = 1
+VALUE_BOOL = 2
+VALUE_STRING = 3  # length prefixed utf-8
+VALUE_JSON = 4  # anything else, e.g. bitfields, as length prefixed json
+VALUE_NONE = 5
+
+_SEGMENT_SUFFIX = '.seg'
+_PEEK_CHUNK = 1 << 20  # bytes copied out of a segment at once while holding the lock
+_CURSOR_FILE = 'cursor'
+
+
+@dataclass
+class ReplayBatch:
+    readings: list[DeviceReading]
+    # Position after the batch, c.f. StoreAndForwardBuffer.acknowledge()
+    end_segment: int
+    end_offset: int
+    _keys: dict[int, str]
+
+
+class _Segment:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        create = not os.path.exists(path)
+        self.file = open(path, 'w+b' if create else 'r+b')
+        if create:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.end = 0
+        self.keys: dict[str, int] = {}  # names written to this segment, only used for the segment being written
+
+    @property
+    def size(self) -> int:
+        return len(self.map)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def _parse_records(data, offset: int, end: int, keys: dict[int, str], max_readings: int = None):
+    """
+    Decode the records from offset to end, a record which is cut off at the end is left out. Key records are added to
+    keys.
+
+    :return: Decoded readings and the offset after the last decoded record
+    """
+    readings = []
+    while offset + _length.size <= end and (max_readings is None or len(readings) < max_readings):
+        (length,) = _length.unpack_from(data, offset)
+        position = offset + _length.size
+        record_end = position + length
+        if length == 0 or record_end > end:
+            break
+        record_type = data[position]
+
+        if record_type == RECORD_KEY:
+            _, key = _key_record.unpack_from(data, position)
+            keys[key] = bytes(data[position + _key_record.size:record_end]).decode('utf-8')
+        elif record_type == RECORD_ERROR:
+            _, device, timestamp = _error_record.unpack_from(data, position)
+            error = bytes(data[position + _error_record.size:record_end]).decode('utf-8')
+            readings.append(DeviceReading(device=keys[device], timestamp=timestamp, error=error))
+        else:
+            _, device, timestamp, count = _reading_record.unpack_from(data, position)
+            position += _reading_record.size
+            values = {}
+            for _ in range(count):
+                key, value_type = _value_header.unpack_from(data, position)
+                position += _value_header.size
+                if value_type == VALUE_FLOAT:
+                    (value,) = _float.unpack_from(data, position)
+                    position += _float.size
+                elif value_type == VALUE_INT:
+                    (value,) = _int.unpack_from(data, position)
+                    position += _int.size
+                elif value_type == VALUE_BOOL:
+                    value = data[position] != 0
+                    position += 1
+                elif value_type == VALUE_NONE:
+                    value = None
+                else:
+                    (size,) = _length.unpack_from(data, position)
+                    position += _length.size
+                    value = bytes(data[position:position + size]).decode('utf-8')
+                    position += size
+                    if value_type == VALUE_JSON:
+                        value = json.loads(value)
+                values[keys[key]] = value
+            readings.append(DeviceReading(device=keys[device], timestamp=timestamp, values=values))
+        offset = record_end
+    return readings, offset
+
+
+def _data_end(data, size: int) -> int:
+    """
+    Offset of the end mark of a segment, records which were not completely written are cut off.
+    """
+    offset = 0
+    while offset + _length.size <= size:
+        (length,) = _length.unpack_from(data, offset)
+        if length == 0 or offset + _length.size + length > size:
+            break
+        offset += _length.size + length
+    return offset
+
+
+class StoreAndForwardBuffer:
+    """
+    Persistent FIFO of device readings for times the upstream consumer is not reachable.
+
+    Readings are appended in a compact binary format to memory mapped segment files in a directory, so appending is a
+    memory copy and does not block the polling loop on disk writes. When the total size is exceeded, the oldest segment
+    is dropped. The consumer replays the readings in order in batches and acknowledges each batch once it has been
+    forwarded. The read position is persisted, readings which were not acknowledged are replayed after a restart.
+
+    Appending and replaying can happen in different threads.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 16 * 1024 * 1024, max_segments: int = 16):
+        """
+        :param directory: Directory of the segment files, created if it does not exist
+        :param segment_size: Bytes per segment file
+        :param max_segments: Maximum number of segment files, the buffer holds at most segment_size * max_segments bytes
+        """
+        if max_segments < 2:
+            raise ValueError(f'At least two segments are needed, but max_segments is {max_segments}')
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.dropped_segments = 0  # segments dropped unread because the buffer was full
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments: dict[int, _Segment] = {}
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith(_SEGMENT_SUFFIX):
+                index = int(file_name[:-len(_SEGMENT_SUFFIX)])
+                segment = self._segments[index] = _Segment(os.path.join(directory, file_name), segment_size)
+                segment.end = _data_end(segment.map, segment.size)
+        if not self._segments:
+            self._add_segment(0)
+
+        # The writer needs the names already stored in its segment
+        last = self._segments[max(self._segments)]
+        keys = {}
+        _parse_records(last.map, 0, last.end, keys)
+        last.keys = {name: key for key, name in keys.items()}
+
+        self._read_segment, self._read_offset = self._load_cursor()
+        self._read_keys = {}
+        _parse_records(self._segments[self._read_segment].map, 0, self._read_offset, self._read_keys)
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, f'{index:012d}{_SEGMENT_SUFFIX}')
+
+    def _add_segment(self, index: int) -> _Segment:
+        segment = self._segments[index] = _Segment(self._path(index), self.segment_size)
+        return segment
+
+    def _load_cursor(self) -> tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE)) as f:
+                index, offset = map(int, f.read().split())
+        except (OSError, ValueError):
+            return min(self._segments), 0
+        if index not in self._segments:
+            return min(self._segments), 0
+        return index, offset
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        with open(path + '.tmp', 'w') as f:
+            f.write(f'{self._read_segment} {self._read_offset}')
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _key(segment: _Segment, name: str, chunks: list[bytes]) -> int:
+        key = segment.keys.get(name)
+        if key is None:
+            key = segment.keys[name] = len(segment.keys)
+            body = _key_record.pack(RECORD_KEY, key) + name.encode('utf-8')
+            chunks.append(_length.pack(len(body)) + body)
+        return key
+
+    def _encode(self, segment: _Segment, reading: DeviceReading) -> bytes:
+        chunks = []
+        device = self._key(segment, reading.device, chunks)
+        if reading.values is None:
+            body = _error_record.pack(RECORD_ERROR, device, reading.timestamp) + (reading.error or '').encode('utf-8')
+        else:
+            body = bytearray(_reading_record.pack(RECORD_READING, device, reading.timestamp, len(reading.values)))
+            for name, value in reading.values.items():
+                key = self._key(segment, name, chunks)
+                if isinstance(value, bool):
+                    body += _value_header.pack(key, VALUE_BOOL) + (b'\x01' if value else b'\x00')
+                elif isinstance(value, int) and -1 << 63 <= value < 1 << 63:
+                    body += _value_header.pack(key, VALUE_INT) + _int.pack(value)
+                elif isinstance(value, float):
+                    body += _value_header.pack(key, VALUE_FLOAT) + _float.pack(value)
+                elif value is None:
+                    body += _value_header.pack(key, VALUE_NONE)
+                else:
+                    value_type = VALUE_STRING if isinstance(value, str) else VALUE_JSON
+                    text = (value if value_type == VALUE_STRING else json.dumps(value)).encode('utf-8')
+                    body += _value_header.pack(key, value_type) + _length.pack(len(text)) + text
+        chunks.append(_length.pack(len(body)) + body)
+        return b''.join(chunks)
+
+    def append(self, reading: DeviceReading):
+        """
+        Store a reading. Drops the oldest segment if the buffer is full.
+        """
+        with self._lock:
+            segment = self._segments[max(self._segments)]
+            data = self._encode(segment, reading)
+            # Keep one zero length field behind the data as end mark
+            if segment.end + len(data) + _length.size > segment.size:
+                segment.map.flush()
+                segment = self._rotate()
+                data = self._encode(segment, reading)
+                if len(data) + _length.size > segment.size:
+                    raise ValueError(f'Reading of {reading.device} needs {len(data)} bytes, which is more than the '
+                                     f'segment size of {self.segment_size} bytes')
+
+            # The length of the first record is written last, so a reader (or a restart) never sees half a record
+            start = segment.end
+            segment.map[start + _length.size:start + len(data)] = data[_length.size:]
+            segment.map[start:start + _length.size] = data[:_length.size]
+            segment.end += len(data)
+
+    def _rotate(self) -> _Segment:
+        segment = self._add_segment(max(self._segments) + 1)
+        while len(self._segments) > self.max_segments:
+            oldest = min(self._segments)
+            self._remove_segment(oldest)
+            self.dropped_segments += 1
+            if self._read_segment == oldest:
+                self._read_segment, self._read_offset, self._read_keys = min(self._segments), 0, {}
+        return segment
+
+    def _remove_segment(self, index: int):
+        segment = self._segments.pop(index)
+        segment.close()
+        os.remove(segment.path)
+
+    def callback(self, device: str):
+        """
+        Callback for ModbusDevice.schedule(), which stores every read cycle of the device.
+
+        :param device: Name the readings are stored with
+        """
+
+        def store(registers: list[ModbusRegister]):
+            self.append(DeviceReading(device=device, timestamp=time.time(),
+                                      values={register.name: register.value for register in registers}))
+
+        return store
+
+    def peek(self, max_readings: int = 1000) -> ReplayBatch:
+        """
+        Oldest readings which were not acknowledged yet. Returns the same readings again until they are acknowledged.
+        Only one consumer may replay the buffer.
+
+        :param max_readings: Maximum number of readings of the batch
+        """
+        readings = []
+        with self._lock:
+            # The keys are extended while decoding, and replaced by append() and acknowledge() under the lock
+            index, offset, keys = self._read_segment, self._read_offset, dict(self._read_keys)
+
+        chunk_size = _PEEK_CHUNK
+        while len(readings) < max_readings:
+            # Written data does not change, so it is copied under the lock and decoded without it
+            with self._lock:
+                segment = self._segments.get(index)
+                if segment is None:
+                    break  # dropped because the buffer was full, c.f. acknowledge()
+                end = segment.end
+                chunk = bytes(segment.map[offset:min(end, offset + chunk_size)])
+                later = [later_index for later_index in self._segments if later_index > index]
+
+            decoded, used = _parse_records(chunk, 0, len(chunk), keys, max_readings - len(readings))
+            readings.extend(decoded)
+            offset += used
+
+            if offset < end:
+                if used == 0:
+                    # A single record is larger than the chunk
+                    chunk_size = _length.unpack_from(chunk)[0] + _length.size
+                continue
+            if not later:
+                break
+            index, offset, keys = min(later), 0, {}
+        return ReplayBatch(readings=readings, end_segment=index, end_offset=offset, _keys=keys)
+
+    def acknowledge(self, batch: ReplayBatch):
+        """
+        Mark the readings of a batch from "peek()" as forwarded. Fully forwarded segments are deleted.
+        """
+        with self._lock:
+            if batch.end_segment < self._read_segment or batch.end_segment not in self._segments:
+                return  # the segments of the batch were dropped in the meantime
+
+            for index in [index for index in self._segments if index < batch.end_segment]:
+                self._remove_segment(index)
+            self._read_segment, self._read_offset, self._read_keys = batch.end_segment, batch.end_offset, batch._keys
+            self._save_cursor()
+
+    @property
+    def pending_bytes(self) -> int:
+        """
+        Bytes of readings which were not acknowledged yet.
+        """
+        with self._lock:
+            return sum(segment.end for index, segment in self._segments.items() if index >= self._read_segment) - \
+                self._read_offset
+
+    def flush(self):
+        """
+        Write the mapped segments to disk.
+        """
+        with self._lock:
+            for segment in self._segments.values():
+                segment.map.flush()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.map.flush()
+                segment.close()
+            self._segments.clear()
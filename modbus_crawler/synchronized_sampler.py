@@ -0,0 +1,139 @@
+import asyncio
+import inspect
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from modbus_crawler.modbus_device import ModbusDevice
+
+
+@dataclass
+class DeviceSample:
+    """
+    Reading of one device for one tick.
+    """
+    values: dict[str, float | int | str | bool] | None
+    skew: float  # seconds from the tick to the middle of the read, the best guess of when the device took the values
+    duration: float  # seconds from the first request to the last response of the read
+    error: str | None = None  # set instead of values if the read failed
+
+
+@dataclass
+class SynchronizedSnapshot:
+    tick: float  # wall clock time (time.time()) the reads were aligned to
+    samples: dict[str, DeviceSample] = field(default_factory=dict)
+
+    @property
+    def spread(self) -> float:
+        """
+        Seconds between the earliest and the latest acquisition of the successful reads.
+        """
+        skews = [sample.skew for sample in self.samples.values() if sample.error is None]
+        return max(skews) - min(skews) if skews else 0.0
+
+    def as_dict(self) -> dict[str, dict[str, float | int | str | bool]]:
+        """
+        Values of all devices read successfully, by device name.
+        """
+        return {name: sample.values for name, sample in self.samples.items() if sample.error is None}
+
+
+class SynchronizedSampler:
+    """
+    Reads a group of devices at common wall clock aligned ticks (e.g. every full second) and assembles the results of
+    each tick into one snapshot. All reads of a tick are started at the same time, sync devices each in a thread of
+    their own, async devices in the event loop.
+    """
+
+    def __init__(self, devices: dict[str, ModbusDevice], period: float = 1.0, offset: float = 0.0):
+        """
+        :param devices: Connected devices by name, sync and async devices can be mixed
+        :param period: Seconds between two ticks, ticks are multiples of it since the epoch
+        :param offset: Seconds the ticks are shifted against the multiples of the period
+        """
+        if period <= 0:
+            raise ValueError(f'Period must be positive, but is {period}')
+
+        self.devices = devices
+        self.period = period
+        self.offset = offset
+        self.missed_ticks = 0  # ticks skipped because the snapshot before took longer than the period
+
+        # One thread per sync device, created up front so no thread start delays a read
+        sync_devices = [name for name, device in devices.items() if not self._is_async(device)]
+        self._executor = ThreadPoolExecutor(max_workers=len(sync_devices), thread_name_prefix='SynchronizedSampler') \
+            if sync_devices else None
+        if self._executor is not None:
+            # The barrier keeps every thread busy until all are started
+            barrier = threading.Barrier(len(sync_devices))
+            for _ in sync_devices:
+                self._executor.submit(barrier.wait)
+
+    @staticmethod
+    def _is_async(device: ModbusDevice) -> bool:
+        return inspect.iscoroutinefunction(device.read_registers_as_dict)
+
+    def next_tick(self, now: float = None) -> float:
+        """
+        First tick after now.
+        """
+        now = time.time() if now is None else now
+        return math.floor((now - self.offset) / self.period + 1) * self.period + self.offset
+
+    async def _sample(self, name: str, tick: float) -> DeviceSample:
+        device = self.devices[name]
+        loop = asyncio.get_running_loop()
+        start = time.time()
+        try:
+            if self._is_async(device):
+                values = await device.read_registers_as_dict()
+            else:
+                values = await loop.run_in_executor(self._executor, device.read_registers_as_dict)
+            error = None
+        except Exception as e:
+            values, error = None, repr(e)
+        end = time.time()
+        return DeviceSample(values=values, skew=(start + end) / 2 - tick, duration=end - start, error=error)
+
+    async def sample(self, tick: float = None) -> SynchronizedSnapshot:
+        """
+        Wait for the tick and read all devices.
+
+        :param tick: optional, wall clock time to read at, default is the next tick
+        """
+        tick = self.next_tick() if tick is None else tick
+        await asyncio.sleep(max(0.0, tick - time.time()))
+
+        names = list(self.devices)
+        samples = await asyncio.gather(*(self._sample(name, tick) for name in names))
+        return SynchronizedSnapshot(tick=tick, samples=dict(zip(names, samples)))
+
+    async def run(self, callback, count: int = None):
+        """
+        Take a snapshot at every tick and pass it to the callback. Ticks which passed while a snapshot was taken are
+        skipped (c.f. self.missed_ticks), so snapshots stay aligned to the grid.
+
+        :param callback: Function or coroutine function which gets the SynchronizedSnapshot
+        :param count: optional, stop after this number of snapshots
+        """
+        tick = self.next_tick()
+        taken = 0
+        while count is None or taken < count:
+            result = callback(await self.sample(tick))
+            if inspect.isawaitable(result):
+                await result
+            taken += 1
+
+            if count is None or taken < count:
+                next_tick = self.next_tick()
+                self.missed_ticks += round((next_tick - tick) / self.period) - 1
+                tick = next_tick
+
+    def close(self):
+        """
+        Stop the threads of the sync devices. The devices stay connected.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
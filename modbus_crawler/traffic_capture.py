@@ -0,0 +1,233 @@
+import inspect
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+
+from pymodbus.constants import Endian
+from pymodbus.exceptions import ModbusException
+
+from modbus_crawler.modbus_device import ModbusDevice, response_payload
+from modbus_crawler.modbus_tcp_transport import RawResponse
+from modbus_crawler.register_block import RegisterBlock
+
+# A capture file is this header followed by the records. A record is a fixed size header (timestamp, duration, slave
+# id, register type, address, count, status, payload length) and the raw payload: register bytes in wire order or the
+# packed bits of a coil/discrete input response, like in the PDU.
+_MAGIC = b'MBCAP1\n'
+_record = struct.Struct('<dfBcHHBH')
+_STATUS_OK = 0xFF  # any other status is the exception code of the response
+
+_function_codes = {'c': 1, 'd': 2, 'h': 3, 'i': 4}
+
+
+@dataclass(slots=True)
+class CapturedResponse:
+    timestamp: float  # wall clock time the request was sent
+    duration: float  # seconds until the response arrived
+    slave_id: int
+    register_type: str
+    address: int
+    count: int
+    exception_code: int | None  # None for a valid response
+    payload: bytes
+
+    def response(self) -> RawResponse:
+        """
+        The response as the native transport would return it, a new object on every call.
+        """
+        function_code = _function_codes[self.register_type]
+        if self.exception_code is not None:
+            return RawResponse(function_code | 0x80, exception_code=self.exception_code)
+        return RawResponse(function_code, payload=self.payload)
+
+
+def _bits_payload(resp) -> bytes:
+    payload = getattr(resp, 'payload', None)
+    if payload is not None:
+        return payload
+    bits = resp.bits
+    return sum(1 << i for i, bit in enumerate(bits) if bit).to_bytes((len(bits) + 7) // 8, 'little')
+
+
+class TrafficCapture:
+    """
+    Records every read request of a device and its response into a compact binary file, e.g. to reproduce a
+    performance problem or a decoding error of a device in the field without the device, c.f. ReplayModbusDevice.
+
+    The read functions of the blocks are wrapped, so attach the device again after it reconnected or its spec was
+    replaced. Requests which raise are recorded as error responses with exception code 0, like pymodbus reports
+    timeouts.
+    """
+
+    def __init__(self, file_name: str):
+        """
+        :param file_name: Capture file, overwritten if it exists
+        """
+        self.file_name = file_name
+        self.records = 0
+        self._file = open(file_name, 'wb')
+        self._file.write(_MAGIC)
+        self._lock = threading.Lock()  # devices may be read from several threads
+        self._originals: dict[RegisterBlock, object] = {}
+
+    def __enter__(self) -> 'TrafficCapture':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def attach(self, device: ModbusDevice):
+        """
+        Record the reads of all blocks of the device until detach() or close().
+        """
+        for block in device.register_block_list:
+            if block._read_function is None:
+                raise RuntimeError('you have to connect the device first')
+            original = self._originals.setdefault(block, block._read_function)
+            block._read_function = self._recording(original, block.register_type)
+
+    def detach(self, device: ModbusDevice):
+        for block in device.register_block_list:
+            original = self._originals.pop(block, None)
+            if original is not None:
+                block._read_function = original
+
+    def _recording(self, read_function, register_type: str):
+        def read(address, count, slave):
+            timestamp, start = time.time(), time.perf_counter()
+            try:
+                resp = read_function(address=address, count=count, slave=slave)
+            except Exception:
+                self.write(timestamp, time.perf_counter() - start, slave, register_type, address, count, None)
+                raise
+            if inspect.isawaitable(resp):
+                return self._record_async(resp, timestamp, start, slave, register_type, address, count)
+            self.write(timestamp, time.perf_counter() - start, slave, register_type, address, count, resp)
+            return resp
+        return read
+
+    async def _record_async(self, awaitable, timestamp: float, start: float, slave: int, register_type: str,
+                            address: int, count: int):
+        try:
+            resp = await awaitable
+        except Exception:
+            self.write(timestamp, time.perf_counter() - start, slave, register_type, address, count, None)
+            raise
+        self.write(timestamp, time.perf_counter() - start, slave, register_type, address, count, resp)
+        return resp
+
+    def write(self, timestamp: float, duration: float, slave_id: int, register_type: str, address: int, count: int,
+              resp):
+        """
+        Append one record.
+
+        :param resp: The response, None if the request raised
+        """
+        if resp is None or resp.isError():
+            status, payload = getattr(resp, 'exception_code', None) or 0, b''
+        else:
+            status = _STATUS_OK
+            payload = _bits_payload(resp) if register_type in {'c', 'd'} else response_payload(resp)
+
+        header = _record.pack(timestamp, duration, slave_id, register_type.encode(), address, count, status,
+                              len(payload))
+        with self._lock:
+            self._file.write(header)
+            self._file.write(payload)
+            self.records += 1
+
+    def close(self):
+        for block, original in self._originals.items():
+            block._read_function = original
+        self._originals.clear()
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(file_name: str) -> list[CapturedResponse]:
+    """
+    All records of a capture file in the order they were recorded.
+    """
+    with open(file_name, 'rb') as file:
+        data = file.read()
+    if not data.startswith(_MAGIC):
+        raise ValueError(f'{file_name} is not a capture file')
+
+    records = list[CapturedResponse]()
+    position = len(_MAGIC)
+    while position < len(data):
+        if position + _record.size > len(data):
+            raise ValueError(f'{file_name} ends within a record')
+        timestamp, duration, slave_id, register_type, address, count, status, length = \
+            _record.unpack_from(data, position)
+        position += _record.size
+        if position + length > len(data):
+            raise ValueError(f'{file_name} ends within a record')
+        records.append(CapturedResponse(timestamp=timestamp, duration=duration, slave_id=slave_id,
+                                        register_type=register_type.decode(), address=address, count=count,
+                                        exception_code=None if status == _STATUS_OK else status,
+                                        payload=data[position:position + length]))
+        position += length
+    return records
+
+
+class _ReplayClient:
+    """
+    Answers read requests with the captured responses of the same request, in the recorded order and starting over
+    when all of them were used.
+    """
+
+    def __init__(self, records: list[CapturedResponse]):
+        self._responses: dict[tuple[int, str, int, int], list[CapturedResponse]] = {}
+        for record in records:
+            key = (record.slave_id, record.register_type, record.address, record.count)
+            self._responses.setdefault(key, []).append(record)
+        self._positions = dict.fromkeys(self._responses, 0)
+
+        self.read_coils = partial(self._read, 'c')
+        self.read_discrete_inputs = partial(self._read, 'd')
+        self.read_holding_registers = partial(self._read, 'h')
+        self.read_input_registers = partial(self._read, 'i')
+
+    def _read(self, register_type: str, address: int, count: int = 1, slave: int = 1) -> RawResponse:
+        key = (slave, register_type, address, count)
+        responses = self._responses.get(key)
+        if responses is None:
+            raise ModbusException(f'No captured response for reading {count} registers of type {register_type}, '
+                                  f'starting from {address} with slave id {slave}')
+        position = self._positions[key]
+        self._positions[key] = (position + 1) % len(responses)
+        return responses[position].response()
+
+    def close(self):
+        pass
+
+
+class ReplayModbusDevice(ModbusDevice):
+    """
+    Device which answers from a capture file instead of the wire, at full speed. The responses go through the same
+    decoding as those of a real device, so it can be used for decode benchmarks and regression tests on real payloads.
+    The register spec has to produce the same requests as the one used for the capture.
+    """
+
+    def __init__(self, capture_file_name: str, byteorder=Endian.BIG, wordorder=Endian.BIG,
+                 register_specs_file_name: str = None, registers_spec_df=None,
+                 register_block_list: list[RegisterBlock] = None):
+        super().__init__(byteorder=byteorder, wordorder=wordorder, register_specs_file_name=register_specs_file_name,
+                         registers_spec_df=registers_spec_df, register_block_list=register_block_list)
+        self.capture_file_name = capture_file_name
+        self.connect()
+
+    def connect(self):
+        self._client = _ReplayClient(read_capture(self.capture_file_name))
+        if self.register_block_list is not None:
+            self._set_modbus_client_in_block_list()
+
+    def disconnect(self):
+        self._client = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
@@ -24,9 +24,13 @@ setup(
         'test': [
             'pytest',
             'pytest-asyncio',
+            'pyserial',
             'twisted'
         ]
     },
+    entry_points={
+        'console_scripts': ['modbus-crawler=modbus_crawler.cli:main']
+    },
     zip_safe=False,
     keywords=['Modbus', 'Crawler'],
     python_requires='>=3.10',
@@ -0,0 +1,46 @@
+import pytest
+
+from modbus_crawler.aggregation import WindowAggregator
+from modbus_crawler.register_block import ModbusRegister
+
+
+def test_window_statistics():
+    aggregates = []
+    aggregator = WindowAggregator(window=60, callback=aggregates.append)
+
+    # Power ramps by 10 W per second from 0 s to 90 s, sampled every 30 s
+    for t in range(0, 120, 30):
+        aggregator.add({'power': 10 * t, 'running': t > 0, 'serial': 'SN1'}, timestamp=1200 + t)
+    assert len(aggregates) == 1
+
+    first = aggregates[0]
+    assert (first.start, first.end) == (1200, 1260)
+    assert first.values['power'] == {'min': 0.0, 'max': 300.0, 'mean': 150.0, 'last': 300.0, 'count': 2,
+                                     'integral': pytest.approx(10 * 60 ** 2 / 2)}
+    assert first.values['running']['mean'] == 0.5
+    assert first.values['serial'] == {'last': 'SN1', 'count': 2}
+
+    aggregator.flush()
+    second = aggregates[1]
+    assert second.start == 1260
+    assert second.values['power']['count'] == 2
+    assert second.values['power']['min'] == 600.0
+    # Integral from the window start at 60 s to the last sample at 90 s
+    assert second.values['power']['integral'] == pytest.approx(10 * (90 ** 2 - 60 ** 2) / 2)
+
+
+def test_schedule_callback():
+    aggregates = []
+    now = [0.0]
+    aggregator = WindowAggregator(window=10, callback=aggregates.append, clock=lambda: now[0])
+    registers = [ModbusRegister(name='voltage', data_type='float32', register=0, value=230.0)]
+
+    for second in range(25):
+        now[0] = 1000.0 + second
+        registers[0].value = 230.0 + second % 3
+        aggregator(registers)
+
+    assert [aggregate.start for aggregate in aggregates] == [1000.0, 1010.0]
+    assert aggregates[1].values['voltage']['count'] == 10
+    assert aggregates[1].values['voltage']['max'] == 232.0
+    assert aggregates[1].values['voltage']['integral'] == pytest.approx(10 * 231.0, rel=0.01)
@@ -0,0 +1,127 @@
+import pytest
+from pymodbus.exceptions import ConnectionException
+from pymodbus.pdu import ExceptionResponse
+
+from modbus_crawler.block_quality import QUALITY_GOOD, QUALITY_TIMEOUT, QUALITY_EXCEPTION, QUALITY_STALE
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+def _blocks():
+    blocks = []
+    for start in (0, 10, 20):
+        block = RegisterBlock(start_register=start, register_type='h')
+        block.add_register_to_list(ModbusRegister(name=f'r{start}', data_type='uint16', register=start, block=block))
+        blocks.append(block)
+    return blocks
+
+
+class _FlakyClient:
+    """
+    Register 10 fails with the given responses/errors first, register 20 answers with an illegal address exception.
+    """
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.requests = []
+
+    def read(self, address, count, slave):
+        self.requests.append(address)
+        if address == 20:
+            return ExceptionResponse(3, exception_code=2)
+        if address == 10 and self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return _Response([address + 1])
+
+
+def _bind(blocks, client):
+    for block in blocks:
+        block._read_function = client.read
+
+
+def test_failing_blocks_do_not_fail_the_cycle():
+    blocks = _blocks()
+    client = _FlakyClient([ConnectionException('gone'), ExceptionResponse(3)])
+    _bind(blocks, client)
+    device = ModbusDevice(register_block_list=blocks)
+
+    with pytest.raises(ConnectionException):
+        device.read_registers()
+
+    results = device.read_blocks()
+    assert [(result.quality, result.exception_code) for result in results] == [
+        (QUALITY_GOOD, None), (QUALITY_TIMEOUT, None), (QUALITY_EXCEPTION, 2)]
+    assert results[0].registers[0].value == 1
+    assert results[0].timestamp is not None
+    assert results[1].timestamp is None  # never read before
+
+    results = device.read_blocks(retries=1)
+    assert [(result.quality, result.attempts) for result in results] == [
+        (QUALITY_GOOD, 1), (QUALITY_GOOD, 1), (QUALITY_EXCEPTION, 2)]
+    assert results[1].registers[0].value == 11
+
+
+def test_failed_blocks_are_skipped():
+    blocks = _blocks()
+    client = _FlakyClient([])
+    _bind(blocks, client)
+    device = ModbusDevice(register_block_list=blocks)
+
+    qualities = []
+    for _ in range(4):
+        client.requests.clear()
+        qualities.append([result.quality for result in device.read_blocks(skip_cycles=2)])
+
+    assert qualities == [[QUALITY_GOOD, QUALITY_GOOD, QUALITY_EXCEPTION], [QUALITY_GOOD, QUALITY_GOOD, QUALITY_STALE],
+                         [QUALITY_GOOD, QUALITY_GOOD, QUALITY_STALE], [QUALITY_GOOD, QUALITY_GOOD, QUALITY_EXCEPTION]]
+    assert client.requests == [0, 10, 20]
+
+
+@pytest.mark.asyncio
+async def test_async_failing_blocks_do_not_fail_the_cycle():
+    blocks = _blocks()
+    client = _FlakyClient([TimeoutError()])
+
+    async def read(address, count, slave):
+        return client.read(address, count, slave)
+
+    for block in blocks:
+        block._read_function = read
+    device = AsyncModbusDevice(register_block_list=blocks)
+
+    results = await device.read_blocks(skip_cycles=1)
+    assert [result.quality for result in results] == [QUALITY_GOOD, QUALITY_TIMEOUT, QUALITY_EXCEPTION]
+    results = await device.read_blocks()
+    assert [result.quality for result in results] == [QUALITY_GOOD, QUALITY_STALE, QUALITY_STALE]
+    results = await device.read_blocks()
+    assert [result.quality for result in results] == [QUALITY_GOOD, QUALITY_GOOD, QUALITY_EXCEPTION]
+
+
+def test_writes_keep_the_time_of_the_last_good_read():
+    blocks = _blocks()
+    client = _FlakyClient([])
+    _bind(blocks, client)
+    client.write_register = lambda address, value, slave: None
+    device = ModbusDevice(register_block_list=blocks)
+    device._client = client
+
+    good = device.read_blocks()[1].timestamp
+    device.write_register('r10', 5)
+    assert blocks[1].read_time is None  # not served from the read cache any more
+
+    client.failures.append(ConnectionException('gone'))
+    result = device.read_blocks()[1]
+    assert result.quality == QUALITY_TIMEOUT
+    assert result.timestamp == pytest.approx(good, abs=0.01)
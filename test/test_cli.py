@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from pymodbus.constants import Endian
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.cli import load_config, main
+from modbus_crawler.traffic_capture import ReplayModbusDevice
+
+CONFIG = """[crawler]
+workers = 2
+sink = readings.jsonl
+
+[meter]
+ip_address = localhost
+port = {port}
+register_spec = registers_test_write.csv
+interval = 0.5
+
+[inverter]
+ip_address = 10.0.0.2
+register_spec = registers_test_read.csv
+cycling_time = 5
+byteorder = Endian.Little
+"""
+
+
+def _write_config(tmp_path, port=502):
+    config_file = tmp_path / 'fleet.ini'
+    config_file.write_text(CONFIG.format(port=port))
+    for spec in ['registers_test_write.csv', 'registers_test_read.csv']:
+        (tmp_path / spec).write_text(open(spec).read())
+    return str(config_file)
+
+
+def test_load_config(tmp_path):
+    config = load_config(_write_config(tmp_path))
+
+    assert config.workers == 2
+    assert config.sink == 'readings.jsonl'
+    meter, inverter = config.devices
+    assert (meter.name, meter.ip_address, meter.modbus_port, meter.interval) == ('meter', 'localhost', 502, 0.5)
+    assert meter.register_specs_file_name == os.path.join(tmp_path, 'registers_test_write.csv')
+    assert (inverter.modbus_port, inverter.interval) == (502, 5.0)
+    assert inverter.byteorder == Endian.LITTLE and inverter.wordorder == Endian.BIG
+
+
+def test_read_and_write(tmp_path, capsys):
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [0] * 200),
+                               co=ModbusSequentialDataBlock(1, [False] * 200))
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': ModbusServerContext(slaves=store, single=True),
+                             'identity': ModbusDeviceIdentification(), 'address': ("0.0.0.0", 5090)}).start()
+    time.sleep(0.5)
+    config_file = _write_config(tmp_path, port=5090)
+
+    main(['write', config_file, 'meter', 'Zahl_3', '-42'])
+    main(['write', config_file, 'meter', 'String_1', 'cli'])
+    main(['write', config_file, 'meter', 'Bool_3', 'true'])
+    capsys.readouterr()
+
+    main(['read', config_file, 'meter', 'Zahl_3', 'String_1', 'Bool_3'])
+    reading = json.loads(capsys.readouterr().out)
+    assert reading['device'] == 'meter'
+    assert reading['values'] == {'Zahl_3': -42, 'String_1': 'cli', 'Bool_3': True}
+
+    # A captured read decodes to the same values without the device
+    capture_file = str(tmp_path / 'meter.mbcap')
+    main(['read', config_file, 'meter', '--capture', capture_file])
+    reading = json.loads(capsys.readouterr().out)
+    replay = ReplayModbusDevice(capture_file, register_specs_file_name='registers_test_write.csv')
+    assert replay.read_registers_as_dict() == reading['values']
+
+
+def test_one_shot_imports_stay_small():
+    # Neither pymodbus nor schedule are needed to parse the command line
+    code = 'import sys, modbus_crawler.cli; print(sorted({m.split(".")[0] for m in sys.modules} & {"pymodbus", "schedule"}))'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': os.pardir})
+    assert result.stdout.strip() == '[]'
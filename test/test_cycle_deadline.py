@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from modbus_crawler.block_quality import QUALITY_GOOD, QUALITY_STALE
+from modbus_crawler.cycle_deadline import next_cycle_start
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.request_queue import PRIORITY_FAST_READ, PRIORITY_READ
+
+READ_TIME = 0.05
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+def _blocks(read_function):
+    """
+    A fast block after three slow ones, every read takes READ_TIME.
+    """
+    blocks = []
+    for start, priority in ((10, PRIORITY_READ), (20, PRIORITY_READ), (30, PRIORITY_READ), (0, PRIORITY_FAST_READ)):
+        block = RegisterBlock(start_register=start, register_type='h', priority=priority)
+        block.add_register_to_list(ModbusRegister(name=f'r{start}', data_type='uint16', register=start, block=block))
+        block._read_function = read_function
+        blocks.append(block)
+    return blocks
+
+
+def test_low_priority_blocks_are_deferred():
+    requests = []
+
+    def read(address, count, slave):
+        requests.append(address)
+        time.sleep(READ_TIME)
+        return _Response([address])
+
+    device = ModbusDevice(register_block_list=_blocks(read))
+
+    qualities = []
+    for _ in range(3):
+        requests.clear()
+        qualities.append([result.quality for result in device.read_blocks(budget=1.5 * READ_TIME)])
+        assert requests[0] == 0  # the fast block goes first
+
+    # Spec order: slow 10, slow 20, slow 30, fast 0. Deferred blocks go first in the next cycle.
+    assert qualities == [[QUALITY_GOOD, QUALITY_STALE, QUALITY_STALE, QUALITY_GOOD],
+                         [QUALITY_STALE, QUALITY_GOOD, QUALITY_STALE, QUALITY_GOOD],
+                         [QUALITY_STALE, QUALITY_STALE, QUALITY_GOOD, QUALITY_GOOD]]
+    assert device.cycle_stats.cycles == 3
+    assert device.cycle_stats.deferred_blocks == 6
+    assert device.cycle_stats.overruns == 3  # the second block of each cycle is started just before the deadline
+
+    # Without guarantee only the first block is read once the budget is gone. The longest deferred block goes first,
+    # so overrunning cycles read every block in turn instead of starving the slow ones.
+    good = []
+    for _ in range(4):
+        results = device.read_blocks(budget=0, guaranteed_priority=None)
+        assert sum(result.good for result in results) == 1
+        good.extend(result.block.start_register for result in results if result.good)
+    assert good == [10, 20, 0, 30]
+
+
+def test_next_cycle_start():
+    assert next_cycle_start(10.0, 1.0, 10.5) == (11.0, 0)
+    assert next_cycle_start(10.0, 1.0, 11.2) == (12.0, 1)
+    assert next_cycle_start(10.0, 1.0, 13.5) == (14.0, 3)
+
+
+def test_run_cycles_keeps_the_rate():
+    def read(address, count, slave):
+        return _Response([address])
+
+    device = ModbusDevice(register_block_list=_blocks(read))
+    starts = []
+    start = time.monotonic()
+    device.run_cycles(0.05, lambda results: starts.append(time.monotonic() - start), cycles=5)
+
+    assert starts[-1] == pytest.approx(0.2, abs=0.03)
+    assert device.cycle_stats.cycles == 5
+    assert device.cycle_stats.missed_cycles == 0
+
+
+@pytest.mark.asyncio
+async def test_async_run_cycles_drops_missed_starts():
+    slow = []
+
+    async def read(address, count, slave):
+        if not slow:
+            slow.append(address)
+            time.sleep(0.12)  # blocks the loop beyond two intervals
+        return _Response([address])
+
+    device = AsyncModbusDevice(register_block_list=_blocks(read))
+    results = []
+
+    async def callback(cycle):
+        results.append([result.quality for result in cycle])
+
+    await device.run_cycles(0.05, callback, budget=0.01, cycles=2)
+
+    assert results[0] == [QUALITY_STALE] * 3 + [QUALITY_GOOD]
+    assert results[1] == [QUALITY_GOOD] * 4
+    assert device.cycle_stats.missed_cycles == 2
+    assert device.cycle_stats.overruns == 1
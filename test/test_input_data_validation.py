@@ -1,6 +1,6 @@
 import pytest
 
-from modbus_crawler.input_data_validation import check_data_type, data_type_lookup
+from modbus_crawler.input_data_validation import check_data_type, data_type_lookup, check_bits
 
 @pytest.mark.parametrize(
     ("raw_data_type", "expected"),
@@ -21,3 +21,15 @@ from modbus_crawler.input_data_validation import check_data_type, data_type_look
 )
 def test_check_data_type_normalizes_short_integer_acronyms(raw_data_type, expected):
     assert check_data_type(raw_data_type) == expected
+
+
+def test_check_bits():
+    assert check_bits('running:0; fault:1;mode: 4-6;', 'bitfield16') == (('running', 0, 1), ('fault', 1, 1),
+                                                                       ('mode', 4, 3))
+    assert check_bits('', 'bitfield16') is None
+    assert check_bits('high:31', 'bitfield32') == (('high', 31, 1),)
+
+    for bits, data_type in [('a:16', 'bitfield16'), ('a:0;b:0-1', 'bitfield16'), ('a:0;a:1', 'bitfield16'),
+                            ('a:3-1', 'bitfield16'), ('a', 'bitfield16'), ('a:0', 'uint16')]:
+        with pytest.raises(ValueError):
+            check_bits(bits, data_type)
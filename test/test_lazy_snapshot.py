@@ -0,0 +1,91 @@
+import pytest
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadBuilder
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+def _build_block():
+    block = RegisterBlock(start_register=10, register_type='i')
+    for name, data_type, scaling in [('voltage', 'float32', None), ('current', 'int16', 0.1),
+                                     ('serial', 'string4', None), ('counter', 'uint32', None)]:
+        block.add_register_to_list(ModbusRegister(name=name, data_type=data_type, scaling=scaling, block=block,
+                                                  register=block.start_register + block.block_length))
+
+    builder = BinaryPayloadBuilder(byteorder=Endian.LITTLE, wordorder=Endian.LITTLE)
+    builder.add_32bit_float(230.5)
+    builder.add_16bit_int(-52)
+    builder.add_string('ABCDEFGH')
+    builder.add_32bit_uint(123456)
+    registers = builder.to_registers()
+
+    def read_function(address, count, slave):
+        return _Response(registers)
+
+    block._read_function = read_function
+    return block
+
+
+def _expected(device):
+    return {'voltage': 230.5, 'current': pytest.approx(-5.2), 'serial': device.read_registers_as_dict()['serial'],
+            'counter': 123456}
+
+
+def test_lazy_snapshot_decodes_on_access():
+    device = ModbusDevice(byteorder=Endian.LITTLE, wordorder=Endian.LITTLE, register_block_list=[_build_block()])
+
+    decoded = []
+    decode_register = device._decode_register
+    device._decode_register = lambda data, offset, register: decoded.append(register.name) or decode_register(
+        data, offset, register)
+
+    snapshot = device.read_registers_lazy()
+    assert decoded == []
+
+    assert snapshot['counter'] == 123456
+    assert snapshot['counter'] == 123456
+    assert decoded == ['counter']
+
+    assert list(snapshot) == ['voltage', 'current', 'serial', 'counter']
+    assert 'voltage' in snapshot and 'missing' not in snapshot
+    with pytest.raises(KeyError):
+        _ = snapshot['missing']
+
+    device._decode_register = decode_register
+    assert snapshot.to_dict() == _expected(device)
+
+
+def test_lazy_snapshot_does_not_touch_registers():
+    block = _build_block()
+    device = ModbusDevice(byteorder=Endian.LITTLE, wordorder=Endian.LITTLE, register_block_list=[block])
+
+    snapshot = device.read_registers_lazy()
+
+    assert snapshot['voltage'] == 230.5
+    assert block.register_list[0].value == 0
+
+
+@pytest.mark.asyncio
+async def test_lazy_snapshot_async():
+    block = _build_block()
+    read_function = block._read_function
+
+    async def read_function_async(address, count, slave):
+        return read_function(address, count, slave)
+
+    block._read_function = read_function_async
+    device = AsyncModbusDevice(byteorder=Endian.LITTLE, wordorder=Endian.LITTLE, register_block_list=[block])
+
+    snapshot = await device.read_registers_lazy()
+
+    assert snapshot.to_dict() == await device.read_registers_as_dict()
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.modbus_device_tcp_async import AsyncModbusTcpDevice
+from modbus_crawler.modbus_proxy import ModbusCachingProxy
+
+
+def run_modbus_server(port):
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [0] * 200),
+                               co=ModbusSequentialDataBlock(1, [False] * 200))
+    context = ModbusServerContext(slaves=store, single=True)
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': context, 'identity': ModbusDeviceIdentification(),
+                             'address': ("0.0.0.0", port)}).start()
+    return store
+
+
+async def _connected_device(port):
+    device = AsyncModbusTcpDevice(ip_address='localhost', modbus_port=port,
+                                  register_specs_file_name='registers_test_write.csv')
+    for _ in range(50):
+        try:
+            await device.connect()
+            return device
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f'Modbus server on port {port} did not start')
+
+
+@pytest.mark.asyncio
+async def test_proxy_serves_cached_values_and_passes_writes_through():
+    store = run_modbus_server(5070)
+    upstream = await _connected_device(5070)
+    await upstream.write_register('Zahl_3', 1234)
+    await upstream.write_register('String_1', 'cached')
+
+    proxy = ModbusCachingProxy(upstream, interval=0.1, host='127.0.0.1', port=5071)
+    await proxy.start()
+    downstream = await _connected_device(5071)
+    try:
+        await proxy.poll_once()
+        data = await downstream.read_registers_as_dict()
+        assert data['Zahl_3'] == 1234
+        assert data['String_1'] == 'cached'
+
+        # Outside of the register spec
+        assert (await downstream.client.read_holding_registers(150, count=1)).isError()
+
+        await downstream.write_register('Zahl_4', 4321)
+        await downstream.write_register('Bool_3', True)
+        assert store.getValues(3, 6, 1) == [4321]
+        assert (await upstream.read_register('Bool_3')).value is True
+        assert (await downstream.read_register('Zahl_4')).value == 4321
+
+        # Writes outside of the register spec reach the device, but are not served
+        response = await downstream.client.write_register(150, 99)
+        assert not response.isError() and response.value == 99
+        assert store.getValues(3, 150, 1) == [99]
+        response = await downstream.client.write_coil(150, True)
+        assert not response.isError() and response.value is True
+        assert store.getValues(1, 150, 1) == [True]
+        assert (await downstream.client.read_holding_registers(150, count=1)).isError()
+
+        # Values older than max_age are not served
+        proxy.max_age = 0
+        response = await downstream.client.read_holding_registers(1, count=2)
+        assert response.isError() and response.exception_code == 0x0B
+
+        # Writes still report their result while the image is stale
+        response = await downstream.client.write_register(6, 77)
+        assert not response.isError() and response.value == 77
+        assert store.getValues(3, 6, 1) == [77]
+    finally:
+        downstream.disconnect()
+        await proxy.stop()
+        upstream.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_polling_failures_are_logged(caplog):
+    run_modbus_server(5072)
+    upstream = await _connected_device(5072)
+    proxy = ModbusCachingProxy(upstream, interval=0.02, host='127.0.0.1', port=5073)
+
+    async def broken():
+        raise ValueError('broken decoder')
+
+    proxy.poll_once = broken
+    task = asyncio.create_task(proxy._poll())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    upstream.disconnect()
+
+    errors = [record for record in caplog.records if record.levelname == 'ERROR']
+    assert len(errors) == 1
+    assert 'broken decoder' in caplog.text
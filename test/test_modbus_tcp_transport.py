@@ -0,0 +1,114 @@
+import asyncio
+import struct
+import threading
+
+import pytest
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.modbus_device_tcp_async import AsyncModbusTcpDevice
+from modbus_crawler.modbus_tcp_transport import AsyncModbusTcpTransport, RawResponse
+
+
+def run_modbus_server(port):
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [0] * 200),
+                               co=ModbusSequentialDataBlock(1, [False] * 200))
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': ModbusServerContext(slaves=store, single=True),
+                             'identity': ModbusDeviceIdentification(), 'address': ("0.0.0.0", port)}).start()
+
+
+async def _connected_device(port, **kwargs):
+    device = AsyncModbusTcpDevice(ip_address='localhost', modbus_port=port,
+                                  register_specs_file_name='registers_test_write.csv', **kwargs)
+    for _ in range(50):
+        try:
+            await device.connect()
+            return device
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f'Modbus server on port {port} did not start')
+
+
+@pytest.mark.asyncio
+async def test_native_transport_reads_like_pymodbus():
+    run_modbus_server(5110)
+    native = await _connected_device(5110, native_transport=True)
+    values = {'Zahl_1': 1.5, 'Zahl_3': -1234, 'Zahl_4': 4321, 'Zahl_5': -70000, 'Zahl_9': 0.25, 'Zahl_11': -2.5e100,
+              'String_1': 'native', 'Bool_3': True}
+    for name, value in values.items():
+        await native.write_register(name, value)
+
+    pymodbus = await _connected_device(5110)
+    try:
+        data = await native.read_registers_as_dict()
+        assert data == await pymodbus.read_registers_as_dict()
+        assert {name: data[name] for name in values} == values
+        assert (await native.read_register('Zahl_3')).value == -1234
+
+        resp = await native.client.read_holding_registers(500, count=1)
+        assert resp.isError() and resp.exception_code == 2
+    finally:
+        native.disconnect()
+        pymodbus.disconnect()
+    assert not native.connected
+
+
+class _PipeliningServer(asyncio.Protocol):
+    """
+    Holding registers hold their address. Answers a burst of requests in reverse order once all of them arrived.
+    """
+
+    def __init__(self, burst):
+        self.burst = burst
+        self.frames = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        while data:
+            length = struct.unpack_from('>H', data, 4)[0]
+            self.frames.append(data[:6 + length])
+            data = data[6 + length:]
+        if len(self.frames) < self.burst:
+            return
+
+        for frame in reversed(self.frames):
+            transaction_id, _, _, unit, function_code, address, count = struct.unpack('>HHHBBHH', frame)
+            registers = struct.pack(f'>{count}H', *range(address, address + count))
+            self.transport.write(struct.pack('>HHHBBB', transaction_id, 0, 3 + len(registers), unit, function_code,
+                                             len(registers)) + registers)
+        self.frames.clear()
+
+
+@pytest.mark.asyncio
+async def test_pipelined_responses_are_matched_by_transaction_id():
+    server = await asyncio.get_running_loop().create_server(lambda: _PipeliningServer(burst=4), '127.0.0.1', 5111)
+    client = AsyncModbusTcpTransport('127.0.0.1', 5111, timeout=1, max_in_flight=4)
+    try:
+        assert await client.connect()
+        responses = await asyncio.gather(*(client.read_holding_registers(address, count=2) for address in range(4)))
+        assert [resp.registers for resp in responses] == [[0, 1], [1, 2], [2, 3], [3, 4]]
+
+        # Only one request of the burst can be sent at a time, so the server never answers
+        client.max_in_flight = 1
+        client._in_flight = asyncio.Semaphore(1)
+        with pytest.raises(ModbusIOException):
+            await client.read_holding_registers(0, count=1)
+    finally:
+        client.close()
+        server.close()
+
+
+def test_raw_response():
+    resp = RawResponse(1, bytes([0b00000101, 0b1]))
+    assert resp.bits == [True, False, True] + [False] * 5 + [True] + [False] * 7
+    resp = RawResponse(3, b'\x00\x01\xff\xff')
+    assert resp.registers == [1, 0xFFFF]
+    resp.registers = [1, 2, 3]
+    assert resp.payload == b'\x00\x01\x00\x02\x00\x03'
+    assert not resp.isError()
+    assert RawResponse(3, exception_code=2).isError()
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from modbus_crawler.polling_engine import ThreadedPollingEngine, serial_port_of
+
+
+class _Port:
+    """
+    Records how many cycles run on it at the same time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+
+
+class _FakeDevice:
+    def __init__(self, value, delay=0.01, serial_bus=None, fail=False):
+        self.value = value
+        self.delay = delay
+        self.serial_bus = serial_bus
+        self.fail = fail
+        self.connected = False
+        self.device_port = _Port()
+
+    def connect(self):
+        self.connected = True
+
+    def read_registers_as_dict(self):
+        ports = [self.device_port] + ([self.serial_bus] if self.serial_bus is not None else [])
+        for port in ports:
+            port.enter()
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise TimeoutError()
+            return {'power': self.value}
+        finally:
+            for port in ports:
+                port.leave()
+
+
+def _collect(engine, duration):
+    readings = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        reading = engine.get_reading(timeout=0.01)
+        if reading is not None:
+            readings.append(reading)
+    return readings
+
+
+def test_many_devices_on_few_workers():
+    devices = {f'meter_{i}': _FakeDevice(i) for i in range(40)}
+    devices['broken'] = _FakeDevice(0, fail=True)
+    engine = ThreadedPollingEngine(workers=4)
+    for name, device in devices.items():
+        engine.add_device(name, device, interval=0.1)
+    engine.start()
+    try:
+        readings = _collect(engine, 0.35)
+    finally:
+        engine.stop()
+
+    names = {reading.device for reading in readings}
+    assert names == set(devices)
+    for reading in readings:
+        if reading.device == 'broken':
+            assert 'TimeoutError' in reading.error
+        else:
+            assert reading.values == {'power': devices[reading.device].value}
+    for device in devices.values():
+        assert device.connected
+        assert device.device_port.max_active == 1
+
+
+def test_devices_on_one_serial_line_are_not_read_concurrently():
+    bus = _Port()
+    devices = {f'slave_{i}': _FakeDevice(i, delay=0.02, serial_bus=bus) for i in range(4)}
+    engine = ThreadedPollingEngine(workers=4)
+    for name, device in devices.items():
+        engine.add_device(name, device, interval=0.05)
+    engine.start()
+    try:
+        readings = _collect(engine, 0.3)
+    finally:
+        engine.stop()
+
+    assert bus.max_active == 1
+    assert {reading.device for reading in readings} == set(devices)
+    # Four 20 ms reads do not fit into 50 ms, so the line is the bottleneck
+    assert sum(engine.missed_cycles(name) for name in devices) > 0
+
+
+def test_slow_device_skips_cycles():
+    engine = ThreadedPollingEngine(workers=2)
+    engine.add_device('slow', _FakeDevice(1, delay=0.12), interval=0.05)
+    engine.start()
+    try:
+        readings = _collect(engine, 0.3)
+    finally:
+        engine.stop()
+
+    assert 2 <= len(readings) <= 3
+    assert engine.missed_cycles('slow') >= 2
+
+
+def test_duplicate_names_are_rejected():
+    engine = ThreadedPollingEngine()
+    engine.add_device('meter', _FakeDevice(1))
+    with pytest.raises(ValueError):
+        engine.add_device('meter', _FakeDevice(2))
+    engine.remove_device('meter')
+    engine.add_device('meter', _FakeDevice(2))
+
+
+def test_serial_port_of():
+    bus = _Port()
+    assert serial_port_of(_FakeDevice(1, serial_bus=bus)) is bus
+    assert serial_port_of(_FakeDevice(1)) is None
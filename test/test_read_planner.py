@@ -0,0 +1,99 @@
+import pytest
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.read_planner import plan_reads
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+
+
+class _Response:
+    def __init__(self, registers=None, bits=None):
+        self.registers = registers
+        self.bits = bits
+
+    def isError(self):
+        return False
+
+
+class _Client:
+    def __init__(self):
+        self.requests = []
+
+    def _read(self, address, count, slave):
+        self.requests.append((address, count, slave))
+        return _Response(registers=[address + i for i in range(count)])
+
+    read_holding_registers = _read
+    read_input_registers = _read
+
+    def read_coils(self, address, count, slave):
+        self.requests.append((address, count, slave))
+        return _Response(bits=[(address + i) % 2 == 1 for i in range(count)])
+
+
+def _block(start, count, register_type='h', slave_id=1, data_type='uint16'):
+    block = RegisterBlock(start_register=start, register_type=register_type, slave_id=slave_id)
+    for i in range(count):
+        register = start + block.block_length
+        block.add_register_to_list(ModbusRegister(name=f'{register_type}{slave_id}_{register}', data_type=data_type,
+                                                  register=register, block=block))
+    return block
+
+
+def _device(*blocks, device_class=ModbusDevice):
+    device = device_class(register_block_list=list(blocks))
+    device._client = client = _Client()
+    device._set_modbus_client_in_block_list()
+    return device, client
+
+
+def _registers(device, *names):
+    return [device._register_index[name] for name in names]
+
+
+def test_plan_merges_small_gaps_across_blocks():
+    device, _ = _device(_block(0, 10), _block(20, 10), _block(100, 10))
+
+    requests = plan_reads(_registers(device, 'h1_25', 'h1_2', 'h1_8', 'h1_105', 'h1_2'), max_gap=16)
+
+    assert [(r.start_register, r.count) for r in requests] == [(2, 24), (105, 1)]
+    assert [len(r.registers) for r in requests] == [3, 1]
+
+
+def test_plan_splits_at_pdu_limit_and_by_type():
+    device, _ = _device(_block(0, 200), _block(0, 10, register_type='i'), _block(0, 10, slave_id=2))
+
+    requests = plan_reads(_registers(device, 'h1_0', 'h1_124', 'h1_125', 'i1_3', 'h2_3'), max_gap=200)
+
+    assert [(r.slave_id, r.register_type, r.start_register, r.count) for r in requests] == [
+        (1, 'h', 0, 125), (1, 'h', 125, 1), (1, 'i', 3, 1), (2, 'h', 3, 1)]
+
+
+def test_read_registers_subset():
+    device, client = _device(_block(0, 10), _block(20, 4, data_type='uint32'), _block(50, 10, register_type='c',
+                                                                                    data_type='bool'))
+
+    assert device.read_registers_as_dict(names=['h1_22', 'h1_3', 'c1_51', 'c1_54']) == {
+        'h1_22': 22 * 2 ** 16 + 23, 'h1_3': 3, 'c1_51': True, 'c1_54': False}
+    assert client.requests == [(51, 4, 1), (3, 1, 1), (22, 2, 1)]
+
+    client.requests.clear()
+    assert list(device.read_registers_as_dict(names=[range(4, 7)])) == ['h1_4', 'h1_5', 'h1_6']
+    assert client.requests == [(4, 3, 1)]
+
+    with pytest.raises(ValueError):
+        device.read_registers(names=['missing'])
+
+
+@pytest.mark.asyncio
+async def test_read_registers_subset_async():
+    device, client = _device(_block(0, 10), _block(20, 10), device_class=AsyncModbusDevice)
+
+    async def read_holding_registers(address, count, slave):
+        return _Client._read(client, address, count, slave)
+
+    for block in device.register_block_list:
+        block._read_function = read_holding_registers
+
+    assert await device.read_registers_as_dict(names=['h1_21', 'h1_9'], max_gap=0) == {'h1_21': 21, 'h1_9': 9}
+    assert client.requests == [(9, 1, 1), (21, 1, 1)]
@@ -0,0 +1,160 @@
+import struct
+
+import pytest
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadBuilder, BinaryPayloadDecoder
+
+from modbus_crawler.modbus_device import ModbusDevice, response_payload, unpack_function, swap_bytes
+from modbus_crawler.modbus_register_list_parser_csv import CsvStringParser
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+@pytest.mark.parametrize('byteorder', [Endian.BIG, Endian.LITTLE])
+@pytest.mark.parametrize('wordorder', [Endian.BIG, Endian.LITTLE])
+@pytest.mark.parametrize(('data_type', 'add', 'decode', 'value'), [
+    ('int16', 'add_16bit_int', 'decode_16bit_int', -1234),
+    ('uint32', 'add_32bit_uint', 'decode_32bit_uint', 0x10203040),
+    ('int32', 'add_32bit_int', 'decode_32bit_int', -123456),
+    ('uint64', 'add_64bit_uint', 'decode_64bit_uint', 0x0102030405060708),
+    ('float16', 'add_16bit_float', 'decode_16bit_float', 1.5),
+    ('float32', 'add_32bit_float', 'decode_32bit_float', 3.25),
+    ('float64', 'add_64bit_float', 'decode_64bit_float', -1e100),
+])
+def test_unpack_function_matches_pymodbus_decoder(byteorder, wordorder, data_type, add, decode, value):
+    builder = BinaryPayloadBuilder(byteorder=byteorder, wordorder=wordorder)
+    builder.add_16bit_uint(0xFFFF)  # decode at an offset
+    getattr(builder, add)(value)
+    registers = builder.to_registers()
+
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, byteorder=byteorder, wordorder=wordorder)
+    decoder.skip_bytes(2)
+    expected = getattr(decoder, decode)()
+
+    payload = response_payload(_Response(registers))
+    assert unpack_function(data_type, byteorder, wordorder)(payload, 2) == expected
+
+
+def _string_device(byteorder=Endian.BIG):
+    block = RegisterBlock(start_register=0, register_type='h')
+    for name in ('first', 'second'):
+        block.add_register_to_list(ModbusRegister(name=name, data_type='string4', block=block,
+                                                  register=block.start_register + block.block_length))
+    return ModbusDevice(byteorder=byteorder, register_block_list=[block]), block
+
+
+@pytest.mark.parametrize('byteorder', [Endian.BIG, Endian.LITTLE])
+def test_strings_round_trip(byteorder):
+    device, block = _string_device(byteorder)
+
+    registers = []
+    for name, value in [('first', 'Hello'), ('second', 'odd')]:
+        _, prepared_value, _ = device._prepare_write_register(name, value)
+        registers += prepared_value
+
+    assert device._parse_response(_Response(registers), block)[0].value == 'Hello'
+    assert device._parse_response(_Response(registers), block)[1].value == 'odd'
+    assert device._decode_register(response_payload(_Response(registers)), 4, block.register_list[1]) == 'odd'
+
+
+def test_string_encoding_and_termination():
+    device, block = _string_device()
+    device.string_encoding = 'latin-1'
+    device.string_padding = '\x00'
+    device.string_null_terminated = True
+
+    _, prepared_value, _ = device._prepare_write_register('first', 'Grüße')
+    assert device._parse_response(_Response(prepared_value + [0x2020] * 4), block)[0].value == 'Grüße'
+
+    with pytest.raises(ValueError):
+        device._prepare_write_register('first', 'too long string')
+
+    # Everything after the terminating null byte is garbage
+    raw = swap_bytes(b'AB\x00CDEFG')
+    assert device._parse_response(_Response(list(struct.unpack('>4H', raw)) + [0] * 4), block)[0].value == 'AB'
+
+
+BITFIELD_SPEC = """Register_start,Register_type,Data_type,Name,Bits,mode
+0,h,bitfield,status,running:0;fault:1;mode:4-6,rw
+-,,flags32,alarms,,
+"""
+
+
+@pytest.mark.parametrize('byteorder', [Endian.BIG, Endian.LITTLE])
+def test_bitfields(byteorder):
+    block = CsvStringParser.get_register_list(BITFIELD_SPEC)[0]
+    device = ModbusDevice(byteorder=byteorder, wordorder=byteorder, register_block_list=[block])
+
+    _, status, _ = device._prepare_write_register('status', {'fault': True, 'mode': 5})
+    _, alarms, _ = device._prepare_write_register('alarms', (1 << 31) | 4)
+
+    values = {register.name: register.value for register in device._parse_response(_Response(status + alarms), block)}
+    assert values['status'] == {'running': False, 'fault': True, 'mode': 5}
+    assert [name for name, value in values['alarms'].items() if value] == ['bit2', 'bit31']
+
+    with pytest.raises(ValueError):
+        device._prepare_write_register('status', {'mode': 8})
+    with pytest.raises(ValueError):
+        device._prepare_write_register('status', {'unknown': 1})
+
+
+class _BitResponse:
+    def __init__(self, bits):
+        # Responses are padded to full bytes
+        self.bits = bits + [False] * (-len(bits) % 8)
+
+    def isError(self):
+        return False
+
+
+def test_long_coil_blocks_are_read_in_several_requests():
+    block = RegisterBlock(start_register=10, register_type='c')
+    for _ in range(4500):
+        block.add_register_to_list(ModbusRegister(name=f'coil_{block.block_length}', data_type='bool', block=block,
+                                                  register=block.start_register + block.block_length))
+    device = ModbusDevice(register_block_list=[block])
+    requests = []
+
+    def read_function(address, count, slave):
+        requests.append((address, count))
+        return _BitResponse([address % 3 == 0 for address in range(address, address + count)])
+
+    block._read_function = read_function
+
+    values = device.read_registers_as_dict()
+    assert requests == [(10, 2000), (2010, 2000), (4010, 500)]
+    assert all(values[f'coil_{i}'] == ((10 + i) % 3 == 0) for i in range(4500))
+
+
+def test_long_register_blocks_are_read_in_several_requests():
+    block = RegisterBlock(start_register=0, register_type='h')
+    for _ in range(150):
+        block.add_register_to_list(ModbusRegister(name=f'value_{block.block_length}', data_type='uint32', block=block,
+                                                  register=block.block_length))
+    device = ModbusDevice(register_block_list=[block])
+    requests = []
+
+    def read_function(address, count, slave):
+        requests.append((address, count))
+        return _Response([address // 2 if address % 2 else 0 for address in range(address, address + count)])
+
+    block._read_function = read_function
+
+    values = device.read_registers_as_dict()
+    # No uint32 is split between two requests
+    assert requests == [(0, 124), (124, 124), (248, 52)]
+    assert [values[f'value_{2 * i}'] for i in range(150)] == list(range(150))
+
+
+def test_registers_longer_than_a_request_are_split():
+    block = RegisterBlock(start_register=0, register_type='h')
+    block.add_register_to_list(ModbusRegister(name='counter', data_type='uint16', register=0, block=block))
+    block.add_register_to_list(ModbusRegister(name='text', data_type='string128', register=1, block=block))
+    assert block._requests() == [(0, 1), (1, 125), (126, 3)]
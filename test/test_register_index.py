@@ -0,0 +1,51 @@
+import pytest
+
+from modbus_crawler.modbus_register_list_parser_csv import CsvStringParser
+from modbus_crawler.register_index import RegisterIndex
+
+SPEC = """Register_start,Register_type,Data_type,Name,Unit_id
+100,h,float32,holding_100,1
+-,,string4,holding_102,
+-,,uint16,holding_106,
+100,i,uint16,input_100,1
+100,h,int16,slave_2_holding_100,2
+200,h,uint64,holding_200,1
+"""
+
+
+@pytest.fixture
+def index():
+    return RegisterIndex(CsvStringParser.get_register_list(SPEC))
+
+
+def test_same_address_does_not_collide(index):
+    assert len(index) == 6
+    assert index.get((1, 'h', 100)).name == 'holding_100'
+    assert index.get((1, 'i', 100)).name == 'input_100'
+    assert index.get((2, 'h', 100)).name == 'slave_2_holding_100'
+
+    with pytest.raises(ValueError):
+        index.get(100)
+    assert index[106].name == 'holding_106'
+    assert index.get(107) is None
+    assert index.get((1, 'h', 101)) is None  # inside a register, but not its start
+
+
+def test_address_queries(index):
+    assert index.find(104, slave_id=1, register_type='h').name == 'holding_102'
+    assert index.find(203, slave_id=1, register_type='h').name == 'holding_200'
+    assert index.find(107, slave_id=1, register_type='h') is None
+    assert index.find(100, slave_id=3, register_type='h') is None
+
+    assert [r.name for r in index.overlapping(101, 103, slave_id=1, register_type='h')] == ['holding_100',
+                                                                                            'holding_102']
+    assert [r.name for r in index.starting_in(range(100, 102))] == ['holding_100', 'input_100', 'slave_2_holding_100']
+
+
+def test_resolve(index):
+    registers = index.resolve(['holding_106', (1, 'h', range(100, 107)), (1, 'i', 100), 200])
+
+    assert [r.name for r in registers] == ['holding_106', 'holding_100', 'holding_102', 'input_100', 'holding_200']
+
+    with pytest.raises(ValueError):
+        index.resolve(['missing'])
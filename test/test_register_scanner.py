@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import pytest
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSparseDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.modbus_register_list_parser_csv import CsvStringParser
+from modbus_crawler.register_scanner import RegisterScanner, RegisterRange, ranges_to_csv
+
+
+def _sparse(addresses):
+    # Data blocks of the server are 1-based, address n on the wire is stored at n + 1
+    return ModbusSparseDataBlock({address + 1: 0 for address in addresses})
+
+
+def run_modbus_server(port):
+    slaves = {
+        1: ModbusSlaveContext(hr=_sparse([*range(10, 30), *range(200, 210)]), ir=_sparse(range(0, 3)),
+                              co=_sparse([]), di=_sparse([])),
+        3: ModbusSlaveContext(hr=_sparse([]), ir=_sparse([]), co=_sparse(range(100, 2100)), di=_sparse([])),
+    }
+    context = ModbusServerContext(slaves=slaves, single=False)
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': context, 'identity': ModbusDeviceIdentification(),
+                             'address': ("0.0.0.0", port)}).start()
+
+
+@pytest.mark.asyncio
+async def test_scan_finds_units_and_ranges():
+    run_modbus_server(5080)
+    client = AsyncModbusTcpClient(host='localhost', port=5080)
+    for _ in range(50):
+        if await client.connect():
+            break
+        await asyncio.sleep(0.1)
+
+    try:
+        scanner = RegisterScanner(client, address_range=range(0, 2200))
+        ranges = await scanner.scan(unit_ids=range(1, 6))
+    finally:
+        client.close()
+
+    assert ranges == [RegisterRange(1, 'h', 10, 20), RegisterRange(1, 'h', 200, 10), RegisterRange(1, 'i', 0, 3),
+                      RegisterRange(3, 'c', 100, 2000)]
+
+    blocks = CsvStringParser.get_register_list(ranges_to_csv(ranges))
+    assert [(b.slave_id, b.register_type, b.start_register, b.block_length) for b in blocks] == [
+        (1, 'h', 10, 20), (1, 'h', 200, 10), (1, 'i', 0, 3), (3, 'c', 100, 2000)]
+    assert blocks[0].register_list[0].name == 'h_1_10'
+    assert blocks[0].register_list[0].data_type == 'uint16'
+
+
+@pytest.mark.asyncio
+async def test_rate_limit():
+    class _Client:
+        async def read_holding_registers(self, address, count, slave):
+            if slave % 2:
+                raise TimeoutError()
+            return ExceptionResponse(3)  # Timeout of pymodbus
+
+    scanner = RegisterScanner(_Client(), register_types='h', requests_per_second=50)
+    start = asyncio.get_running_loop().time()
+    assert await scanner.find_unit_ids(range(1, 11)) == []
+    assert scanner.requests == 10
+    assert asyncio.get_running_loop().time() - start >= 0.17
@@ -0,0 +1,51 @@
+import os
+
+from modbus_crawler.benchmark import register_memory
+from modbus_crawler.modbus_register_list_parser_csv import CsvFileParser
+
+
+def test_identical_devices_share_metadata():
+    first = CsvFileParser.get_register_list('registers_test_read.csv')
+    second = CsvFileParser.get_register_list('registers_test_read.csv')
+
+    assert first[0] is not second[0]
+    assert first[0].register_list[0] is not second[0].register_list[0]
+    assert second[0].register_list[0].block is second[0]
+    assert first[0].register_list[0].unit is second[0].register_list[0].unit
+    assert [b.signature() for b in first] == [b.signature() for b in second]
+
+    first[0].register_list[0].value = 50.0
+    assert second[0].register_list[0].value == 0
+
+
+def test_registers_are_compact():
+    register = CsvFileParser.get_register_list('registers_test_read.csv')[0].register_list[0]
+    assert not hasattr(register, '__dict__')
+
+    assert register_memory('registers_test_read.csv', devices=10)['bytes_per_register'] < 200
+
+
+def test_edited_spec_replaces_its_template(tmp_path):
+    spec = tmp_path / 'spec.csv'
+    spec.write_text('Register_start,Register_type,Data_type,Name\n0,h,uint16,power\n')
+    mtime = os.stat(spec).st_mtime_ns
+    assert CsvFileParser.get_register_list(str(spec))[0].register_list[0].name == 'power'
+
+    # Rewritten within the same modification time tick, only the size tells the difference
+    spec.write_text('Register_start,Register_type,Data_type,Name\n0,h,uint16,voltage\n')
+    os.utime(spec, ns=(mtime, mtime))
+    assert CsvFileParser.get_register_list(str(spec))[0].register_list[0].name == 'voltage'
+
+    # Parsing the unchanged file again shares the metadata (here the bit definitions), but not the registers
+    spec.write_text('Register_start,Register_type,Data_type,Name,Bits\n0,h,bitfield16,status,running:0;fault:1\n')
+    mtime = os.stat(spec).st_mtime_ns
+    first = CsvFileParser.get_register_list(str(spec))[0].register_list[0]
+    second = CsvFileParser.get_register_list(str(spec))[0].register_list[0]
+    assert first is not second
+    assert first.bits is second.bits
+
+    # Touching the file is enough for a fresh parse
+    os.utime(spec, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+    touched = CsvFileParser.get_register_list(str(spec))[0].register_list[0]
+    assert touched.bits == first.bits
+    assert touched.bits is not first.bits
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.modbus_device_tcp import ModbusTcpDevice
+from modbus_crawler.modbus_device_tcp_async import AsyncModbusTcpDevice
+from modbus_crawler.modbus_register_list_parser_csv import CsvStringParser
+from modbus_crawler.request_queue import RequestQueue, AsyncRequestQueue, PRIORITY_FAST_READ, PRIORITY_READ
+
+SPEC = """Register_start,Register_type,Data_type,Name,Priority,mode
+0,h,int16,setpoint,,rw
+10,h,uint16,fast_measurement,fast,r
+20,h,uint16,slow_measurement,,r
+"""
+
+
+class _BlockingClient:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.connected = True
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def __getattr__(self, function_name):
+        def call(*args, **kwargs):
+            if not self.calls:
+                self.release.wait()  # hold the connection until all other requests are queued
+            self.calls.append(function_name)
+        return call
+
+
+def test_priority_order():
+    client = _BlockingClient()
+    request_queue = RequestQueue(client)
+    request_queue.connect()
+    slow = request_queue.client
+    fast = slow.for_priority(PRIORITY_FAST_READ)
+
+    threads = [threading.Thread(target=slow.read_holding_registers, args=(0,))]
+    threads[0].start()
+    time.sleep(0.05)  # first read is on the wire
+    for call in [lambda: slow.read_input_registers(0), lambda: fast.read_coils(0), lambda: slow.write_register(0, 1)]:
+        threads.append(threading.Thread(target=call))
+        threads[-1].start()
+        time.sleep(0.01)
+    client.release.set()
+    for thread in threads:
+        thread.join(timeout=1)
+    request_queue.close()
+
+    assert client.calls == ['read_holding_registers', 'write_register', 'read_coils', 'read_input_registers']
+
+
+@pytest.mark.asyncio
+async def test_async_priority_order():
+    class _Client:
+        connected = True
+
+        def __init__(self):
+            self.calls = []
+
+        async def connect(self):
+            return True
+
+        def close(self):
+            pass
+
+        def __getattr__(self, function_name):
+            async def call(*args, **kwargs):
+                await asyncio.sleep(0.01)
+                self.calls.append(function_name)
+            return call
+
+    client = _Client()
+    request_queue = AsyncRequestQueue(client)
+    await request_queue.connect()
+    slow = request_queue.client
+
+    first = asyncio.create_task(slow.read_holding_registers(0))
+    await asyncio.sleep(0.001)  # first read is on the wire
+    await asyncio.gather(slow.read_input_registers(0), slow.for_priority(PRIORITY_FAST_READ).read_coils(0),
+                         slow.write_register(0, 1), first)
+    request_queue.close()
+
+    assert client.calls == ['read_holding_registers', 'write_register', 'read_coils', 'read_input_registers']
+
+
+def run_modbus_server(port):
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [0] * 100))
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': ModbusServerContext(slaves=store, single=True),
+                             'identity': ModbusDeviceIdentification(), 'address': ("0.0.0.0", port)}).start()
+    time.sleep(0.5)
+
+
+def test_device_with_request_queue():
+    run_modbus_server(5100)
+    device = ModbusTcpDevice(ip_address='localhost', modbus_port=5100, queue_requests=True, auto_connect=False)
+    device.set_registers_spec(register_block_list=CsvStringParser.get_register_list(SPEC))
+    device.connect()
+
+    priorities = [block._read_function.__self__.read_priority for block in device.register_block_list]
+    assert priorities == [PRIORITY_READ, PRIORITY_FAST_READ, PRIORITY_READ]
+
+    reader = threading.Thread(target=lambda: [device.read_registers() for _ in range(20)])
+    reader.start()
+    device.write_register('setpoint', -5)
+    reader.join()
+
+    assert device.read_register('setpoint').value == -5
+
+    # Reconnecting goes through the same queue instead of starting another worker thread
+    client = device.client
+    for _ in range(3):
+        device.connect()
+    assert device.client is client
+    assert sum(thread.name == 'RequestQueue(localhost:5100)' for thread in threading.enumerate()) == 1
+
+    device.disconnect()
+    assert not device.connected
+    device.connect()
+    assert device.read_register('setpoint').value == -5
+    device.disconnect()
+
+
+def test_spec_set_after_connect_is_bound_by_connect():
+    run_modbus_server(5102)
+    device = ModbusTcpDevice(ip_address='localhost', modbus_port=5102)
+    device.set_registers_spec(register_block_list=CsvStringParser.get_register_list(SPEC))
+    device.connect()
+
+    device.write_register('setpoint', 3)
+    assert device.read_register('setpoint').value == 3
+    device.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_async_device_with_request_queue():
+    run_modbus_server(5101)
+    device = AsyncModbusTcpDevice(ip_address='localhost', modbus_port=5101, queue_requests=True)
+    device.set_registers_spec(register_block_list=CsvStringParser.get_register_list(SPEC))
+    await device.connect()
+
+    await asyncio.gather(device.read_registers(), device.write_register('setpoint', 7), device.read_registers())
+    assert (await device.read_register('setpoint')).value == 7
+
+    device.disconnect()
+    await device.connect()
+    assert (await device.read_registers_as_dict())['setpoint'] == 7
+    device.disconnect()
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from pymodbus import FramerType
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.modbus_device_rtu_tcp import ModbusRtuOverTcpDevice
+from modbus_crawler.modbus_device_rtu_tcp_async import AsyncModbusRtuOverTcpDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.serial_bus import SerialGateway
+
+
+def run_rtu_over_tcp_server(port):
+    slaves = {slave_id: ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [10 * slave_id + 1, 10 * slave_id + 2]))
+              for slave_id in (1, 2)}
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': ModbusServerContext(slaves=slaves, single=False), 'framer': FramerType.RTU,
+                             'identity': ModbusDeviceIdentification(), 'address': ("0.0.0.0", port)}).start()
+    time.sleep(0.5)
+
+
+def _register_blocks(slave_id):
+    block = RegisterBlock(start_register=0, register_type='h', slave_id=slave_id, mode='rw')
+    block.add_register_to_list(ModbusRegister(name='first', data_type='uint16', register=0, block=block))
+    block.add_register_to_list(ModbusRegister(name='second', data_type='uint16', register=1, block=block))
+    return [block]
+
+
+def test_device_owns_its_gateway():
+    run_rtu_over_tcp_server(5120)
+    device = ModbusRtuOverTcpDevice(ip_address='localhost', modbus_port=5120, baudrate=115200)
+    device.set_registers_spec(register_block_list=_register_blocks(1))
+    device.connect()
+
+    assert device.read_registers_as_dict() == {'first': 11, 'second': 12}
+    device.write_register('second', 42)
+    assert device.read_register('second').value == 42
+
+    device.disconnect()
+    assert not device.connected
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_devices_share_a_gateway():
+    run_rtu_over_tcp_server(5121)
+    gateway = SerialGateway(ip_address='localhost', port=5121, baudrate=9600)
+    first_device = ModbusRtuOverTcpDevice(ip_address='localhost', gateway=gateway)
+    first_device.set_registers_spec(register_block_list=_register_blocks(1))
+    second_device = AsyncModbusRtuOverTcpDevice(ip_address='localhost', gateway=gateway)
+    second_device.set_registers_spec(register_block_list=_register_blocks(2))
+    first_device.connect()
+    await second_device.connect()
+
+    try:
+        data = await asyncio.gather(asyncio.to_thread(first_device.read_registers_as_dict),
+                                    second_device.read_registers_as_dict())
+        assert data == [{'first': 11, 'second': 12}, {'first': 21, 'second': 22}]
+
+        await second_device.write_register('first', 7)
+        assert (await second_device.read_register('first')).value == 7
+        assert first_device.read_register('first').value == 11
+    finally:
+        first_device.disconnect()
+        second_device.disconnect()
+        assert gateway.connected  # shared gateways are closed by their owner
+        gateway.close()
+
+
+@pytest.mark.asyncio
+async def test_async_connect_does_not_block_the_event_loop():
+    gateway = SerialGateway('localhost', port=5122)
+
+    def slow_connect():
+        time.sleep(0.2)  # like a TCP connect to a gateway which does not answer
+        return False
+
+    gateway.connect = slow_connect
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    assert not await gateway.async_client.connect()
+    ticker.cancel()
+    assert ticks > 5
@@ -0,0 +1,138 @@
+import os
+import struct
+import threading
+import time
+
+import pytest
+
+from modbus_crawler.modbus_device_rtu import ModbusRtuDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.request_queue import PRIORITY_READ, PRIORITY_WRITE
+from modbus_crawler.serial_bus import SerialBus, inter_frame_delay
+
+pytest.importorskip('serial')
+pytestmark = pytest.mark.skipif(not hasattr(os, 'openpty'), reason='needs a pseudo terminal pair')
+
+
+def _crc16(frame: bytes) -> bytes:
+    crc = 0xFFFF
+    for byte in frame:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return struct.pack('<H', crc)
+
+
+class _SimulatedSlaves(threading.Thread):
+    """
+    Minimal RTU slaves on the master side of a pty pair. Supports function codes 3, 4 and 6.
+    """
+
+    def __init__(self, fd, registers: dict[int, list[int]]):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.registers = registers
+        self.requests = []
+
+    def run(self):
+        buffer = b''
+        while True:
+            try:
+                buffer += os.read(self.fd, 256)
+            except OSError:
+                return
+
+            while len(buffer) >= 8:
+                frame, buffer = buffer[:8], buffer[8:]
+                slave, function_code, address, value = struct.unpack('>BBHH', frame[:6])
+                self.requests.append((slave, function_code, address, value))
+                if slave not in self.registers:
+                    continue  # another device on the line, stay silent
+
+                if function_code in (3, 4):
+                    words = self.registers[slave][address:address + value]
+                    pdu = struct.pack(f'>BBB{len(words)}H', slave, function_code, 2 * len(words), *words)
+                else:
+                    self.registers[slave][address] = value
+                    pdu = frame[:6]
+                os.write(self.fd, pdu + _crc16(pdu))
+
+
+def _device(bus, slave_id):
+    block = RegisterBlock(start_register=0, register_type='h', slave_id=slave_id, mode='rw')
+    block.add_register_to_list(ModbusRegister(name='first', data_type='uint16', register=0, block=block))
+    block.add_register_to_list(ModbusRegister(name='second', data_type='uint16', register=1, block=block))
+    device = ModbusRtuDevice(com_port=bus.com_port, serial_bus=bus)
+    device.set_registers_spec(register_block_list=[block])
+    return device
+
+
+def test_inter_frame_delay():
+    assert inter_frame_delay(9600) == pytest.approx(3.5 * 10 / 9600)
+    assert inter_frame_delay(9600, parity='E') == pytest.approx(3.5 * 11 / 9600)
+    assert inter_frame_delay(115200) == 1.75e-3
+
+
+def test_two_devices_share_one_port():
+    master, slave = os.openpty()
+    simulation = _SimulatedSlaves(master, {1: [11, 12], 2: [21, 22]})
+    simulation.start()
+
+    bus = SerialBus(com_port=os.ttyname(slave), baudrate=19200, timeout=1)
+    first_device = _device(bus, 1)
+    second_device = _device(bus, 2)
+    first_device.connect()
+    second_device.connect()
+
+    try:
+        assert first_device.read_registers_as_dict() == {'first': 11, 'second': 12}
+        assert second_device.read_registers_as_dict() == {'first': 21, 'second': 22}
+
+        second_device.write_register('second', 42)
+        assert second_device.read_register('second').value == 42
+        assert first_device.read_register('second').value == 12
+    finally:
+        first_device.disconnect()
+        assert bus.connected  # disconnecting a device keeps the shared port open
+        bus.close()
+        os.close(slave)
+        os.close(master)
+
+
+class _BlockingClient:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.connected = True
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def __getattr__(self, function_name):
+        def call(*args, **kwargs):
+            if not self.calls:
+                self.release.wait()  # hold the line until all other transactions are queued
+            self.calls.append(function_name)
+        return call
+
+
+def test_writes_are_sent_before_queued_reads():
+    bus = SerialBus(com_port='unused', baudrate=115200)
+    bus._client = _BlockingClient()
+    bus.connect()
+
+    futures = [bus.submit(PRIORITY_READ, 'read_holding_registers', address=0)]
+    time.sleep(0.05)  # first read is on the wire and blocks the bus
+    futures += [bus.submit(PRIORITY_READ, 'read_input_registers', address=0),
+                bus.submit(PRIORITY_READ, 'read_coils', address=0),
+                bus.submit(PRIORITY_WRITE, 'write_register', 0, 1)]
+    bus._client.release.set()
+
+    for future in futures:
+        future.result(timeout=1)
+    bus.close()
+
+    assert bus._client.calls == ['read_holding_registers', 'write_register', 'read_input_registers', 'read_coils']
@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext, ModbusSequentialDataBlock
+from pymodbus.device import ModbusDeviceIdentification
+from pymodbus.server import StartTcpServer
+
+from modbus_crawler.device_config import DeviceConfig
+from modbus_crawler.sharded_crawler import ConsistentHashRing, ShardedCrawler, _run_shard
+
+
+def run_modbus_server(port):
+    store = ModbusSlaveContext(hr=ModbusSequentialDataBlock(1, [7] * 200))
+    context = ModbusServerContext(slaves=store, single=True)
+    threading.Thread(target=StartTcpServer, daemon=True,
+                     kwargs={'context': context, 'identity': ModbusDeviceIdentification(),
+                             'address': ("0.0.0.0", port)}).start()
+
+
+def test_hash_ring_is_stable():
+    hosts = [f'10.0.0.{i}' for i in range(200)]
+    ring = ConsistentHashRing(4)
+
+    assert [ring.shard_for(host) for host in hosts] == [ConsistentHashRing(4).shard_for(host) for host in hosts]
+    assert set(ring.shard_for(host) for host in hosts) == {0, 1, 2, 3}
+
+    # Adding a worker only moves the devices which are assigned to the new worker
+    grown = ConsistentHashRing(5)
+    moved = [host for host in hosts if ring.shard_for(host) != grown.shard_for(host)]
+    assert all(grown.shard_for(host) == 4 for host in moved)
+    assert len(moved) < len(hosts) / 2
+
+
+def test_sharded_crawler_merges_readings():
+    run_modbus_server(5060)
+    configs = [DeviceConfig(name=f'device_{i}', ip_address=host, modbus_port=5060,
+                            register_specs_file_name='registers_test_write.csv', interval=0.2)
+               for i, host in enumerate(['localhost', '127.0.0.1'])]
+
+    crawler = ShardedCrawler(configs, workers=2)
+    crawler.start()
+    try:
+        readings = {}
+        deadline = time.monotonic() + 20
+        while len(readings) < 2 and time.monotonic() < deadline:
+            reading = crawler.get_reading(timeout=1)
+            if reading is not None and reading.values is not None:
+                readings[reading.device] = reading
+
+        assert set(readings) == {'device_0', 'device_1'}
+        assert readings['device_0'].values['Zahl_3'] == 7
+
+        crawler.reload(configs[:1])
+        assert crawler.restart_dead_workers() == 0
+    finally:
+        crawler.stop()
+
+
+@pytest.mark.asyncio
+async def test_reload_picks_up_edited_spec_files(tmp_path):
+    run_modbus_server(5061)
+    spec = tmp_path / 'spec.csv'
+    spec.write_text('Register_start,Register_type,Data_type,Name\n0,h,uint16,power\n')
+    config = DeviceConfig(name='meter', ip_address='localhost', modbus_port=5061, register_specs_file_name=str(spec),
+                          interval=0.05)
+    results = queue.Queue()
+    control, worker_control = multiprocessing.Pipe()
+    shard = asyncio.create_task(_run_shard([config], results, worker_control))
+
+    async def next_values():
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                reading = results.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.02)
+                continue
+            if reading.values is not None:
+                return reading.values
+
+    try:
+        assert await next_values() == {'power': 7}
+
+        # Same config, but the spec file was edited
+        spec.write_text('Register_start,Register_type,Data_type,Name\n0,h,uint16,voltage\n1,h,uint16,current\n')
+        control.send(('reload', [config]))
+        deadline = time.monotonic() + 10
+        values = await next_values()
+        while values == {'power': 7} and time.monotonic() < deadline:
+            values = await next_values()
+        assert values == {'voltage': 7, 'current': 7}
+    finally:
+        control.send(('stop', None))
+        await asyncio.wait_for(shard, 5)
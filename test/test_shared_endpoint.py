@@ -0,0 +1,100 @@
+import struct
+
+import pytest
+from pymodbus.constants import Endian
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.shared_endpoint import AsyncSharedEndpointReader, SharedEndpointReader
+
+# Holding registers of the physical device
+_MEMORY = [230, 1500, 0, 0, 0, 7, *struct.unpack('>2H', struct.pack('>f', 49.5))]
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class _Endpoint:
+    def __init__(self):
+        self.requests = []
+
+    def read(self, address, count, slave):
+        self.requests.append((address, count))
+        return _Response(_MEMORY[address:address + count])
+
+    async def read_async(self, address, count, slave):
+        return self.read(address, count, slave)
+
+
+def _block(read_function, start, registers):
+    block = RegisterBlock(start_register=start, register_type='h')
+    for name, data_type, register, scaling in registers:
+        block.add_register_to_list(ModbusRegister(name=name, data_type=data_type, register=register, block=block,
+                                                  scaling=scaling))
+    block._read_function = read_function
+    return block
+
+
+def _consumers(read_function, device_class=ModbusDevice):
+    monitoring = device_class(register_block_list=[
+        _block(read_function, 0, [('voltage', 'uint16', 0, None), ('power', 'uint16', 1, None)]),
+        _block(read_function, 6, [('frequency', 'float32', 6, None)])])
+    control = device_class(register_block_list=[
+        _block(read_function, 1, [('power_kw', 'uint16', 1, 0.001)]),
+        _block(read_function, 5, [('mode', 'uint16', 5, None)])])
+    return {'monitoring': monitoring, 'control': control}
+
+
+def test_overlapping_specs_are_read_once():
+    endpoint = _Endpoint()
+    reader = SharedEndpointReader(_consumers(endpoint.read))
+    assert reader.request_count == 1
+    assert reader.separate_request_count == 4
+
+    assert reader.read_as_dict() == {'monitoring': {'voltage': 230, 'power': 1500, 'frequency': 49.5},
+                                     'control': {'power_kw': 1.5, 'mode': 7}}
+    assert endpoint.requests == [(0, 8)]
+
+
+def test_consumers_decode_with_their_own_byte_order():
+    endpoint = _Endpoint()
+    consumers = _consumers(endpoint.read)
+    consumers['control'].byteorder = Endian.LITTLE
+    reader = SharedEndpointReader(consumers)
+    values = reader.read_as_dict()
+    assert values['monitoring']['power'] == 1500
+    assert values['control']['mode'] == 7 << 8
+
+
+def test_plan_follows_spec_reloads():
+    endpoint = _Endpoint()
+    consumers = _consumers(endpoint.read)
+    reader = SharedEndpointReader(consumers, max_gap=0)
+    reader.read()
+    assert endpoint.requests == [(0, 2), (5, 3)]
+
+    consumers['control'].set_registers_spec(register_block_list=[
+        _block(endpoint.read, 2, [('reserved', 'uint32', 2, None)])])
+    endpoint.requests.clear()
+    assert reader.read_as_dict()['control'] == {'reserved': 0}
+    assert endpoint.requests == [(0, 4), (6, 2)]
+
+
+def test_no_consumers():
+    with pytest.raises(ValueError):
+        SharedEndpointReader({})
+
+
+@pytest.mark.asyncio
+async def test_async_consumers():
+    endpoint = _Endpoint()
+    reader = AsyncSharedEndpointReader(_consumers(endpoint.read_async, AsyncModbusDevice))
+    values = await reader.read_as_dict()
+    assert values['control'] == {'power_kw': 1.5, 'mode': 7}
+    assert endpoint.requests == [(0, 8)]
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+import time
+
 import pytest
 from pymodbus.constants import Endian
+from pymodbus.exceptions import ModbusException
 from pymodbus.payload import BinaryPayloadBuilder
 
 from modbus_crawler.modbus_device import ModbusDevice
@@ -61,3 +66,87 @@ async def test_read_register_async_decodes_only_requested_register():
 
     assert register.name == 'second'
     assert register.value == 0x10203040
+
+
+class _ErrorResponse:
+    def isError(self):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async_reads_share_one_request():
+    block, _, second = _build_registers()
+    device = AsyncModbusDevice(register_block_list=[block])
+    calls = []
+
+    async def read_function(address, count, slave):
+        calls.append(address)
+        await asyncio.sleep(0.01)
+        return _Response(_build_response_registers()) if len(calls) == 1 else _ErrorResponse()
+
+    block._read_function = read_function
+
+    registers = await asyncio.gather(*(device.read_register('second') for _ in range(5)))
+    assert calls == [101]
+    assert all(register.value == 0x10203040 for register in registers)
+
+    # Errors are raised for every waiting caller
+    results = await asyncio.gather(*(device.read_register('second') for _ in range(3)), return_exceptions=True)
+    assert calls == [101, 101]
+    assert all(isinstance(result, ModbusException) for result in results)
+
+
+def test_concurrent_reads_share_one_request():
+    block, _, second = _build_registers()
+    device = ModbusDevice(register_block_list=[block])
+    calls = []
+
+    def read_function(address, count, slave):
+        calls.append(address)
+        time.sleep(0.1)
+        return _Response(_build_response_registers())
+
+    block._read_function = read_function
+
+    threads = [threading.Thread(target=device.read_register, args=('second',)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [101]
+    assert second.value == 0x10203040
+
+
+def test_read_cache_serves_fresh_block_reads():
+    block, first, second = _build_registers()
+    device = ModbusDevice(register_block_list=[block])
+    calls = []
+
+    def read_function(address, count, slave):
+        calls.append((address, count))
+        return _Response([7] + _build_response_registers())
+
+    class _Client:
+        def write_register(self, address, value, slave):
+            pass
+
+    block._read_function = read_function
+    device._client = _Client()
+
+    device.read_register('first')
+    assert calls == [(100, 1)]  # Not cached by default
+
+    device.read_cache_ttl = 10
+    device.read_registers()
+    assert device.read_register('second').value == 0x10203040
+    assert calls == [(100, 1), (100, 3)]
+
+    device.write_register('first', 8)  # Invalidates the block
+    device.read_register('first')
+    assert calls == [(100, 1), (100, 3), (100, 1)]
+
+    device.read_registers()
+    device.read_cache_ttl = 0
+    device.read_register('first')
+    assert len(calls) == 5
@@ -0,0 +1,57 @@
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_register_list_parser_csv import CsvStringParser
+
+SPEC = """Register_start,Register_type,Data_type,Name,Unit_id
+0,h,uint16,first,1
+-,,uint16,second,
+10,h,uint32,third,1
+20,i,int16,fourth,1
+"""
+
+NEW_SPEC = """Register_start,Register_type,Data_type,Name,Unit_id
+0,h,uint16,first,1
+-,,uint16,second,
+10,h,int32,third,1
+30,i,int16,fifth,1
+"""
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+class _Client:
+    def __init__(self):
+        self.requests = []
+
+    def _read(self, address, count, slave):
+        self.requests.append((address, count))
+        return _Response([address + i for i in range(count)])
+
+    read_holding_registers = _read
+    read_input_registers = _read
+
+
+def test_reload_keeps_unchanged_blocks():
+    device = ModbusDevice(register_block_list=CsvStringParser.get_register_list(SPEC))
+    device._client = client = _Client()
+    device._set_modbus_client_in_block_list()
+
+    old_blocks = list(device.register_block_list)
+    device.read_registers()
+
+    result = device.reload_registers_spec(register_block_list=CsvStringParser.get_register_list(NEW_SPEC))
+
+    assert result == {'unchanged': 1, 'added': 2, 'removed': 2}
+    assert device.register_block_list[0] is old_blocks[0]
+    assert device.register_block_list[0].register_list[1].value == 1  # values of unchanged blocks survive
+
+    client.requests.clear()
+    assert device.read_registers_as_dict() == {'first': 0, 'second': 1, 'third': 10 * 2 ** 16 + 11, 'fifth': 30}
+    assert client.requests == [(0, 2), (10, 2), (30, 1)]
+    assert device._register_index.get('fourth') is None
+    assert device._register_index[30].name == 'fifth'
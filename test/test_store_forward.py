@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from modbus_crawler.register_block import ModbusRegister
+from modbus_crawler.sharded_crawler import DeviceReading
+from modbus_crawler.store_forward import StoreAndForwardBuffer
+
+
+def _reading(i):
+    return DeviceReading(device=f'meter_{i % 3}', timestamp=1000.0 + i,
+                         values={'power': 1.5 * i, 'count': i, 'on': i % 2 == 0, 'serial': f'SN{i}',
+                                 'status': {'running': True, 'mode': 3}, 'missing': None})
+
+
+def test_replay_in_order_across_segments_and_restarts(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), segment_size=4096, max_segments=64)
+    for i in range(200):
+        buffer.append(_reading(i))
+    buffer.append(DeviceReading(device='meter_0', timestamp=2000.0, error='TimeoutError()'))
+    assert len(list(tmp_path.glob('*.seg'))) > 2
+
+    batch = buffer.peek(max_readings=50)
+    assert batch.readings == [_reading(i) for i in range(50)]
+    assert buffer._read_keys == {}  # peek decodes with a copy of the keys
+    assert buffer.peek(max_readings=50).readings == batch.readings  # not acknowledged yet
+    buffer.acknowledge(batch)
+    buffer.close()
+
+    # Unacknowledged readings survive a restart, the writer continues in the last segment
+    buffer = StoreAndForwardBuffer(str(tmp_path), segment_size=4096, max_segments=64)
+    buffer.append(_reading(300))
+    replayed = []
+    while batch := buffer.peek(max_readings=64).readings:
+        replayed.extend(batch)
+        buffer.acknowledge(buffer.peek(max_readings=64))
+    assert replayed == [_reading(i) for i in range(50, 200)] + [
+        DeviceReading(device='meter_0', timestamp=2000.0, error='TimeoutError()'), _reading(300)]
+    assert buffer.pending_bytes == 0
+    assert len(list(tmp_path.glob('*.seg'))) == 1  # forwarded segments are deleted
+    buffer.close()
+
+
+def test_oldest_segments_are_dropped_when_full(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), segment_size=4096, max_segments=3)
+    for i in range(500):
+        buffer.append(_reading(i))
+
+    assert len(list(tmp_path.glob('*.seg'))) == 3
+    assert buffer.dropped_segments > 0
+    readings = buffer.peek(max_readings=1000).readings
+    assert readings[-1] == _reading(499)
+    assert [reading.timestamp for reading in readings] == sorted(reading.timestamp for reading in readings)
+
+    with pytest.raises(ValueError):
+        buffer.append(DeviceReading(device='big', timestamp=0.0, values={'text': 'x' * 5000}))
+    buffer.close()
+
+
+def test_callback_and_throughput(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), segment_size=1 << 20)
+    store = buffer.callback('inverter')
+    registers = [ModbusRegister(name=f'r{i}', data_type='float32', register=i, value=float(i)) for i in range(100)]
+
+    start = time.perf_counter()
+    for _ in range(200):
+        store(registers)
+    elapsed = time.perf_counter() - start
+    assert 200 * 100 / elapsed > 20000  # values per second
+
+    readings = buffer.peek(max_readings=1000).readings
+    assert len(readings) == 200
+    assert readings[0].device == 'inverter'
+    assert readings[0].values == {f'r{i}': float(i) for i in range(100)}
+    buffer.close()
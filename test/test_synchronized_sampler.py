@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.synchronized_sampler import SynchronizedSampler
+
+
+class _Response:
+    def __init__(self, registers):
+        self.registers = registers
+
+    def isError(self):
+        return False
+
+
+def _block(read_function):
+    block = RegisterBlock(start_register=0, register_type='h')
+    block.add_register_to_list(ModbusRegister(name='power', data_type='uint16', register=0, block=block))
+    block._read_function = read_function
+    return block
+
+
+def _sync_device(value, delay):
+    def read(address, count, slave):
+        time.sleep(delay)
+        return _Response([value])
+    return ModbusDevice(register_block_list=[_block(read)])
+
+
+def _async_device(value, delay):
+    async def read(address, count, slave):
+        await asyncio.sleep(delay)
+        return _Response([value])
+    return AsyncModbusDevice(register_block_list=[_block(read)])
+
+
+def _failing_device():
+    def read(address, count, slave):
+        raise TimeoutError()
+    return ModbusDevice(register_block_list=[_block(read)])
+
+
+def test_next_tick():
+    sampler = SynchronizedSampler({}, period=1.0, offset=0.25)
+    assert sampler.next_tick(10.1) == 10.25
+    assert sampler.next_tick(10.25) == 11.25
+    assert sampler.next_tick(10.9) == 11.25
+
+
+@pytest.mark.asyncio
+async def test_devices_are_read_at_the_same_tick():
+    devices = {'meter_1': _sync_device(1, 0.02), 'meter_2': _sync_device(2, 0.02), 'meter_3': _async_device(3, 0.02),
+               'broken': _failing_device()}
+    sampler = SynchronizedSampler(devices, period=0.1)
+    snapshots = []
+    try:
+        await sampler.run(snapshots.append, count=2)
+    finally:
+        sampler.close()
+
+    for snapshot in snapshots:
+        assert snapshot.tick / 0.1 == pytest.approx(round(snapshot.tick / 0.1), abs=1e-3)
+    assert snapshots[1].tick - snapshots[0].tick == pytest.approx(0.1, abs=1e-6)
+
+    for snapshot in snapshots:
+        assert snapshot.as_dict() == {'meter_1': {'power': 1}, 'meter_2': {'power': 2}, 'meter_3': {'power': 3}}
+        assert 'TimeoutError' in snapshot.samples['broken'].error
+        for name in ('meter_1', 'meter_2', 'meter_3'):
+            # All reads start at the tick, the middle of a 20 ms read is 10 ms later
+            assert snapshot.samples[name].skew == pytest.approx(0.01, abs=0.015)
+        assert snapshot.spread < 0.02
+    assert sampler.missed_ticks == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_snapshots_skip_ticks():
+    sampler = SynchronizedSampler({'slow': _async_device(1, 0.15)}, period=0.1)
+    await sampler.run(lambda snapshot: None, count=2)
+    assert sampler.missed_ticks == 1
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from pymodbus.exceptions import ConnectionException, ModbusException
+
+from modbus_crawler.benchmark import decode_throughput
+from modbus_crawler.block_quality import BlockReadError
+from modbus_crawler.modbus_device import ModbusDevice
+from modbus_crawler.modbus_device_async import AsyncModbusDevice
+from modbus_crawler.register_block import ModbusRegister, RegisterBlock
+from modbus_crawler.traffic_capture import ReplayModbusDevice, TrafficCapture, read_capture
+
+
+class _Response:
+    def __init__(self, registers=None, bits=None, exception_code=None):
+        self.registers = registers
+        self.bits = bits
+        self.exception_code = exception_code
+
+    def isError(self):
+        return self.exception_code is not None
+
+
+class _Device:
+    """
+    Holding registers counting up with every read, five coils and a slave which does not answer.
+    """
+
+    def __init__(self):
+        self.reads = 0
+
+    def read_holding_registers(self, address, count, slave):
+        if slave == 2:
+            raise ConnectionException('no answer')
+        self.reads += 1
+        return _Response(registers=[self.reads * 10 + i for i in range(address, address + count)])
+
+    def read_coils(self, address, count, slave):
+        return _Response(bits=[True, False, True, True, False, False, False, False])
+
+    def read_input_registers(self, address, count, slave):
+        return _Response(exception_code=2)
+
+    async def read_holding_registers_async(self, address, count, slave):
+        await asyncio.sleep(0)
+        return self.read_holding_registers(address, count, slave)
+
+
+def _spec(read_holding_registers, source=None):
+    holding = RegisterBlock(start_register=0, register_type='h')
+    holding.add_register_to_list(ModbusRegister(name='counter', data_type='uint16', register=0, block=holding))
+    holding.add_register_to_list(ModbusRegister(name='power', data_type='uint16', register=1, block=holding,
+                                                scaling=0.5))
+    coils = RegisterBlock(start_register=0, register_type='c')
+    for i in range(5):
+        coils.add_register_to_list(ModbusRegister(name=f'switch_{i}', data_type='bool', register=i, block=coils))
+    if source is not None:
+        holding._read_function = read_holding_registers
+        coils._read_function = source.read_coils
+    return [holding, coils]
+
+
+def test_capture_and_replay(tmp_path):
+    source = _Device()
+    device = ModbusDevice(register_block_list=_spec(source.read_holding_registers, source))
+    capture_file = str(tmp_path / 'device.mbcap')
+
+    expected = []
+    with TrafficCapture(capture_file) as capture:
+        capture.attach(device)
+        for _ in range(3):
+            expected.append(device.read_registers_as_dict())
+    assert capture.records == 6
+    assert expected[1] == {'counter': 20, 'power': 10.5, 'switch_0': True, 'switch_1': False, 'switch_2': True,
+                           'switch_3': True, 'switch_4': False}
+
+    records = read_capture(capture_file)
+    assert [(record.register_type, record.address, record.count) for record in records[:2]] == [('h', 0, 2),
+                                                                                              ('c', 0, 5)]
+    assert records[0].payload == bytes([0, 10, 0, 11])
+    assert records[1].payload == bytes([0b1101])
+    assert all(record.exception_code is None and record.duration >= 0 for record in records)
+
+    # The replay goes through the recorded responses and starts over
+    replay = ReplayModbusDevice(capture_file, register_block_list=_spec(None))
+    assert [replay.read_registers_as_dict() for _ in range(4)] == expected + expected[:1]
+
+
+def test_errors_are_captured(tmp_path):
+    source = _Device()
+    device = ModbusDevice(register_block_list=_spec(source.read_holding_registers, source))
+    capture_file = str(tmp_path / 'device.mbcap')
+    capture = TrafficCapture(capture_file)
+    capture.attach(device)
+    with pytest.raises(ConnectionException):
+        device.register_block_list[0]._read_function(address=0, count=3, slave=2)
+    device.register_block_list[0]._read_function = capture._recording(source.read_input_registers, 'i')
+    with pytest.raises(BlockReadError):
+        device.register_block_list[0].read_registers()
+    capture.close()
+
+    assert [record.exception_code for record in read_capture(capture_file)] == [0, 2]
+    replay = ReplayModbusDevice(capture_file, register_block_list=_spec(None))
+    with pytest.raises(ModbusException):
+        replay.read_registers()  # no slave 1 holding registers captured
+
+    # The captured timeout of slave 2 is replayed as error response
+    block = RegisterBlock(start_register=0, register_type='h', slave_id=2)
+    block.add_register_to_list(ModbusRegister(name='counter', data_type='uint16', register=0, block=block))
+    block.add_register_to_list(ModbusRegister(name='energy', data_type='uint32', register=1, block=block))
+    replay.set_registers_spec(register_block_list=[block])
+    replay.connect()
+    with pytest.raises(BlockReadError):
+        replay.read_registers()
+
+
+def test_detach_restores_the_read_functions(tmp_path):
+    source = _Device()
+    device = ModbusDevice(register_block_list=_spec(source.read_holding_registers, source))
+    capture = TrafficCapture(str(tmp_path / 'device.mbcap'))
+    capture.attach(device)
+    capture.attach(device)  # attaching twice does not record twice
+    device.read_registers()
+    capture.detach(device)
+    device.read_registers()
+    capture.close()
+    assert capture.records == 2
+    assert device.register_block_list[0]._read_function == source.read_holding_registers
+
+
+@pytest.mark.asyncio
+async def test_capture_async_device(tmp_path):
+    source = _Device()
+    spec = _spec(source.read_holding_registers_async, source)
+    spec.pop()  # the coils of the fake are sync
+    device = AsyncModbusDevice(register_block_list=spec)
+    capture_file = str(tmp_path / 'device.mbcap')
+    with TrafficCapture(capture_file) as capture:
+        capture.attach(device)
+        values = await device.read_registers_as_dict()
+
+    replay = ReplayModbusDevice(capture_file, register_block_list=_spec(None)[:1])
+    assert replay.read_registers_as_dict() == values == {'counter': 10, 'power': 5.5}
+
+
+def test_truncated_capture(tmp_path):
+    capture_file = tmp_path / 'device.mbcap'
+    with TrafficCapture(str(capture_file)) as capture:
+        capture.write(0.0, 0.0, 1, 'h', 0, 1, _Response(registers=[1]))
+    capture_file.write_bytes(capture_file.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        read_capture(str(capture_file))
+    capture_file.write_bytes(b'not a capture')
+    with pytest.raises(ValueError):
+        read_capture(str(capture_file))
+
+
+def test_decode_benchmark(tmp_path):
+    capture_file = str(tmp_path / 'device.mbcap')
+    with TrafficCapture(capture_file) as capture:
+        for slave_id, address, count in ((1, 1720, 20), (2, 2500, 70), (1, 19054, 56)):
+            capture.write(0.0, 0.0, slave_id, 'i', address, count, _Response(registers=[0] * count))
+    result = decode_throughput(capture_file, 'registers_test_read.csv', cycles=10)
+    assert result['cycles_per_second'] > 0
+    assert result['registers_per_second'] > result['cycles_per_second']